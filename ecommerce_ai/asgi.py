@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_ai.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from shop.lifespan import LifespanMiddleware  # noqa: E402  (needs the app registry loaded)
+
+application = LifespanMiddleware(django_application)
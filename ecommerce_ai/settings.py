@@ -45,7 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shop.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'shop.assets.AssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -120,9 +122,19 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
-STATICFILES_DIRS = [
-    BASE_DIR / 'static',
-]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic minifies, content-hashes and gzip/brotli-compresses the
+# assets; AssetMiddleware serves them with far-future cache headers
+# (see shop/assets.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'shop.assets.ShopStaticFilesStorage',
+    },
+}
 
 # Media files (uploaded content)
 MEDIA_URL = '/media/'
@@ -132,3 +144,40 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Chat rate limiting & admission control (see shop/ratelimit.py)
+# algorithm: 'token_bucket' or 'sliding_window'; backend: 'local' or 'cache'
+SHOP_RATE_LIMITS = {
+    'chat': {
+        'algorithm': 'token_bucket',
+        'backend': 'local',
+        'rate': 10,      # requests per period
+        'period': 60,    # seconds
+        'burst': 5,      # token bucket capacity
+    },
+}
+SHOP_ADMISSION_GATES = {
+    'chat': 32,  # concurrent /chat/ requests per process
+}
+SHOP_CHAT_MAX_QUEUED = 500  # reject new chats while this many are waiting or running
+SHOP_TRUST_X_FORWARDED_FOR = False
+
+# Open the model connection when the ASGI server and job workers start (see shop/lifespan.py)
+SHOP_AGENT_WARMUP = True
+
+# Agent worker pool (see shop/agent_pool.py). When set, chat jobs hand their
+# agent runs to `manage.py run_agent_workers` over Unix sockets at this base
+# path instead of running them inside run_jobs.
+SHOP_AGENT_POOL_SOCKET = ''
+SHOP_AGENT_POOL_TIMEOUT = 60  # seconds per agent run
+
+# Slow-request profiling (see shop/profiling.py). Off while SHOP_PROFILE_DIR
+# is empty; `manage.py profiles` lists and shows what it captured.
+SHOP_PROFILE_DIR = os.getenv('SHOP_PROFILE_DIR', '')
+SHOP_PROFILE_SAMPLE_RATE = 0.05   # share of matching requests and jobs profiled
+SHOP_PROFILE_THRESHOLD_MS = 500   # profiled requests faster than this are dropped
+SHOP_PROFILE_INTERVAL_MS = 5      # stack sampling period
+SHOP_PROFILE_MAX_CAPTURES = 200   # newest captures kept on disk
+SHOP_PROFILE_PATHS = [r'^/$', r'^/chat/$', r'^/history/$', r'^/api/(filter-)?products/$']
+SHOP_PROFILE_JOBS = ['chat']
@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Product, Conversation
+from django.contrib.admin.views.main import ChangeList
+from django.db.models.functions import Substr
+
+from .models import Product, Conversation, Job
+from .paginators import EstimatedCountPaginator
+from .search import search_conversations
 
 
 @admin.register(Product)
@@ -8,21 +13,73 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)  # removed category
     search_fields = ('product_id', 'name', 'description')
     ordering = ('price',)  # removed category
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+SNIPPET_LENGTH = 50
+
+
+def snippet(text):
+    return text[:SNIPPET_LENGTH] + "..." if len(text) > SNIPPET_LENGTH else text
+
+
+class ConversationChangeList(ChangeList):
+    def get_filters(self, request):
+        # Take the date_hierarchy bounds out so they are applied last and
+        # date_hierarchy_queryset can be probed without them (SQLite only
+        # uses one of two overlapping ranges on the timestamp index).
+        filter_specs, has_filters, lookup_params, may_have_duplicates, has_active_filters = super().get_filters(request)
+        field = self.date_hierarchy
+        self.date_bounds = {
+            lookup: lookup_params.pop(lookup)[-1]
+            for lookup in (f"{field}__gte", f"{field}__lt")
+            if field and lookup in lookup_params
+        }
+        return filter_specs, has_filters, lookup_params, may_have_duplicates, has_active_filters
+
+    def get_queryset(self, request, *args, **kwargs):
+        queryset = super().get_queryset(request, *args, **kwargs)
+        self.date_hierarchy_queryset = queryset
+        # Load one character past the snippet so snippet() knows to add "..."
+        return queryset.filter(**self.date_bounds).only('id', 'timestamp', 'session_id').annotate(
+            user_message_prefix=Substr('user_message', 1, SNIPPET_LENGTH + 1),
+            agent_response_prefix=Substr('agent_response', 1, SNIPPET_LENGTH + 1),
+        )
 
 
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ('id', 'timestamp', 'session_id', 'user_message_snippet', 'agent_response_snippet')
     list_filter = ('timestamp',)
-    search_fields = ('user_message', 'agent_response', 'session_id')
+    # Matched by shop.search: full-text on the messages, exact on session_id
+    search_fields = ('user_message', 'agent_response', '=session_id')
+    search_help_text = 'Words in the messages (prefix match) or an exact session ID'
     readonly_fields = ('user_message', 'agent_response', 'timestamp', 'session_id')
     ordering = ('-timestamp',)
+    date_hierarchy = 'timestamp'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ConversationChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_conversations(queryset, search_term), False
 
     def user_message_snippet(self, obj):
-        return obj.user_message[:50] + "..." if len(obj.user_message) > 50 else obj.user_message
+        return snippet(obj.user_message_prefix if hasattr(obj, 'user_message_prefix') else obj.user_message)
 
     def agent_response_snippet(self, obj):
-        return obj.agent_response[:50] + "..." if len(obj.agent_response) > 50 else obj.agent_response
+        return snippet(obj.agent_response_prefix if hasattr(obj, 'agent_response_prefix') else obj.agent_response)
 
     user_message_snippet.short_description = 'User Message'
     agent_response_snippet.short_description = 'Agent Response'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'priority', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('token', 'payload', 'result', 'error', 'locked_by', 'locked_until', 'created_at', 'finished_at')
+    ordering = ('-created_at',)
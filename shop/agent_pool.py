@@ -0,0 +1,349 @@
+"""
+Agent worker pool: LLM orchestration in its own processes.
+
+``manage.py run_agent_workers --processes N`` forks N workers. Worker
+``i`` listens on the Unix socket ``<socket>.<i>`` and runs up to
+``--concurrency`` agent runs at once on its own event loop, with its own
+model client. ``AgentPoolClient`` keeps one connection per worker, sends
+each request to the worker with the fewest in flight and matches replies
+by request id, so one connection carries many concurrent runs.
+
+The wire format is one JSON object per line. Requests are
+``{"id", "op", "timeout", ...params}``; replies are ``{"id", "result"}``
+or ``{"id", "error"}``. A worker cancels a run that outlives its timeout
+and answers with an error; the client waits a little longer before
+giving up, so a worker that died mid-run surfaces as ``TimeoutError``
+or ``ConnectionError`` rather than a hang.
+
+With ``SHOP_AGENT_POOL_SOCKET`` set, chat jobs send their agent runs
+here instead of running them inside ``run_jobs``.
+"""
+import asyncio
+import contextvars
+import glob
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = "/tmp/shop-agent-workers.sock"
+DEFAULT_TIMEOUT = 60  # seconds per agent run
+DEFAULT_CONCURRENCY = 32  # agent runs in flight per worker process
+CLIENT_GRACE = 1.0  # seconds the client waits past the worker's own timeout
+RESCAN_INTERVAL = 5.0  # seconds between looks for restarted or added workers
+MAX_LINE = 1024 * 1024
+
+
+def worker_socket(base, index):
+    return f"{base}.{index}"
+
+
+def worker_sockets(base):
+    """Sockets of the running pool, in worker order"""
+    paths = [p for p in glob.glob(glob.escape(base) + ".*") if p.rsplit(".", 1)[1].isdigit()]
+    return sorted(paths, key=lambda p: int(p.rsplit(".", 1)[1]))
+
+
+# ==========================================================
+# Worker side
+# ==========================================================
+OPS = {}
+
+
+def op(name):
+    """Register an async function as the handler for requests with ``op`` = ``name``"""
+    def decorator(func):
+        OPS[name] = func
+        return func
+    return decorator
+
+
+@op("query")
+async def query(message):
+    from shop.agents_logic.agent_service import process_user_query
+    return await process_user_query(message)
+
+
+@op("ping")
+async def ping():
+    return {"pid": os.getpid()}
+
+
+async def serve(path, concurrency=DEFAULT_CONCURRENCY, stop_event=None, ops=OPS):
+    """Answer requests on the Unix socket ``path`` until ``stop_event`` is set"""
+    stop_event = stop_event or asyncio.Event()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(handler, params):
+        async with slots:
+            return await handler(**params)
+
+    async def respond(request):
+        reply = {"id": request.get("id")}
+        handler = ops.get(request.get("op"))
+        params = {k: v for k, v in request.items() if k not in ("id", "op", "timeout")}
+        if handler is None:
+            reply["error"] = f"Unknown op '{request.get('op')}'"
+            return reply
+        try:
+            # Time spent waiting for a slot counts against the caller's deadline
+            reply["result"] = await asyncio.wait_for(
+                run(handler, params), request.get("timeout") or DEFAULT_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            reply["error"] = "Timed out in the agent worker"
+        except Exception as e:
+            logger.exception("Agent worker request %s failed", reply["id"])
+            reply["error"] = f"{type(e).__name__}: {e}"
+        return reply
+
+    async def answer(line, writer, write_lock):
+        # A malformed line gets its own error reply; the connection and
+        # the other requests on it carry on.
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            reply = {"id": None, "error": f"Invalid request: {e}"}
+        else:
+            if isinstance(request, dict):
+                reply = await respond(request)
+            else:
+                reply = {"id": None, "error": "Invalid request: expected a JSON object"}
+        async with write_lock:
+            try:
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                pass  # the client went away; nothing to tell it
+
+    async def handle(reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(answer(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Dropping agent pool connection: %s", e)
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle, path=path, limit=MAX_LINE)
+    async with server:
+        await stop_event.wait()
+
+
+def worker_main(path, concurrency, base_url=None):
+    """Entry point of one forked worker process"""
+    asyncio.run(_worker(path, concurrency, base_url))
+
+
+async def _worker(path, concurrency, base_url):
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    from shop.agents_logic import agent_service
+    from shop.lifespan import warm_agents
+    agent_service.reset_client(base_url or agent_service.GEMINI_BASE_URL)
+    await warm_agents()
+    await serve(path, concurrency, stop_event)
+
+
+class WorkerPool:
+    """Fork, watch and stop the worker processes behind one socket base path"""
+
+    def __init__(self, path, processes, concurrency=DEFAULT_CONCURRENCY, base_url=None):
+        self.path = path
+        self.processes = processes
+        self.concurrency = concurrency
+        self.base_url = base_url
+        self.workers = {}
+        self._context = multiprocessing.get_context("fork")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self, ready_timeout=30):
+        for stale in worker_sockets(self.path):
+            os.unlink(stale)
+        # Children must not share the parent's database connections
+        connections.close_all()
+        for index in range(self.processes):
+            self._spawn(index)
+        self.wait_ready(ready_timeout)
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=worker_main,
+            args=(worker_socket(self.path, index), self.concurrency, self.base_url),
+            name=f"agent-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[index] = process
+
+    def wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        for index in self.workers:
+            path = worker_socket(self.path, index)
+            while True:
+                try:
+                    with socket.socket(socket.AF_UNIX) as probe:
+                        probe.connect(path)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Agent worker {index} did not start listening on {path}")
+                    time.sleep(0.05)
+
+    def restart_dead(self):
+        """Replace workers that exited; returns how many were restarted"""
+        dead = [index for index, process in self.workers.items() if not process.is_alive()]
+        for index in dead:
+            logger.warning("Agent worker %s exited with %s, restarting", index, self.workers[index].exitcode)
+            self._spawn(index)
+        return len(dead)
+
+    def stop(self, timeout=10):
+        for process in self.workers.values():
+            process.terminate()
+        for process in self.workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        for path in worker_sockets(self.path):
+            os.unlink(path)
+        self.workers.clear()
+
+
+# ==========================================================
+# Client side
+# ==========================================================
+class _Connection:
+    def __init__(self, path, reader, writer):
+        self.path = path
+        self.pending = {}
+        self.alive = True
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = asyncio.Lock()
+        # Shared by every request on this loop, so not part of the opener's profile capture
+        self._reading = asyncio.create_task(self._read(), context=contextvars.Context())
+
+    @classmethod
+    async def open(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        return cls(path, reader, writer)
+
+    async def call(self, request, timeout):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request["id"]] = future
+        try:
+            async with self._write_lock:
+                self._writer.write(json.dumps(request).encode() + b"\n")
+                await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request["id"], None)
+
+    async def _read(self):
+        try:
+            while line := await self._reader.readline():
+                reply = json.loads(line)
+                future = self.pending.get(reply.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("Agent pool connection to %s failed: %s", self.path, e)
+        finally:
+            self.alive = False
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Agent worker on {self.path} closed the connection"))
+            self._writer.close()
+
+    async def close(self):
+        self._writer.close()
+        await asyncio.gather(self._reading, return_exceptions=True)
+
+
+class AgentPoolClient:
+    def __init__(self, path, timeout=DEFAULT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._connections = []
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        self._scanned_at = 0.0
+
+    async def query(self, message, timeout=None):
+        """``process_user_query(message)``, run by a pool worker"""
+        return await self.request("query", timeout, message=message)
+
+    async def request(self, op, timeout=None, **params):
+        timeout = timeout or self.timeout
+        connection = await self._pick()
+        request = {"id": f"{os.getpid()}-{next(self._ids)}", "op": op, "timeout": timeout, **params}
+        reply = await connection.call(request, timeout + CLIENT_GRACE)
+        if "error" in reply:
+            raise RuntimeError(f"Agent worker error: {reply['error']}")
+        return reply["result"]
+
+    async def _pick(self):
+        """The live connection with the fewest requests in flight"""
+        alive = [c for c in self._connections if c.alive]
+        stale = time.monotonic() - self._scanned_at > RESCAN_INTERVAL
+        if not alive or len(alive) < len(self._connections) or stale:
+            async with self._connect_lock:
+                alive = [c for c in self._connections if c.alive]
+                connected = {c.path for c in alive}
+                for path in worker_sockets(self.path):
+                    if path not in connected:
+                        try:
+                            alive.append(await _Connection.open(path))
+                        except OSError:
+                            continue  # a worker that is restarting, or a stale socket
+                self._connections = alive
+                self._scanned_at = time.monotonic()
+        if not alive:
+            raise ConnectionError(f"No agent workers listening on {self.path}.*")
+        return min(alive, key=lambda c: len(c.pending))
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self._connections))
+        self._connections = []
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """The pool client for the running event loop; connections cannot span loops"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AgentPoolClient(
+            settings.SHOP_AGENT_POOL_SOCKET, getattr(settings, "SHOP_AGENT_POOL_TIMEOUT", DEFAULT_TIMEOUT),
+        )
+    return client
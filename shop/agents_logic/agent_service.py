@@ -1,16 +1,27 @@
 from dataclasses import dataclass
+from decimal import Decimal
 import os
 import asyncio
 import logging
 from typing import Any
-from agents import Agent, Runner, AsyncOpenAI, OpenAIChatCompletionsModel, function_tool, set_tracing_disabled, RunContextWrapper, ModelSettings
+from agents import Agent, AgentOutputSchema, Runner, AsyncOpenAI, OpenAIChatCompletionsModel, function_tool, set_tracing_disabled, RunContextWrapper, ModelSettings
+from openai import DefaultAsyncHttpxClient
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from pydantic import BaseModel
 from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
+from shop import profiling
 from shop.models import Product
+from shop.agents_logic.parser import DIRECT_PARSE_CONFIDENCE, parse_product_text
+from shop.validation import price_error
+from shop.agents_logic.prompts import (
+    OUTPUT_EXTRACTOR_INSTRUCTIONS,
+    PRODUCT_AGENT_INSTRUCTIONS,
+    PromptMeter,
+    extractor_input,
+)
 
 # ===============================
 # Setup
@@ -22,15 +33,33 @@ if not gemini_api_key:
 
 set_tracing_disabled(disabled=True)
 
-external_client: AsyncOpenAI = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Forwarded as prompt_cache_key to providers that route prompt caching by key
+PROMPT_CACHE_KEY = os.getenv("AGENT_PROMPT_CACHE_KEY", "")
 
-llm_model: OpenAIChatCompletionsModel = OpenAIChatCompletionsModel(
-    model="gemini-2.0-flash",
-    openai_client=external_client
-)
+prompt_meter = PromptMeter()
+
+
+def build_client(base_url=GEMINI_BASE_URL, meter=prompt_meter) -> AsyncOpenAI:
+    """Client whose connection pool is shared by every agent run in this process"""
+    return AsyncOpenAI(
+        api_key=gemini_api_key,
+        base_url=base_url,
+        http_client=DefaultAsyncHttpxClient(event_hooks={
+            "request": [meter.record, profiling.model_request_started],
+            "response": [profiling.model_response_received],
+        }),
+    )
+
+
+def build_model(client: AsyncOpenAI) -> OpenAIChatCompletionsModel:
+    return OpenAIChatCompletionsModel(model=GEMINI_MODEL, openai_client=client)
+
+
+external_client: AsyncOpenAI = build_client()
+
+llm_model: OpenAIChatCompletionsModel = build_model(external_client)
 
 logger = logging.getLogger(__name__)
 
@@ -51,42 +80,20 @@ class product_information(BaseModel):
 @function_tool
 def extract_product_info(wrapper: RunContextWrapper[product_information], user_input: str):
     """Extract product information from user input only when user explicitly wants to add a product"""
-    user_lower = user_input.lower()
-    
+    parsed = parse_product_text(user_input)
+
     # Only process if user explicitly mentions adding/creating a product
-    if any(keyword in user_lower for keyword in ["add product", "create product", "new product", "make product"]):
-        # Extract name
-        if "name:" in user_lower or "called" in user_lower:
-            lines = user_input.split('\n')
-            for line in lines:
-                if "name:" in line.lower():
-                    wrapper.context.product_name = line.split("name:")[-1].strip()
-                elif "called" in line.lower():
-                    words = line.split()
-                    if "called" in words:
-                        idx = words.index("called")
-                        if idx + 1 < len(words):
-                            wrapper.context.product_name = words[idx + 1]
-        
-        # Extract price
-        if "$" in user_input:
-            import re
-            price_match = re.search(r'\$(\d+(?:\.\d{2})?)', user_input)
-            if price_match:
-                wrapper.context.product_price = price_match.group(1)
-        
-        # Extract description
-        if "description:" in user_lower:
-            lines = user_input.split('\n')
-            for line in lines:
-                if "description:" in line.lower():
-                    wrapper.context.product_description = line.split("description:")[-1].strip()
-        
+    if parsed.is_add:
+        for field in ("product_id", "product_name", "product_price", "product_description"):
+            value = getattr(parsed, field)
+            if value:
+                setattr(wrapper.context, field, value)
+
         # Set is_add to True only if user explicitly requested product creation
         wrapper.context.is_add = True
-        
+
         return f"Product information extracted from your request. Name: {wrapper.context.product_name}, Price: ${wrapper.context.product_price}, Description: {wrapper.context.product_description}"
-    
+
     return "I can help you add products. Please say 'add product' or 'create product' and provide the details."
 
 @function_tool
@@ -120,40 +127,84 @@ def confirm_product_creation(wrapper: RunContextWrapper[product_information]):
 # ===============================
 # Agents
 # ===============================
-product_add_agent = Agent(
-    name="product_manager_agent",
-    instructions="""
-    You are a product manager assistant. You ONLY create products when users explicitly ask you to add/create products.
-    
-    Rules:
-    1. NEVER automatically create products
-    2. ONLY extract product info when user says "add product", "create product", "new product", or similar
-    3. Ask for missing information politely
-    4. Confirm with user before proceeding
-    5. Be helpful but don't assume what the user wants
-    
-    If user just asks questions or chats normally, respond helpfully but don't try to create products.
-    """,
-    tools=[extract_product_info, get_missing_info, confirm_product_creation],
-    model=llm_model,
-)
+TOOLS = [extract_product_info, get_missing_info, confirm_product_creation]
+
+# Built once; Runner would otherwise rebuild the JSON schema on every run
+PRODUCT_OUTPUT_SCHEMA = AgentOutputSchema(product_information)
+
+
+def model_settings() -> ModelSettings:
+    if PROMPT_CACHE_KEY:
+        return ModelSettings(extra_args={"prompt_cache_key": PROMPT_CACHE_KEY})
+    return ModelSettings()
+
+
+def build_agents(model: OpenAIChatCompletionsModel):
+    """The two agents behind ``process_user_query``, sharing one model and static prompts"""
+    add_agent = Agent(
+        name="product_manager_agent",
+        instructions=PRODUCT_AGENT_INSTRUCTIONS,
+        tools=TOOLS,
+        model=model,
+        model_settings=model_settings(),
+    )
+    extractor = Agent(
+        name="output_extractor",
+        instructions=OUTPUT_EXTRACTOR_INSTRUCTIONS,
+        output_type=PRODUCT_OUTPUT_SCHEMA,
+        model=model,
+        model_settings=model_settings(),
+    )
+    return add_agent, extractor
+
+
+product_add_agent, output_extractor = build_agents(llm_model)
+
+
+def reset_client(base_url=GEMINI_BASE_URL):
+    """Give this process its own client and agents.
+
+    A forked agent worker inherits its parent's client, whose pooled
+    connections belong to the parent; it calls this before serving.
+    """
+    global external_client, llm_model, product_add_agent, output_extractor
+    external_client = build_client(base_url)
+    llm_model = build_model(external_client)
+    product_add_agent, output_extractor = build_agents(llm_model)
+
+
+async def warmup(client: AsyncOpenAI | None = None, timeout: float = 5.0):
+    """Open the model connection before the first agent run.
+
+    Meant to run once per process on the event loop that will serve agent
+    runs, so the pooled connection is reusable. Connection failures are
+    logged, not raised: a cold first request is better than a worker that
+    will not start.
+    """
+    try:
+        await asyncio.wait_for((client or external_client).models.list(), timeout)
+    except Exception as e:
+        logger.warning("Agent warmup could not reach the model endpoint: %s", e)
+        return False
+    return True
 
-output_extractor = Agent(
-    name="output_extractor",
-    instructions="Extract the product information from the conversation context. Only set is_add=True if user explicitly requested product creation.",
-    output_type=product_information,
-    model=llm_model,
-)
 
 async def process_user_query(user_message: str):
+    # Well-formed "add product" requests are answered without the model
+    parsed = parse_product_text(user_message)
+    if parsed.confidence >= DIRECT_PARSE_CONFIDENCE and price_error(Decimal(parsed.product_price)) is None:
+        return parsed.as_response()
+
     try:
         shared_context = product_information()
         
         # Run the main agent to process user input
-        agent_response = await Runner.run(product_add_agent, user_message, context=shared_context)
+        with profiling.llm_span(f"agent {product_add_agent.name}"):
+            agent_response = await Runner.run(product_add_agent, user_message, context=shared_context)
 
         # Extract all collected data
-        output_response = await Runner.run(output_extractor, f"User said: {user_message}\nAgent response: {agent_response.final_output}", context=shared_context)
+        with profiling.llm_span(f"agent {output_extractor.name}"):
+            output_response = await Runner.run(output_extractor, extractor_input(user_message, agent_response.final_output), context=shared_context)
         data = output_response.final_output
 
         # Always return dict
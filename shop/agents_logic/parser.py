@@ -0,0 +1,230 @@
+"""
+Single-pass parser for "add product" requests written in free text.
+
+All patterns are compiled once at import. ``parse_product_text`` walks the
+message with one combined regex and returns a ``ParsedProduct`` with a
+confidence score; when it is at least ``DIRECT_PARSE_CONFIDENCE`` the
+agent service can answer without calling the model at all. Only plain
+imperative requests ("add product called ...") can score that high:
+questions, negations and messages that merely mention a new product are
+left to the model.
+"""
+import re
+from dataclasses import dataclass
+
+# Confidence at which process_user_query skips both model calls
+DIRECT_PARSE_CONFIDENCE = 0.8
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "₹": "INR", "¥": "JPY"}
+# How as_response shows a price; currencies without a symbol use their code
+CURRENCY_PREFIXES = {"USD": "$", "EUR": "€", "GBP": "£", "INR": "₹", "JPY": "¥"}
+CURRENCY_WORDS = {
+    "usd": "USD", "dollar": "USD", "dollars": "USD",
+    "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "gbp": "GBP", "pound": "GBP", "pounds": "GBP",
+    "inr": "INR", "pkr": "PKR", "rs": "PKR", "rs.": "PKR", "rupee": "PKR", "rupees": "PKR",
+}
+
+_CURRENCY_WORD = r"usd|eur|gbp|inr|pkr|rs\.?|dollars?|euros?|pounds?|rupees?"
+_MAGNITUDE = r"k|m|mn|b|bn|thousand|million|billion|lakhs?|crores?|grand"
+# An amount ends where the number does: not before more digits (no backtracking
+# "$25k" into "$2"), a magnitude ("5k", "2.5 million") or any letter that does
+# not start a currency word. Those amounts never match, so they cannot be a
+# confident price.
+_AMOUNT = (
+    r"-?(?:\d{1,3}(?:[,.\u00a0 ]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)"
+    r"(?![.,\u00a0 ]?\d)(?!\s*(?:" + _MAGNITUDE + r")\b)(?!(?!" + _CURRENCY_WORD + r")[a-z])"
+)
+
+INTENT_RE = re.compile(r"\b(?:add|create|new|make)\s+(?:a\s+|an\s+|new\s+)?product\b", re.I)
+# The same intent as the opening words of the message, e.g. not "do you have a new product ..."
+IMPERATIVE_RE = re.compile(
+    r"^\s*(?:(?:hi|hello|hey)\b[\s,!]*)?(?:please\s+)?(?:add|create|new|make)\s+(?:a\s+|an\s+|new\s+)?product\b",
+    re.I,
+)
+NEGATION_RE = re.compile(r"\b(?:not|never|cancel|dont|do not)\b|n['’]t\b", re.I)
+
+LABELS = {
+    "name": "name",
+    "title": "name",
+    "price": "price",
+    "cost": "price",
+    "description": "description",
+    "desc": "description",
+    "details": "description",
+    "id": "product_id",
+    "product id": "product_id",
+    "sku": "product_id",
+}
+
+LABEL_SEPARATOR_RE = re.compile(r"[\s_-]+")
+
+# One scan finds labelled fields, "called X" names and currency amounts
+TOKEN_RE = re.compile(
+    r"""
+    (?P<label>\b(?:product[\s_-]?id|name|title|price|cost|description|desc|details|id|sku))\s*[:=]\s*
+        (?P<value>"[^"\n]*"|'[^'\n]*'|[^\n;|]*?)
+        (?=\s*(?:[\n;|]|,\s*(?:product[\s_-]?id|name|title|price|cost|description|desc|details|id|sku)\s*[:=]|$))
+    |
+    \b(?:called|named)\s+(?P<called>"[^"\n]+"|'[^'\n]+'|.+?)
+        (?=\s+(?:for|at|priced|costing|with|which|that)\b|\s*[,.;\n]|\s*[$€£₹¥]|$)
+    |
+    (?P<price>
+        (?P<sym>[$€£₹¥])\s*(?P<amount1>""" + _AMOUNT + r""")
+      | \b(?P<word1>""" + _CURRENCY_WORD + r""")\s*(?P<amount2>""" + _AMOUNT + r""")\b
+      | (?P<amount3>""" + _AMOUNT + r""")\s*(?P<word2>""" + _CURRENCY_WORD + r""")(?![a-z])
+    )
+    """,
+    re.I | re.X,
+)
+
+PRICE_VALUE_RE = re.compile(
+    r"(?P<sym>[$€£₹¥])?\s*(?P<amount>" + _AMOUNT + r")\s*(?P<word>" + _CURRENCY_WORD + r")?",
+    re.I,
+)
+
+
+@dataclass
+class ParsedProduct:
+    is_add: bool = False
+    product_id: str = ""
+    product_name: str = ""
+    product_price: str = ""
+    currency: str = ""
+    product_description: str = ""
+    confidence: float = 0.0
+
+    def price_display(self):
+        currency = self.currency or "USD"
+        prefix = CURRENCY_PREFIXES.get(currency, f"{currency} ")
+        return f"{prefix}{self.product_price}"
+
+    def as_response(self):
+        """Same dict shape ``process_user_query`` returns after the model calls"""
+        return {
+            "is_add": self.is_add,
+            "product_id": self.product_id or None,
+            "product_name": self.product_name or None,
+            "product_price": self.product_price or None,
+            "product_description": self.product_description or None,
+            "product_image": None,
+            "agent_message": (
+                f"Product ready: {self.product_name} - {self.price_display()}. "
+                f"Description: {self.product_description or 'No description'}"
+            ),
+        }
+
+
+# ==========================================================
+# Prices
+# ==========================================================
+def normalize_amount(raw):
+    """'1,299.99' / '1.299,99' / '1 299' / '-5' -> '1299.99' / '1299.99' / '1299.00' / '-5.00'"""
+    raw = raw.replace("\u00a0", "").replace(" ", "")
+    sign = "-" if raw.startswith("-") else ""
+    raw = raw.lstrip("-")
+    last_dot, last_comma = raw.rfind("."), raw.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal_sep = "." if last_dot > last_comma else ","
+    elif last_comma >= 0 or last_dot >= 0:
+        sep = "," if last_comma >= 0 else "."
+        # A single separator followed by 1-2 digits is a decimal point
+        decimal_sep = sep if raw.count(sep) == 1 and len(raw) - raw.rfind(sep) - 1 <= 2 else None
+    else:
+        decimal_sep = None
+
+    if decimal_sep:
+        whole, _, fraction = raw.rpartition(decimal_sep)
+    else:
+        whole, fraction = raw, ""
+    whole = whole.replace(",", "").replace(".", "")
+    return f"{sign}{int(whole or 0)}.{fraction.ljust(2, '0')[:2]}"
+
+
+def _currency(symbol, word):
+    if symbol:
+        return CURRENCY_SYMBOLS[symbol]
+    if word:
+        return CURRENCY_WORDS.get(word.lower(), "")
+    return ""
+
+
+def parse_price(text):
+    """Parse a price value on its own, e.g. the right-hand side of 'price: 1,299 PKR'"""
+    match = PRICE_VALUE_RE.search(text)
+    if not match:
+        return "", ""
+    return normalize_amount(match.group("amount")), _currency(match.group("sym"), match.group("word"))
+
+
+# ==========================================================
+# Parser
+# ==========================================================
+def _strip_quotes(value):
+    value = value.strip().rstrip(".,")
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        value = value[1:-1]
+    return value.strip()
+
+
+def parse_product_text(text):
+    """Extract product fields from ``text`` in one pass over the input"""
+    result = ParsedProduct(is_add=bool(INTENT_RE.search(text)))
+    if not result.is_add:
+        return result
+
+    name_labelled = price_labelled = False
+    prices = 0
+    for match in TOKEN_RE.finditer(text):
+        label = match.group("label")
+        if label:
+            field = LABELS[LABEL_SEPARATOR_RE.sub(" ", label.lower())]
+            value = _strip_quotes(match.group("value"))
+            if not value:
+                continue
+            if field == "name":
+                result.product_name, name_labelled = value, True
+            elif field == "price":
+                amount, currency = parse_price(value)
+                if amount:
+                    prices += 1
+                    result.product_price, price_labelled = amount, True
+                    result.currency = currency or result.currency
+            elif field == "description":
+                result.product_description = value
+            elif field == "product_id":
+                result.product_id = value[:20]
+        elif match.group("called"):
+            if not name_labelled:
+                result.product_name = _strip_quotes(match.group("called"))
+        elif match.group("price"):
+            prices += 1
+            if price_labelled or result.product_price:
+                continue
+            amount = match.group("amount1") or match.group("amount2") or match.group("amount3")
+            result.product_price = normalize_amount(amount)
+            result.currency = _currency(match.group("sym"), match.group("word1") or match.group("word2"))
+
+    # With a second price ("$10, actually make it $20") the model picks the right one
+    result.confidence = _confidence(result, name_labelled, _is_plain_request(text) and prices == 1)
+    return result
+
+
+def _is_plain_request(text):
+    """An imperative add request, not a question or a negated one"""
+    return bool(IMPERATIVE_RE.match(text)) and "?" not in text and not NEGATION_RE.search(text)
+
+
+def _confidence(result, name_labelled, plain_request):
+    score = 0.2  # explicit add/create intent
+    if result.product_name:
+        score += 0.35 if name_labelled else 0.3
+    if result.product_price:
+        score += 0.35
+    if result.product_description:
+        score += 0.1
+    if result.product_id:
+        score += 0.05
+    if not (result.product_name and result.product_price and plain_request):
+        score = min(score, DIRECT_PARSE_CONFIDENCE - 0.05)
+    return round(min(score, 1.0), 2)
@@ -0,0 +1,89 @@
+"""
+Static agent prompts and prompt-size accounting.
+
+Providers with context caching (Gemini implicit caching, OpenAI prompt
+caching) only reuse a prompt prefix that is byte-identical between
+requests. Every chat completion starts with the tool schemas and the
+system message, so those stay constant: instructions live here as
+module-level strings with no per-request data, and anything that
+changes per request goes into the user message after them.
+
+``PromptMeter`` is an httpx request hook that measures what is actually
+sent: bytes per request and how many of them were the cacheable prefix.
+"""
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_AGENT_INSTRUCTIONS = (
+    "You are a product manager assistant. You ONLY create products when users explicitly ask you to "
+    "add/create products.\n"
+    "Rules:\n"
+    "1. NEVER automatically create products\n"
+    "2. ONLY extract product info when user says \"add product\", \"create product\", \"new product\", "
+    "or similar\n"
+    "3. Ask for missing information politely\n"
+    "4. Confirm with user before proceeding\n"
+    "5. Be helpful but don't assume what the user wants\n"
+    "If user just asks questions or chats normally, respond helpfully but don't try to create products."
+)
+
+OUTPUT_EXTRACTOR_INSTRUCTIONS = (
+    "Extract the product information from the conversation context. "
+    "Only set is_add=True if user explicitly requested product creation."
+)
+
+
+def extractor_input(user_message, agent_message):
+    """User turn for ``output_extractor``; fixed labels first, request text last"""
+    return f"User said: {user_message}\nAgent response: {agent_message}"
+
+
+class PromptMeter:
+    """Counts chat completion request bytes and the share taken by the static prefix"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.prompt_bytes = 0
+            self.prefix_bytes = 0
+
+    async def record(self, request):
+        if not request.url.path.endswith("/chat/completions"):
+            return
+        body = request.content
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return
+        prefix = prefix_bytes(payload)
+        with self._lock:
+            self.requests += 1
+            self.prompt_bytes += len(body)
+            self.prefix_bytes += prefix
+        logger.debug("Chat completion request: %d bytes, %d in static prefix", len(body), prefix)
+
+    def snapshot(self):
+        with self._lock:
+            requests = self.requests
+            return {
+                "requests": requests,
+                "prompt_bytes": self.prompt_bytes,
+                "bytes_per_request": round(self.prompt_bytes / requests) if requests else 0,
+                "prefix_share": round(self.prefix_bytes / self.prompt_bytes, 4) if self.prompt_bytes else 0.0,
+            }
+
+
+def prefix_bytes(payload):
+    """Size of the part of a chat completion body that repeats between requests"""
+    messages = payload.get("messages") or []
+    static = [payload.get("tools") or [], payload.get("response_format") or {}]
+    if messages and messages[0].get("role") == "system":
+        static.append(messages[0])
+    return len(json.dumps(static, separators=(",", ":")).encode())
@@ -0,0 +1,311 @@
+"""
+Precomputed replies to templated catalog questions.
+
+"What's your cheapest item?", "How much is the Linen Shirt?" and "What's
+new?" are answered from the ``CatalogAnswer`` table without running the
+agents. ``precomputed_reply`` matches a chat message against a few
+anchored patterns and, on a hit, reads one row by its unique key; a miss
+(anything the patterns do not fully cover, or a product name we do not
+carry) goes to ``process_user_query`` as before.
+
+Rows are materialized from ``Product``: one per ranking (``cheapest``,
+``priciest``, ``newest``) holding the top few products, and one
+``price:<name>`` row per distinct normalized product name. Product
+save/delete signals and ``products_repriced`` refresh only the rows a
+change can affect; bulk writes that bypass signals (``bulk_create``,
+``QuerySet.update``) must call ``rebuild_catalog_answers``.
+"""
+import json
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .agents_logic.parser import INTENT_RE
+from .facets import SORTS
+from .models import CatalogAnswer, Conversation, Product
+from .pricing import CENT, products_repriced
+
+CHEAPEST = "cheapest"
+PRICIEST = "priciest"
+NEWEST = "newest"
+PRICE = "price"
+
+# Ranking answers: ordering and how many products the reply lists
+RANKINGS = {
+    CHEAPEST: (SORTS["price"], 3),
+    PRICIEST: (SORTS["-price"], 3),
+    NEWEST: (SORTS["newest"], 5),
+}
+PRICE_LIST_SIZE = 5  # products listed when several share a name
+
+ENTRY_FIELDS = ("id", "product_id", "name", "price", "created_at")
+
+
+# ==========================================================
+# Question matching
+# ==========================================================
+_ASK = r"(?:(?:what(?:'s| is| are)|whats|which(?: is| are)?|show(?: me)?|tell me|list|give me)\s+)?"
+_DET = r"(?:(?:the|your|our|a|an)\s+)?"
+_THING = r"(?:\s+(?:items?|products?|things?|stuff|pieces?))?"
+_WHERE = r"(?:\s+(?:you (?:have|sell|carry|got)|in (?:the |your )?(?:store|shop|catalog(?:ue)?)|for sale|available))?"
+
+QUESTION_PATTERNS = [
+    (CHEAPEST, re.compile(
+        rf"{_ASK}{_DET}(?:cheapest|least expensive|lowest[- ]priced|most affordable){_THING}{_WHERE}"
+    )),
+    (PRICIEST, re.compile(
+        rf"{_ASK}{_DET}(?:most expensive|priciest|highest[- ]priced){_THING}{_WHERE}"
+    )),
+    (NEWEST, re.compile(
+        rf"(?:(?:what(?:'s| is)|whats|any(?:thing)?) new|{_ASK}{_DET}(?:newest|latest|new|recent(?:ly added)?))"
+        r"(?:\s+(?:items?|products?|arrivals?|additions?|stuff|in))?"
+        rf"(?:\s+(?:this week|today|lately|recently)|{_WHERE})?"
+    )),
+    (PRICE, re.compile(
+        r"(?:(?:what(?:'s| is) the |whats the )?(?:price|cost) (?:of|for) |how much (?:is|are|does|do|for) )"
+        rf"{_DET}(?P<name>.+?)(?:\s+(?:cost|costs|go for|sell for))?"
+    )),
+]
+
+_POLITE_RE = re.compile(r"^(?:(?:hi|hello|hey)\b[\s,!]*)?(?:please\s+)?|(?:\s*,?\s*please)?[\s?!.]*$")
+_NAME_RE = re.compile(r"[\W_]+")
+_ARTICLE_RE = re.compile(r"^(?:the|a|an) ")
+
+
+def normalize_question(message):
+    return _POLITE_RE.sub("", " ".join(message.lower().split()))
+
+
+def name_key(name):
+    """Lowercased name with punctuation and a leading article dropped"""
+    return _ARTICLE_RE.sub("", " ".join(_NAME_RE.sub(" ", name.lower()).split()))
+
+
+def price_key(name):
+    return f"{PRICE}:{name_key(name)}"[:CatalogAnswer._meta.get_field("key").max_length]
+
+
+def match_question(message):
+    """``(template, key)`` for a templated catalog question, else None"""
+    if INTENT_RE.search(message):
+        return None  # add/create requests belong to the parser and the agents
+    question = normalize_question(message)
+    for template, pattern in QUESTION_PATTERNS:
+        match = pattern.fullmatch(question)
+        if match:
+            if template == PRICE:
+                return template, price_key(match.group("name"))
+            return template, template
+    return None
+
+
+# ==========================================================
+# Rendering
+# ==========================================================
+def product_entry(pk, product_id, name, price, created_at):
+    return {
+        "id": pk,
+        "product_id": product_id,
+        "name": name,
+        "price": str(Decimal(str(price)).quantize(CENT)),
+        "created_at": created_at.isoformat(),
+    }
+
+
+def _entry_for(instance):
+    return product_entry(instance.pk, instance.product_id, instance.name, instance.price, instance.created_at)
+
+
+def _listing(entries):
+    return ", ".join(f"{e['name']} (${e['price']})" for e in entries)
+
+
+def render_answer(template, entries):
+    if not entries:
+        return "We don't have any products in the catalog yet."
+    first, rest = entries[0], entries[1:]
+    if template == CHEAPEST:
+        message = f"Our cheapest item is {first['name']} at ${first['price']}."
+        return message + (f" Also low-priced: {_listing(rest)}." if rest else "")
+    if template == PRICIEST:
+        message = f"Our most expensive item is {first['name']} at ${first['price']}."
+        return message + (f" Also at the top of the range: {_listing(rest)}." if rest else "")
+    if template == NEWEST:
+        return f"Our latest additions: {_listing(entries)}."
+    if len(entries) == 1:
+        return f"{first['name']} costs ${first['price']}."
+    shown = ", ".join(f"${e['price']} (ID {e['product_id']})" for e in entries[:PRICE_LIST_SIZE])
+    more = len(entries) - PRICE_LIST_SIZE
+    return f"We have {len(entries)} products called {first['name']}: {shown}" + (
+        f" and {more} more." if more > 0 else "."
+    )
+
+
+def _save_answer(key, template, entries, stored):
+    """Write ``entries`` under ``key`` unless they equal the ``stored`` ones (None: no row yet)"""
+    if entries == stored:
+        return
+    values = {"entries": entries, "message": render_answer(template, entries), "updated_at": timezone.now()}
+    if stored is None:
+        CatalogAnswer.objects.create(key=key, **values)
+    else:
+        CatalogAnswer.objects.filter(key=key).update(**values)
+
+
+# ==========================================================
+# Incremental maintenance
+# ==========================================================
+def ranked_entries(template):
+    ordering, size = RANKINGS[template]
+    return [
+        product_entry(*row)
+        for row in Product.objects.order_by(*ordering).values_list(*ENTRY_FIELDS)[:size]
+    ]
+
+
+def _sort_value(template, entry):
+    if template == NEWEST:
+        return parse_datetime(entry["created_at"])
+    return Decimal(entry["price"])
+
+
+def _may_rank(template, entries, entry):
+    """Whether ``entry`` can enter the stored top list; ties count as yes"""
+    _, size = RANKINGS[template]
+    if len(entries) < size:
+        return True
+    last, value = _sort_value(template, entries[-1]), _sort_value(template, entry)
+    return value >= last if template in (PRICIEST, NEWEST) else value <= last
+
+
+def refresh_rankings(changed=(), removed=()):
+    """Re-read the rankings that ``changed`` entries or ``removed`` pks can affect"""
+    removed = set(removed) | {e["id"] for e in changed}
+    stored = dict(
+        CatalogAnswer.objects.filter(key__in=list(RANKINGS)).values_list("key", "entries")
+    )
+    for template in RANKINGS:
+        entries = stored.get(template)
+        if entries is None or any(e["id"] in removed for e in entries) or any(
+            _may_rank(template, entries, e) for e in changed
+        ):
+            _save_answer(template, template, ranked_entries(template), entries)
+
+
+def update_price_answers(changed=(), removed=()):
+    """Move ``changed`` entries into their name's row and drop ``removed`` ``(pk, key)`` pairs"""
+    edits = {}
+    for pk, key in removed:
+        edits.setdefault(key, {})[pk] = None
+    for entry in changed:
+        edits.setdefault(price_key(entry["name"]), {})[entry["id"]] = entry
+
+    stored = dict(CatalogAnswer.objects.filter(key__in=list(edits)).values_list("key", "entries"))
+    for key, by_pk in edits.items():
+        entries = [e for e in stored.get(key, []) if e["id"] not in by_pk]
+        entries.extend(e for e in by_pk.values() if e is not None)
+        entries.sort(key=lambda e: (Decimal(e["price"]), e["id"]))
+        if entries:
+            _save_answer(key, PRICE, entries, stored.get(key))
+        elif key in stored:
+            CatalogAnswer.objects.filter(key=key).delete()
+
+
+@receiver(pre_save, sender=Product)
+def remember_old_name(sender, instance, raw=False, **kwargs):
+    instance._old_answer_key = None
+    if raw or instance.pk is None:
+        return
+    old = Product.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+    if old is not None:
+        instance._old_answer_key = price_key(old)
+
+
+@receiver(post_save, sender=Product)
+def update_answers_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {"name", "price", "created_at"} & set(update_fields)):
+        return
+    entry = _entry_for(instance)
+    old_key = getattr(instance, "_old_answer_key", None)
+    with transaction.atomic():
+        update_price_answers(
+            changed=[entry],
+            removed=[(instance.pk, old_key)] if old_key and old_key != price_key(instance.name) else [],
+        )
+        refresh_rankings(changed=[entry])
+
+
+@receiver(post_delete, sender=Product)
+def update_answers_on_delete(sender, instance, **kwargs):
+    with transaction.atomic():
+        update_price_answers(removed=[(instance.pk, price_key(instance.name))])
+        refresh_rankings(removed=[instance.pk])
+
+
+@receiver(products_repriced)
+def update_answers_on_reprice(sender, changes, **kwargs):
+    """Refresh the price rows and rankings touched by one bulk repricing chunk"""
+    pks = [pk for pk, _, _ in changes]
+    changed = [product_entry(*row) for row in Product.objects.filter(pk__in=pks).values_list(*ENTRY_FIELDS)]
+    update_price_answers(changed=changed)
+    refresh_rankings(changed=changed)
+
+
+def rebuild_catalog_answers(batch_size=5000):
+    """Recompute every answer from scratch; run after bulk writes"""
+    by_key = {}
+    for row in Product.objects.order_by("price", "id").values_list(*ENTRY_FIELDS).iterator(chunk_size=batch_size):
+        by_key.setdefault(price_key(row[2]), []).append(product_entry(*row))
+
+    rows = [CatalogAnswer(key=t, entries=e, message=render_answer(t, e))
+            for t, e in ((t, ranked_entries(t)) for t in RANKINGS)]
+    rows.extend(CatalogAnswer(key=key, entries=entries, message=render_answer(PRICE, entries))
+                for key, entries in by_key.items())
+
+    with transaction.atomic():
+        CatalogAnswer.objects.all().delete()
+        CatalogAnswer.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+# ==========================================================
+# Serving
+# ==========================================================
+def lookup_answer(message):
+    """``(template, CatalogAnswer)`` for a message we can answer without the agents"""
+    matched = match_question(message)
+    if matched is None:
+        return None
+    template, key = matched
+    answer = CatalogAnswer.objects.filter(key=key).first()
+    return (template, answer) if answer is not None else None
+
+
+def precomputed_reply(user_message, session_id):
+    """The ``/chat/`` payload for a precomputed answer, logged like an agent reply; None on a miss"""
+    found = lookup_answer(user_message)
+    if found is None:
+        return None
+    template, answer = found
+    agent_response = {"is_add": False, "agent_message": answer.message, "precomputed": template}
+    Conversation.objects.create(
+        user_message=user_message,
+        agent_response=json.dumps(agent_response),
+        session_id=session_id,
+    )
+    return {
+        "success": True,
+        "agent_message": answer.message,
+        "is_add": False,
+        "product_id": None,
+        "product_name": None,
+        "product_price": None,
+        "product_description": None,
+        "trigger_upload": False,
+        "precomputed": template,
+    }
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ShopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shop'
+
+    def ready(self):
+        from . import facets  # noqa: F401  (connects the facet count signals)
+        from . import answers  # noqa: F401  (connects the catalog answer signals)
+        from . import profiling
+        profiling.connect_sql_hook()
@@ -0,0 +1,368 @@
+"""
+Static asset build and serving.
+
+``collectstatic`` with ``ShopStaticFilesStorage`` minifies the shop's CSS
+and JS, stores every file under a content-hashed name (see
+``ManifestStaticFilesStorage``) and writes ``.gz`` and, when the
+``brotli`` package is installed, ``.br`` siblings next to each text
+asset. The hash changes whenever the content does, so hashed files never
+need revalidating.
+
+``AssetMiddleware`` serves ``STATIC_ROOT`` and ``MEDIA_ROOT`` ahead of
+the URL resolver: precompressed variants picked by ``Accept-Encoding``,
+``Cache-Control: immutable`` for hashed names, ``Last-Modified`` and 304s
+for the rest. It works under both WSGI and ASGI, so media no longer
+depends on ``static()`` in the URLconf, which only serves with DEBUG on.
+Uploads keep the name their uploader chose, so media is never served as
+anything a browser would render on our origin: raster image types only,
+otherwise ``application/octet-stream``, always as an attachment with
+``nosniff``.
+"""
+import gzip
+import mimetypes
+import os
+import re
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone covers every browser
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".json", ".map", ".svg", ".txt", ".xml", ".html", ".ico")
+MIN_COMPRESS_SIZE = 256  # below this the encoding headers outweigh the savings
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_MAX_AGE = 60
+MEDIA_MAX_AGE = 3600
+IN_MEMORY_MAX_SIZE = 256 * 1024  # larger files are streamed
+
+# Content types media may be served as; SVG is left out because it can carry script
+MEDIA_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+
+
+# ==========================================================
+# Minification
+# ==========================================================
+CSS_SKIP_RE = re.compile(r"""/\*.*?\*/|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'""", re.S)
+CSS_PLACEHOLDER_RE = re.compile(r"\x00(\d+)\x00")
+
+# A "/" after one of these starts a regex literal rather than a division
+JS_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+JS_REGEX_KEYWORDS = ("return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw")
+
+
+def minify_css(source):
+    """Drop comments and redundant whitespace; strings are left untouched"""
+    strings = []
+
+    def stash(match):
+        if match.group().startswith("/*"):
+            return " "
+        strings.append(match.group())
+        return f"\x00{len(strings) - 1}\x00"
+
+    css = CSS_SKIP_RE.sub(stash, source)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r" ?([{};,>]) ?", r"\1", css)
+    # Only the space after ":" goes; "a :hover" and "a:hover" differ
+    css = re.sub(r"([:(]) ", r"\1", css)
+    css = css.replace(" )", ")").replace(";}", "}")
+    return CSS_PLACEHOLDER_RE.sub(lambda m: strings[int(m.group(1))], css).strip()
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines.
+
+    Line breaks are kept, so automatic semicolon insertion still sees the
+    same statements. Strings, template literals and regex literals are
+    copied verbatim.
+    """
+    out = []
+    i, n = 0, len(source)
+
+    def starts_regex():
+        before = "".join(out[-32:]).rstrip()
+        if not before or before[-1] in JS_REGEX_PRECEDERS:
+            return True
+        word = re.search(r"[\w$]+$", before)
+        return bool(word) and word.group() in JS_REGEX_KEYWORDS
+
+    def newline():
+        while out and out[-1] in (" ", "\t"):
+            out.pop()
+        if out and out[-1] != "\n":
+            out.append("\n")
+
+    while i < n:
+        c = source[i]
+        if c in "\"'`":
+            end = _skip_quoted(source, i)
+            out.append(source[i:end])
+            i = end
+        elif c == "/" and source.startswith("//", i):
+            i = source.find("\n", i)
+            i = n if i < 0 else i
+        elif c == "/" and source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            if "\n" in source[i:end]:
+                newline()
+            elif out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+            i = end
+        elif c == "/" and starts_regex():
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+        elif c == "\n":
+            newline()
+            i += 1
+        elif c in " \t\r":
+            if out and out[-1] not in (" ", "\n"):
+                out.append(" ")
+            i += 1
+        else:
+            out.append(c)
+            i += 1
+    newline()
+    return "".join(out).lstrip("\n")
+
+
+def _skip_quoted(source, start):
+    """Index just past the string or template literal opening at ``start``"""
+    quote = source[start]
+    i = start + 1
+    depth = 0  # ${...} nesting inside template literals
+    while i < len(source):
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if depth:
+            if c in "\"'`":
+                i = _skip_quoted(source, i)
+                continue
+            depth += c == "{"
+            depth -= c == "}"
+        elif quote == "`" and source.startswith("${", i):
+            depth = 1
+            i += 1
+        elif c == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(source, start):
+    i = start + 1
+    in_class = False
+    while i < len(source) and source[i] != "\n":
+        c = source[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == "_"):
+                i += 1  # flags
+            return i
+        i += 1
+    return i
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ==========================================================
+# Precompression
+# ==========================================================
+def precompress(path):
+    """Write ``path.gz`` (and ``path.br``) when they come out smaller"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+
+
+# ==========================================================
+# Storage
+# ==========================================================
+class ShopStaticFilesStorage(ManifestStaticFilesStorage):
+    # Only our own sources are minified; third-party apps ship theirs as they are
+    minify_prefixes = ("shop/",)
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            yield from super().post_process(paths, dry_run, **options)
+            return
+
+        paths = dict(paths)
+        for name in paths:
+            minify = MINIFIERS.get(os.path.splitext(name)[1])
+            if minify and name.startswith(self.minify_prefixes) and ".min." not in name:
+                path = self.path(name)
+                with open(path, encoding="utf-8") as f:
+                    minified = minify(f.read())
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(minified)
+                # Hash the minified copy in STATIC_ROOT, not the source
+                paths[name] = (self, name)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        for name in set(paths) | set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                precompress(self.path(name))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (tests, a fresh checkout): link the plain name
+            return name
+
+
+# ==========================================================
+# Serving
+# ==========================================================
+def accepted_encodings(header):
+    encodings = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        if re.fullmatch(r"\s*q=0(\.0*)?\s*", params):
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def _url_prefix(url):
+    """Path prefix for a local ``*_URL`` setting; None when assets live on another host"""
+    if not url:
+        return None
+    parts = urlsplit(url)
+    if parts.netloc:
+        return None
+    return "/" + parts.path.strip("/") + "/"
+
+
+class AssetMiddleware:
+    """Serve collected static files and uploaded media before URL routing"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+        self.roots = []
+        static_prefix = _url_prefix(settings.STATIC_URL)
+        if static_prefix and settings.STATIC_ROOT:
+            self.roots.append((static_prefix, str(settings.STATIC_ROOT), STATIC_MAX_AGE, True))
+        media_prefix = _url_prefix(settings.MEDIA_URL)
+        if media_prefix and settings.MEDIA_ROOT:
+            self.roots.append((media_prefix, str(settings.MEDIA_ROOT), MEDIA_MAX_AGE, False))
+        self.immutable = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        matched = self.match(request)
+        response = self.serve(request, *matched) if matched else None
+        return response if response is not None else self.get_response(request)
+
+    async def __acall__(self, request):
+        matched = self.match(request)
+        # stat() and open() block; only requests under a served root pay for the thread
+        response = await sync_to_async(self.serve, thread_sensitive=False)(request, *matched) if matched else None
+        return response if response is not None else await self.get_response(request)
+
+    def match(self, request):
+        """``(root entry, name)`` when ``request`` asks for a file under a served root"""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        for entry in self.roots:
+            if request.path.startswith(entry[0]):
+                return entry, request.path[len(entry[0]):]
+        return None
+
+    def serve(self, request, entry, name):
+        _, root, max_age, is_static = entry
+        try:
+            path = safe_join(root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        if is_static and name in self.immutable:
+            max_age = None
+        return self.file_response(request, path, max_age, is_static)
+
+    def file_response(self, request, path, max_age, is_static):
+        """``max_age=None`` marks a hashed, never-changing file"""
+        stat = os.stat(path)
+        if max_age is not None and not was_modified_since(
+            request.headers.get("If-Modified-Since"), stat.st_mtime
+        ):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(path)
+            if not is_static and content_type not in MEDIA_CONTENT_TYPES:
+                content_type = None
+            content_type = content_type or "application/octet-stream"
+            if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+                content_type += "; charset=utf-8"
+
+            encoding, served = None, path
+            if is_static:
+                accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+                for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                    if coding in accepted and os.path.isfile(path + suffix):
+                        encoding, served = coding, path + suffix
+                        break
+
+            size = os.path.getsize(served)
+            if request.method == "HEAD":
+                response = HttpResponse(content_type=content_type)
+            elif size <= IN_MEMORY_MAX_SIZE:
+                with open(served, "rb") as f:
+                    response = HttpResponse(f.read(), content_type=content_type)
+            else:
+                response = FileResponse(open(served, "rb"), content_type=content_type, filename=os.path.basename(path))
+            response["Content-Length"] = str(size)
+            if encoding:
+                response["Content-Encoding"] = encoding
+            if is_static and path.endswith(COMPRESSIBLE_EXTENSIONS):
+                response["Vary"] = "Accept-Encoding"
+            if not is_static:
+                response["Content-Disposition"] = "attachment"
+
+        response["X-Content-Type-Options"] = "nosniff"
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        if max_age is None:
+            response["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            response["Cache-Control"] = f"public, max-age={max_age}"
+        return response
@@ -0,0 +1,126 @@
+"""
+Benchmark suite for the shop endpoints.
+
+Seeds a synthetic catalog, drives every route in ``shop/urls.py`` through
+the Django test client and an in-process ASGI client (with the LLM stubbed
+out) and records query counts, latency percentiles and memory high-water
+marks. Run it with ``python manage.py bench``.
+
+The focused ``bench_*`` commands build on ``BenchmarkCommand`` and the
+measurement helpers below; their modules hold only the scenarios.
+"""
+import math
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shop.benchmarks.db import benchmark_database
+from shop.benchmarks.report import build_report, save_report
+from shop.benchmarks.seed import seed_products
+from shop.models import Product
+
+
+# ==========================================================
+# Measurement
+# ==========================================================
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_percentiles(timings_ms, pcts=(50, 99), digits=3, prefix=""):
+    """``{"p50_ms": ..., "p99_ms": ...}`` for millisecond timings in any order"""
+    ordered = sorted(timings_ms)
+    return {f"{prefix}p{pct}_ms": round(percentile(ordered, pct), digits) for pct in pcts}
+
+
+@contextmanager
+def counting_queries():
+    """Yield a list that grows by one per query run inside the block
+
+    A wrapper rather than ``CaptureQueriesContext``: the debug query log is
+    capped at 9000 entries.
+    """
+    executed = []
+
+    def count(execute, sql, params, many, context):
+        executed.append(1)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield executed
+
+
+def timed(func):
+    """``(result, seconds, queries)`` for one call of ``func``"""
+    with counting_queries() as executed:
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+    return result, elapsed, len(executed)
+
+
+# ==========================================================
+# Commands
+# ==========================================================
+class BenchmarkCommand(BaseCommand):
+    """Shared options and flow of the ``bench_*`` commands
+
+    Subclasses add their own options in ``add_benchmark_arguments`` and
+    return results keyed ``area:case`` from ``run``. With ``rows`` set the
+    command takes ``--rows`` and calls ``seed`` when the throwaway database
+    has no ``seeds`` yet; with ``database = False`` it runs outside one.
+    The options named in ``report_meta`` are recorded in the ``--output``
+    report.
+    """
+    rows = None
+    rows_help = None
+    seeds = "products"
+    database = True
+    report_meta = ("rows",)
+
+    def add_arguments(self, parser):
+        if self.rows is not None:
+            what = self.rows_help or f"{self.seeds.capitalize()} to seed"
+            parser.add_argument("--rows", type=int, default=self.rows, help=f"{what} (default {self.rows:,})")
+        self.add_benchmark_arguments(parser)
+        parser.add_argument("--output", help="Write the JSON report to this path")
+        if self.database:
+            parser.add_argument("--keepdb", action="store_true",
+                                help="Keep the benchmark database between runs to skip reseeding")
+
+    def add_benchmark_arguments(self, parser):
+        pass
+
+    def handle(self, *args, **options):
+        if self.database:
+            with benchmark_database(options["keepdb"]):
+                if self.rows is not None and not self.seeded():
+                    self.stdout.write(f"Seeding {options['rows']} {self.seeds}...")
+                    self.seed(options)
+                results = self.run(options)
+        else:
+            results = self.run(options)
+
+        if options["output"]:
+            meta = {key: options[key] for key in self.report_meta}
+            path = save_report(build_report(results, **meta), options["output"])
+            self.stdout.write(self.style.SUCCESS(f"Report written to {path}"))
+        self.verify_results(results)
+
+    def seeded(self):
+        return Product.objects.exists()
+
+    def seed(self, options):
+        seed_products(options["rows"])
+
+    def run(self, options):
+        raise NotImplementedError
+
+    def verify_results(self, results):
+        """Raise ``CommandError`` for results that should fail the run"""
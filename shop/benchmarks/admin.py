@@ -0,0 +1,85 @@
+"""
+Conversation changelist load times with the stock and the tuned admin.
+
+``StockConversationAdmin`` is ``ConversationAdmin`` as it was before
+the tuning, plus Django's own ``date_hierarchy`` so drilldown can be
+compared: LIKE search, full ``COUNT(*)`` pagination, whole text columns
+loaded for the snippets. Both admins render the same changelist URLs
+through ``changelist_view`` as a superuser.
+"""
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django.utils import timezone
+
+from shop.admin import ConversationAdmin
+from shop.benchmarks import timed
+from shop.models import Conversation
+
+
+class StockConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'timestamp', 'session_id', 'user_message_snippet', 'agent_response_snippet')
+    list_filter = ('timestamp',)
+    search_fields = ('user_message', 'agent_response', 'session_id')
+    ordering = ('-timestamp',)
+    date_hierarchy = 'timestamp'
+    change_list_template = 'admin/change_list.html'
+
+    def user_message_snippet(self, obj):
+        return obj.user_message[:50] + "..." if len(obj.user_message) > 50 else obj.user_message
+
+    def agent_response_snippet(self, obj):
+        return obj.agent_response[:50] + "..." if len(obj.agent_response) > 50 else obj.agent_response
+
+
+ADMINS = {
+    "stock": StockConversationAdmin,
+    "tuned": ConversationAdmin,
+}
+
+
+def scenarios():
+    latest = timezone.localtime(Conversation.objects.latest("timestamp").timestamp)
+    # Halfway through, but never past the last page: that redirects with ?e=1
+    deep_page = min(2000, max(1, Conversation.objects.count() // ConversationAdmin.list_per_page // 2))
+    return {
+        "first_page": {},
+        "deep_page": {"p": str(deep_page)},
+        # Every seeded message is one of five, so word searches are unselective
+        "search_common": {"q": "denim jacket"},
+        "search_missing": {"q": "velvet"},
+        "search_session": {"q": "bench-session-7"},
+        "drilldown_month": {"timestamp__year": str(latest.year), "timestamp__month": str(latest.month)},
+        "drilldown_day": {
+            "timestamp__year": str(latest.year),
+            "timestamp__month": str(latest.month),
+            "timestamp__day": str(latest.day),
+        },
+    }
+
+
+def load_changelist(model_admin, user, params):
+    request = RequestFactory().get("/admin/shop/conversation/", params)
+    request.user = user
+    response = model_admin.changelist_view(request)
+    response.render()
+    if response.status_code != 200:
+        raise RuntimeError(f"changelist returned {response.status_code} for {params}")
+    return response
+
+
+def run_admin_benchmark(repeat=3, only=None, stdout=None):
+    user = User.objects.filter(is_superuser=True).first() or User.objects.create_superuser("bench-admin")
+    site = admin.AdminSite(name="bench")
+    results = {}
+    for scenario, params in scenarios().items():
+        if only and scenario not in only:
+            continue
+        for name, admin_class in ADMINS.items():
+            model_admin = admin_class(Conversation, site)
+            timings = [timed(lambda: load_changelist(model_admin, user, params))[1:] for _ in range(repeat)]
+            best, queries = min(timings)
+            results[f"admin:{name}:{scenario}"] = r = {"ms": round(best * 1000, 1), "queries": queries}
+            if stdout is not None:
+                stdout.write(f"{name:<6} {scenario:<16} {r['ms']:>10.1f} ms  queries={queries}")
+    return results
@@ -0,0 +1,112 @@
+"""
+Cold start, steady-state latency and prompt size of ``process_user_query``.
+
+Runs the real agents against ``StubModelServer`` twice: once set up the
+way ``agent_service`` used to be (indented instructions, output schema
+rebuilt per run, no warmup) and once as it is now (static prompts,
+prebuilt schema, ``warmup`` before the first request). Each path gets a
+fresh client and a fresh server, so connection setup and prefix caching
+start cold for both.
+"""
+import asyncio
+import time
+from unittest import mock
+
+from agents import Agent
+
+from shop.agents_logic import agent_service
+from shop.agents_logic.prompts import OUTPUT_EXTRACTOR_INSTRUCTIONS, PromptMeter
+from shop.benchmarks import latency_percentiles
+from shop.benchmarks.seed import ADJECTIVES, ITEMS
+from shop.benchmarks.stub_server import StubModelServer
+
+# product_add_agent's instructions before they were moved to prompts.py
+LEGACY_PRODUCT_AGENT_INSTRUCTIONS = """
+    You are a product manager assistant. You ONLY create products when users explicitly ask you to add/create products.
+
+    Rules:
+    1. NEVER automatically create products
+    2. ONLY extract product info when user says "add product", "create product", "new product", or similar
+    3. Ask for missing information politely
+    4. Confirm with user before proceeding
+    5. Be helpful but don't assume what the user wants
+
+    If user just asks questions or chats normally, respond helpfully but don't try to create products.
+    """
+
+
+def legacy_agents(model):
+    add_agent = Agent(
+        name="product_manager_agent",
+        instructions=LEGACY_PRODUCT_AGENT_INSTRUCTIONS,
+        tools=agent_service.TOOLS,
+        model=model,
+    )
+    extractor = Agent(
+        name="output_extractor",
+        instructions=OUTPUT_EXTRACTOR_INSTRUCTIONS,
+        output_type=agent_service.product_information,
+        model=model,
+    )
+    return add_agent, extractor
+
+
+def questions(count):
+    """Chat messages the direct parser hands to the model"""
+    return [
+        f"do you have a {ADJECTIVES[i % len(ADJECTIVES)].lower()} {ITEMS[i % len(ITEMS)].lower()} in stock?"
+        for i in range(count)
+    ]
+
+
+async def _run_path(base_url, build_agents, warm, messages):
+    meter = PromptMeter()
+    client = agent_service.build_client(base_url, meter=meter)
+    add_agent, extractor = build_agents(agent_service.build_model(client))
+
+    started = time.perf_counter()
+    if warm:
+        await agent_service.warmup(client)
+    warmup_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    with mock.patch.multiple(agent_service, product_add_agent=add_agent, output_extractor=extractor):
+        for message in messages:
+            started = time.perf_counter()
+            response = await agent_service.process_user_query(message)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if "error" in response:
+                raise RuntimeError(response["error"])
+    await client.close()
+    return warmup_ms, latencies, meter.snapshot()
+
+
+def run_agent_benchmark(requests=50, connect_delay=0.05, per_kb_delay=0.002, stdout=None):
+    paths = {
+        "agent:legacy": (legacy_agents, False),
+        "agent:warm": (agent_service.build_agents, True),
+    }
+    messages = questions(requests)
+    results = {}
+    for name, (build_agents, warm) in paths.items():
+        with StubModelServer(connect_delay=connect_delay, per_kb_delay=per_kb_delay) as server:
+            warmup_ms, latencies, meter = asyncio.run(_run_path(server.base_url, build_agents, warm, messages))
+            served = server.stats()
+
+        steady = latencies[1:] or latencies
+        results[name] = r = {
+            "warmup_ms": round(warmup_ms, 2),
+            "first_request_ms": round(latencies[0], 2),
+            **latency_percentiles(steady, (50, 90), digits=2),
+            "bytes_per_request": meter["bytes_per_request"],
+            "prefix_share": meter["prefix_share"],
+            "cached_share": served["cached_share"],
+            "connections": served["connections"],
+        }
+        if stdout is not None:
+            stdout.write(
+                f"{name:<13} first={r['first_request_ms']:>7.1f}ms p50={r['p50_ms']:>6.1f}ms "
+                f"p90={r['p90_ms']:>6.1f}ms {r['bytes_per_request']:>5} B/req "
+                f"cached={r['cached_share']:.0%} connections={r['connections']}"
+            )
+    return results
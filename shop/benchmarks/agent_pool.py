@@ -0,0 +1,69 @@
+"""
+Agent throughput as the worker pool grows.
+
+Starts ``WorkerPool`` with 1, 2, 4 and 8 processes in turn, all pointed
+at one ``StubModelServer`` that answers each completion after a fixed
+``latency``, and drives ``requests`` chat questions through
+``AgentPoolClient`` with ``in_flight`` of them outstanding at a time.
+The agents, tools, output schema and JSON handling are the real ones;
+only the model is stubbed, so the work being spread over processes is
+the orchestration CPU the pool exists to take off the job worker.
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from shop.agent_pool import AgentPoolClient, WorkerPool
+from shop.benchmarks.agent import questions
+from shop.benchmarks import latency_percentiles
+from shop.benchmarks.stub_server import StubModelServer
+
+PROCESS_COUNTS = (1, 2, 4, 8)
+
+
+async def _drive(path, messages, in_flight):
+    client = AgentPoolClient(path)
+    # One round trip per worker first, so connection setup is not timed
+    await asyncio.gather(*(client.request("ping") for _ in range(in_flight)))
+
+    gate = asyncio.Semaphore(in_flight)
+    latencies, errors = [], 0
+
+    async def one(message):
+        nonlocal errors
+        async with gate:
+            started = time.perf_counter()
+            response = await client.query(message)
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += "error" in response
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(m) for m in messages))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return elapsed, latencies, errors
+
+
+def run_pool_benchmark(process_counts=PROCESS_COUNTS, requests=400, in_flight=64, concurrency=32,
+                       latency=0.05, stdout=None):
+    messages = questions(requests)
+    results = {}
+    with StubModelServer(connect_delay=0, per_kb_delay=0, latency=latency) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "agents.sock")
+        for processes in process_counts:
+            with WorkerPool(path, processes, concurrency, base_url=server.base_url):
+                elapsed, latencies, errors = asyncio.run(_drive(path, messages, in_flight))
+            results[f"agent_pool:{processes}"] = r = {
+                "processes": processes,
+                "requests_per_s": round(requests / elapsed, 1),
+                **latency_percentiles(latencies, (50, 90), digits=1),
+                "errors": errors,
+            }
+            if stdout is not None:
+                stdout.write(
+                    f"{processes} process(es) {r['requests_per_s']:>8.1f} req/s "
+                    f"p50={r['p50_ms']:>7.1f}ms p90={r['p90_ms']:>7.1f}ms errors={errors}"
+                )
+    return results
@@ -0,0 +1,200 @@
+"""
+Hit rate and latency of precomputed catalog answers against the agents.
+
+A chat traffic sample mixes the templated questions ``shop.answers``
+targets (cheapest, most expensive, what's new, price of a product we
+carry) with near misses it must leave alone (qualified questions such as
+"cheapest jackets", prices of products we do not carry) and ordinary
+chat and add-product messages. Each message is labelled with what it
+asks, so the hit rate is reported per label as well as overall.
+
+``precomputed`` times ``/chat/`` answering the hits in process; that is
+the whole request, including the logged ``Conversation``. ``llm`` times
+``process_user_query`` for the same questions against ``StubModelServer``
+with ``model_latency`` seconds per completion, which leaves out the job
+queue and client polling the real path adds on top. ``refresh`` times a
+product save with and without the answer signal handlers connected.
+"""
+import asyncio
+import json
+import random
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.test import Client
+
+from shop import answers
+from shop.answers import lookup_answer, rebuild_catalog_answers
+from shop.benchmarks.agent import questions
+from shop.benchmarks import counting_queries, latency_percentiles
+from shop.benchmarks.seed import ADJECTIVES, ITEMS
+from shop.benchmarks.stub_server import StubModelServer
+from shop.benchmarks.stubs import unlimited_chat
+from shop.models import Product
+
+TEMPLATED = {
+    "cheapest": [
+        "What's your cheapest item?", "cheapest product", "Show me the cheapest items you have",
+        "which is the least expensive product?", "most affordable thing in the store?",
+    ],
+    "priciest": [
+        "What is the most expensive item?", "priciest product you sell", "show me your highest-priced items",
+    ],
+    "newest": [
+        "What's new?", "What is new this week?", "Show me the latest products", "any new arrivals?",
+        "newest items in the shop", "anything new?",
+    ],
+}
+PRICE_TEMPLATES = [
+    "How much is the {}?", "What's the price of {}?", "price of the {}", "how much does the {} cost?",
+    "what is the cost of {}",
+]
+NEAR_MISSES = [
+    "Show me your cheapest jackets", "what's the cheapest linen shirt?", "Is anything new in denim?",
+    "which jacket is the most expensive one for winter?",
+]
+MIX = {"cheapest": 10, "priciest": 4, "newest": 10, "price": 20, "price_unknown": 6,
+       "near_miss": 10, "chat": 30, "add": 10}
+
+
+def chat_traffic(count, names, seed=39):
+    """``count`` ``(label, message)`` pairs in the proportions of ``MIX``"""
+    rng = random.Random(seed)
+    labels = rng.choices(list(MIX), weights=list(MIX.values()), k=count)
+    chat = questions(64)
+    traffic = []
+    for label in labels:
+        if label in TEMPLATED:
+            message = rng.choice(TEMPLATED[label])
+        elif label == "price":
+            message = rng.choice(PRICE_TEMPLATES).format(rng.choice(names))
+        elif label == "price_unknown":
+            message = rng.choice(PRICE_TEMPLATES).format(f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} Deluxe")
+        elif label == "near_miss":
+            message = rng.choice(NEAR_MISSES)
+        elif label == "add":
+            message = f"add product called {rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} for ${rng.randint(5, 300)}"
+        else:
+            message = rng.choice(chat)
+        traffic.append((label, message))
+    return traffic
+
+
+def measure_hits(traffic):
+    client = Client()
+    hits, latencies = {}, []
+    with unlimited_chat():
+        for label, message in traffic:
+            started = time.perf_counter()
+            response = client.post("/chat/", json.dumps({"message": message}), content_type="application/json")
+            elapsed = (time.perf_counter() - started) * 1000
+            hit = response.status_code == 200
+            if hit:
+                latencies.append(elapsed)
+            total, served = hits.get(label, (0, 0))
+            hits[label] = (total + 1, served + hit)
+    return hits, latencies
+
+
+async def _llm_latencies(base_url, messages):
+    from shop.agents_logic import agent_service
+
+    client = agent_service.build_client(base_url)
+    add_agent, extractor = agent_service.build_agents(agent_service.build_model(client))
+    await agent_service.warmup(client)
+    latencies = []
+    with mock.patch.multiple(agent_service, product_add_agent=add_agent, output_extractor=extractor):
+        for message in messages:
+            started = time.perf_counter()
+            response = await agent_service.process_user_query(message)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if "error" in response:
+                raise RuntimeError(response["error"])
+    await client.close()
+    return latencies
+
+
+def measure_refresh(saves):
+    """Milliseconds and queries per product save, with and without answer maintenance"""
+    products = list(Product.objects.order_by("?")[:saves])
+    receivers = [
+        (pre_save, answers.remember_old_name),
+        (post_save, answers.update_answers_on_save),
+        (post_delete, answers.update_answers_on_delete),
+    ]
+    results = {}
+    for mode in ("with_answers", "without_answers"):
+        if mode == "without_answers":
+            for signal, handler in receivers:
+                signal.disconnect(handler, sender=Product)
+        timings = []
+        try:
+            with counting_queries() as executed:
+                for product in products:
+                    product.price += Decimal("0.01")
+                    started = time.perf_counter()
+                    product.save()
+                    timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            if mode == "without_answers":
+                for signal, handler in receivers:
+                    signal.connect(handler, sender=Product)
+        results[mode] = {**latency_percentiles(timings, (50,)),
+                         "queries_per_save": round(len(executed) / len(products), 2)}
+    # The saves above skipped maintenance for half their writes
+    rebuild_catalog_answers()
+    return results
+
+
+def run_answers_benchmark(requests=1000, llm_requests=20, model_latency=0.4, saves=200, stdout=None):
+    started = time.perf_counter()
+    rows = rebuild_catalog_answers()
+    rebuild_ms = (time.perf_counter() - started) * 1000
+    names = list(Product.objects.order_by("?").values_list("name", flat=True)[:500])
+
+    traffic = chat_traffic(requests, names)
+    hits, precomputed = measure_hits(traffic)
+    answered = [m for _, m in traffic if lookup_answer(m)]
+    with StubModelServer(latency=model_latency) as server:
+        llm = asyncio.run(_llm_latencies(server.base_url, answered[:llm_requests]))
+    refresh = measure_refresh(min(saves, Product.objects.count()))
+
+    served = sum(s for _, s in hits.values())
+    results = {
+        "answers:hit_rate": {
+            "requests": requests,
+            "hit_rate": round(served / requests, 3),
+            "by_label": {label: round(s / t, 3) for label, (t, s) in sorted(hits.items())},
+        },
+        "answers:precomputed": {
+            "requests": len(precomputed),
+            **latency_percentiles(precomputed),
+        },
+        "answers:llm": {
+            "requests": len(llm),
+            "model_latency_s": model_latency,
+            **latency_percentiles(llm, digits=1),
+        },
+        "answers:refresh": {
+            "answers": rows,
+            "rebuild_ms": round(rebuild_ms, 1),
+            **{f"{mode}_{k}": v for mode, r in refresh.items() for k, v in r.items()},
+        },
+    }
+    if stdout is not None:
+        r = results["answers:hit_rate"]
+        stdout.write(f"hit rate     {r['hit_rate']:.1%} of {requests} messages")
+        for label, rate in r["by_label"].items():
+            stdout.write(f"  {label:<14} {rate:.1%}")
+        for name in ("precomputed", "llm"):
+            r = results[f"answers:{name}"]
+            stdout.write(f"{name:<12} p50={r['p50_ms']:>9.3f}ms p99={r['p99_ms']:>9.3f}ms ({r['requests']} requests)")
+        r = results["answers:refresh"]
+        stdout.write(
+            f"refresh      rebuild {r['answers']} answers in {r['rebuild_ms']:.0f}ms; save p50 "
+            f"{r['with_answers_p50_ms']:.3f}ms/{r['with_answers_queries_per_save']} queries with answers, "
+            f"{r['without_answers_p50_ms']:.3f}ms/{r['without_answers_queries_per_save']} without"
+        )
+    return results
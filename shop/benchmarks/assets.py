@@ -0,0 +1,128 @@
+"""
+Page weight and repeat-visit bytes with and without the asset pipeline.
+
+``inline`` rebuilds the old layout: each page's own CSS and JS inlined
+into the HTML, the shared stylesheets and script collected under plain
+names and served by ``django.views.static.serve``, which sends
+``Last-Modified`` but no ``Cache-Control`` and no compression, so a
+repeat visit re-downloads the HTML and revalidates every asset.
+
+``pipeline`` runs ``collectstatic`` with ``ShopStaticFilesStorage`` and
+fetches through ``AssetMiddleware`` with ``Accept-Encoding: br, gzip``.
+Hashed assets are ``immutable``, so a repeat visit only fetches the HTML.
+
+Only assets served by this app are counted; the CDN stylesheets and
+scripts are the same in both modes.
+"""
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import Client, RequestFactory, override_settings
+from django.views.static import serve
+
+from shop.assets import IMMUTABLE_MAX_AGE
+
+PAGES = {
+    "index": "/",
+    "product_by_ai": "/product-by-ai/",
+    "create_product": "/create-product/",
+    "choose_creation": "/choose-creation/",
+}
+ASSET_RE = re.compile(r'<(link|script)\b[^>]*?(?:href|src)="(/static/([^"]+))"[^>]*>(?:</script>)?')
+PLAIN_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def _inline(html, page, static_root):
+    """The page as it was: its own CSS and JS in <style>/<script> blocks"""
+    def replace(match):
+        tag, _, name = match.groups()
+        if name not in (f"shop/css/{page}.css", f"shop/js/{page}.js"):
+            return match.group()
+        with open(os.path.join(static_root, name), encoding="utf-8") as f:
+            source = f.read()
+        return f"<style>\n{source}</style>" if tag == "link" else f"<script>\n{source}</script>"
+    return ASSET_RE.sub(replace, html)
+
+
+def measure_inline(static_root):
+    results = {}
+    factory = RequestFactory()
+    client = Client()
+    for page, url in PAGES.items():
+        html = _inline(client.get(url).content.decode(), page, static_root)
+        first = {"requests": 1, "bytes": len(html.encode())}
+        repeat = dict(first)
+        for match in ASSET_RE.finditer(html):
+            name = match.group(3)
+            response = serve(factory.get(match.group(2)), name, document_root=static_root)
+            first["requests"] += 1
+            first["bytes"] += sum(len(chunk) for chunk in response.streaming_content)
+            # A browser holds Last-Modified and revalidates on the next visit
+            revalidated = serve(
+                factory.get(match.group(2), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]),
+                name, document_root=static_root,
+            )
+            repeat["requests"] += 1
+            repeat["bytes"] += 0 if revalidated.status_code == 304 else int(revalidated["Content-Length"])
+        results[page] = {"html_bytes": len(html.encode()), "first": first, "repeat": repeat}
+    return results
+
+
+def measure_pipeline():
+    results = {}
+    client = Client(HTTP_ACCEPT_ENCODING="br, gzip")
+    for page, url in PAGES.items():
+        html = client.get(url).content
+        first = {"requests": 1, "bytes": len(html)}
+        repeat = dict(first)
+        for match in ASSET_RE.finditer(html.decode()):
+            response = client.get(match.group(2))
+            if response.status_code != 200:
+                raise RuntimeError(f"{match.group(2)} returned {response.status_code}")
+            first["requests"] += 1
+            first["bytes"] += len(response.content)
+            if f"max-age={IMMUTABLE_MAX_AGE}, immutable" in response["Cache-Control"]:
+                continue
+            revalidated = client.get(match.group(2), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+            repeat["requests"] += 1
+            repeat["bytes"] += len(revalidated.content)
+        results[page] = {"html_bytes": len(html), "first": first, "repeat": repeat}
+    return results
+
+
+def run_assets_benchmark(stdout=None):
+    static_root = tempfile.mkdtemp(prefix="bench-static-")
+    try:
+        with override_settings(DEBUG=False, STATIC_ROOT=static_root, STORAGES=PLAIN_STORAGES):
+            call_command("collectstatic", interactive=False, verbosity=0, clear=True)
+            inline = measure_inline(static_root)
+        with override_settings(DEBUG=False, STATIC_ROOT=static_root):
+            call_command("collectstatic", interactive=False, verbosity=0, clear=True)
+            pipeline = measure_pipeline()
+    finally:
+        shutil.rmtree(static_root, ignore_errors=True)
+
+    results = {}
+    for page in PAGES:
+        for mode, measured in (("inline", inline), ("pipeline", pipeline)):
+            m = measured[page]
+            results[f"assets:{mode}:{page}"] = r = {
+                "html_bytes": m["html_bytes"],
+                "first_visit_bytes": m["first"]["bytes"],
+                "first_visit_requests": m["first"]["requests"],
+                "repeat_visit_bytes": m["repeat"]["bytes"],
+                "repeat_visit_requests": m["repeat"]["requests"],
+            }
+            if stdout is not None:
+                stdout.write(
+                    f"{mode:<8} {page:<16} html={r['html_bytes']:>7} B  "
+                    f"first={r['first_visit_bytes']:>7} B/{r['first_visit_requests']} req  "
+                    f"repeat={r['repeat_visit_bytes']:>7} B/{r['repeat_visit_requests']} req"
+                )
+    return results
@@ -0,0 +1,64 @@
+import json
+import time
+
+from django.db.models import Count, Q
+from django.test import Client
+
+from shop.benchmarks import latency_percentiles
+from shop.benchmarks.runner import drain
+from shop.facets import CREATED_WINDOWS, PRICE_BANDS, facet_counts, no_image_q, price_band_q, window_start
+from shop.models import Product
+
+
+def live_facet_counts():
+    """The same facet menu computed with one aggregate query over the catalog"""
+    aggregates = {}
+    for key, low, high in PRICE_BANDS:
+        aggregates[f"price:{key}"] = Count("id", filter=price_band_q(low, high))
+    for key, days in CREATED_WINDOWS.items():
+        aggregates[f"created:{key}"] = Count("id", filter=Q(created_at__gte=window_start(days)))
+    aggregates["has_image:no"] = Count("id", filter=no_image_q())
+    aggregates["total"] = Count("id")
+
+    row = Product.objects.order_by().aggregate(**aggregates)
+    result = {"price": {}, "created": {}, "has_image": {}}
+    for name, value in row.items():
+        if name == "total":
+            continue
+        dimension, key = name.split(":")
+        result[dimension][key] = value
+    result["has_image"]["yes"] = row["total"] - row["has_image:no"]
+    return result
+
+
+# A narrow filter, so the endpoint timing is not all product serialization
+ENDPOINT_FILTER = {"price_band": ["500+"], "has_image": "yes", "created_within": "7d", "sort": "newest"}
+
+
+def filter_products_endpoint(client):
+    """The whole /api/filter-products/ request: filtering, products and facet menu"""
+    def request():
+        drain(client.post("/api/filter-products/", json.dumps(ENDPOINT_FILTER), content_type="application/json"))
+    return request
+
+
+FACET_SOURCES = {
+    "aggregate_table": facet_counts,
+    "live_group_by": live_facet_counts,
+}
+
+
+def run_facet_benchmark(iterations=20, stdout=None):
+    results = {}
+    sources = dict(FACET_SOURCES, filter_endpoint=filter_products_endpoint(Client()))
+    for name, source in sources.items():
+        source()  # warm caches
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            source()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[f"facets:{name}"] = r = {"iterations": iterations, **latency_percentiles(timings)}
+        if stdout is not None:
+            stdout.write(f"{name:<16} p50={r['p50_ms']:>10.3f}ms p99={r['p99_ms']:>10.3f}ms")
+    return results
@@ -0,0 +1,189 @@
+"""
+Polling load on the chat history endpoint from many idle clients.
+
+Each simulated client has its own session and some history. A writer
+adds conversations to random sessions at a steady rate while every
+client keeps up with its own entries, in one of three ways:
+
+``legacy``
+    the old ``/history/`` view, polled on an interval: the global latest
+    10 conversations with their full ``agent_response``, every time.
+``etag``
+    ``/history/`` polled on the same interval with ``If-None-Match``;
+    unchanged history is a bodyless 304.
+``longpoll``
+    ``/history/?after=<cursor>&wait=25`` re-issued as soon as it answers;
+    a request is held until the session gets something new.
+
+Requests, response bytes, SQL queries and the delay between a write and
+its owner receiving it are reported per mode. Views are called in-process
+on one event loop, so the numbers are server work, not network time.
+"""
+import asyncio
+import json
+import random
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import JsonResponse
+from django.test import AsyncRequestFactory
+
+from shop import history
+from shop.benchmarks import counting_queries, latency_percentiles
+from shop.models import Conversation
+from shop.views import chat_history
+
+MODES = ("legacy", "etag", "longpoll")
+
+
+def legacy_chat_history(request):
+    """``chat_history`` as it was: the last 10 conversations of every session"""
+    try:
+        conversations = Conversation.objects.all()[:10]
+        history = [{
+            "id": conv.id,
+            "user_message": conv.user_message,
+            "agent_response": conv.agent_response,
+            "timestamp": conv.timestamp.isoformat(),
+        } for conv in conversations]
+        return JsonResponse({"history": history})
+    except Exception:
+        return JsonResponse({"history": []})
+
+
+def seed_sessions(clients, entries_per_client):
+    """``clients`` stored sessions, each with ``entries_per_client`` conversations"""
+    keys = []
+    for _ in range(clients):
+        session = SessionStore()
+        session.create()
+        keys.append(session.session_key)
+    reply = json.dumps({"is_add": False, "agent_message": "Here are a few jackets you might like. " * 4})
+    Conversation.objects.bulk_create(
+        [Conversation(user_message=f"question {i}", agent_response=reply, session_id=key)
+         for key in keys for i in range(entries_per_client)],
+        batch_size=1000,
+    )
+    return keys
+
+
+class SimulatedClient:
+    factory = AsyncRequestFactory()
+
+    def __init__(self, session_key, mode, stats):
+        self.session_key = session_key
+        self.mode = mode
+        self.stats = stats
+        self.after = None
+        self.etag = None
+        self.seen = set()
+
+    async def request(self, params):
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        request = self.factory.get("/history/", params, headers=headers)
+        request.session = SessionStore(self.session_key)
+        if self.mode == "legacy":
+            response = await sync_to_async(legacy_chat_history)(request)
+        else:
+            response = await chat_history(request)
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(response.content)
+        self.stats["not_modified"] += response.status_code == 304
+        return response
+
+    def receive(self, ids, written):
+        now = time.perf_counter()
+        for pk in ids:
+            if pk in written and pk not in self.seen:
+                owner, at = written[pk]
+                if owner == self.session_key:
+                    self.seen.add(pk)
+                    self.stats["delays"].append(now - at)
+
+    async def poll(self, interval, deadline, written):
+        await asyncio.sleep(random.random() * interval)
+        while time.perf_counter() < deadline:
+            if self.mode == "legacy":
+                response = await self.request({})
+                self.receive([e["id"] for e in json.loads(response.content)["history"]], written)
+            else:
+                await self.fetch({}, written, follow=False)
+            await asyncio.sleep(interval)
+
+    async def long_poll(self, deadline, written):
+        while time.perf_counter() < deadline:
+            await self.fetch({"wait": history.MAX_WAIT}, written)
+
+    async def fetch(self, params, written, follow=True):
+        if follow and self.after:
+            params["after"] = self.after
+        response = await self.request(params)
+        if response.status_code == 200:
+            page = json.loads(response.content)
+            self.after = page["after"] or self.after
+            self.etag = response["ETag"]
+            self.receive([e["id"] for e in page["items"]], written)
+
+
+async def _writer(keys, rate, deadline, written):
+    create = sync_to_async(Conversation.objects.create)
+    while time.perf_counter() < deadline:
+        key = random.choice(keys)
+        conversation = await create(user_message="new question", agent_response="{}", session_id=key)
+        written[conversation.id] = (key, time.perf_counter())
+        await asyncio.sleep(1 / rate)
+
+
+async def _run_mode(mode, keys, duration, interval, write_rate, executed):
+    stats = {"requests": 0, "bytes": 0, "not_modified": 0, "delays": []}
+    written = {}
+    clients = [SimulatedClient(key, mode, stats) for key in keys]
+    # Prime cursors and ETags the way a freshly loaded page would
+    if mode != "legacy":
+        for client in clients:
+            await client.fetch({}, written)
+        stats.update(requests=0, bytes=0, not_modified=0)
+        executed.clear()
+
+    started = time.perf_counter()
+    deadline = started + duration
+    if mode == "longpoll":
+        polls = [asyncio.ensure_future(c.long_poll(deadline, written)) for c in clients]
+    else:
+        polls = [asyncio.ensure_future(c.poll(interval, deadline, written)) for c in clients]
+    await _writer(keys, write_rate, deadline, written)
+    # Give the last writes time to reach their clients
+    await asyncio.sleep(max(interval, history.POLL_INTERVAL) * 2)
+    for poll in polls:
+        poll.cancel()
+    await asyncio.gather(*polls, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    delays = [delay * 1000 for delay in stats["delays"]]
+    return {
+        "requests_per_s": round(stats["requests"] / elapsed, 1),
+        "queries_per_s": round(len(executed) / elapsed, 1),
+        "kb_per_s": round(stats["bytes"] / elapsed / 1024, 1),
+        "not_modified": stats["not_modified"],
+        "writes": len(written),
+        "delivered": len(delays),
+        **latency_percentiles(delays, (50, 95), digits=1, prefix="delay_"),
+    }
+
+
+def run_history_benchmark(clients=1000, duration=10.0, interval=1.0, write_rate=20, modes=MODES, stdout=None):
+    random.seed(36)
+    keys = seed_sessions(clients, entries_per_client=20)
+    results = {}
+    for mode in modes:
+        with counting_queries() as executed:
+            r = async_to_sync(_run_mode)(mode, keys, duration, interval, write_rate, executed)
+        results[f"history:{mode}"] = r
+        if stdout is not None:
+            stdout.write(
+                f"{mode:<9} {r['requests_per_s']:>8.1f} req/s {r['kb_per_s']:>9.1f} KB/s "
+                f"{r['queries_per_s']:>8.1f} queries/s  delivered {r['delivered']}/{r['writes']} "
+                f"p50={r['delay_p50_ms']} ms p95={r['delay_p95_ms']} ms"
+            )
+    return results
@@ -0,0 +1,211 @@
+"""
+Labelled corpus and fuzz inputs for ``shop.agents_logic.parser``.
+
+``build_corpus`` renders product requests from phrasing templates and
+price formats with known answers; ``fuzz_inputs`` produces random noise
+that must never crash the parser. ``legacy_extract`` is the keyword
+extractor the parser replaced, kept so accuracy can be compared.
+"""
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from shop.agents_logic.parser import DIRECT_PARSE_CONFIDENCE, parse_product_text
+from shop.benchmarks.seed import ADJECTIVES, ITEMS
+
+# (rendered price text, expected normalized price)
+PRICE_FORMATS = [
+    ("${amount}", "{plain}"),
+    ("$ {amount}", "{plain}"),
+    ("{thousands} USD", "{plain}"),
+    ("€{thousands}", "{plain}"),
+    ("{euro_style} EUR", "{plain}"),
+    ("£{amount}", "{plain}"),
+    ("Rs. {thousands}", "{plain}"),
+    ("{amount} dollars", "{plain}"),
+]
+
+TEMPLATES = [
+    "add product called {name} for {price}",
+    "Please create product named \"{name}\" priced at {price}",
+    "add product\nname: {name}\nprice: {price}\ndescription: {description}",
+    "new product name: {name}, price: {price}, description: {description}",
+    "make product called '{name}' at {price} with description: {description}",
+    "create a product\nsku: {product_id}\nname: {name}\nprice: {price}",
+]
+
+NEGATIVES = [
+    "what is the cheapest jacket?",
+    "show me products under $50",
+    "how much is the {name}?",
+    "do you have {name} in stock",
+]
+
+
+# Requests whose price the parser must not be sure of: magnitudes and corrections
+AMBIGUOUS = [
+    "add product called {name} for ${whole}k",
+    "add product called {name} for ${whole}.5 million",
+    "add product called {name} for {whole} thousand dollars",
+    "add product called {name} for €{whole}bn",
+    "add product called {name} for ${whole}, actually make it ${other}",
+]
+
+
+@dataclass
+class Case:
+    text: str
+    expected: dict
+
+
+def _price_strings(rng):
+    whole = rng.randint(1, 25000)
+    cents = rng.randint(0, 99)
+    amount = f"{whole}.{cents:02d}"
+    thousands = f"{whole:,}.{cents:02d}"
+    euro_style = f"{whole:,}".replace(",", ".") + f",{cents:02d}"
+    return {"amount": amount, "thousands": thousands, "euro_style": euro_style, "plain": amount}
+
+
+def build_corpus(count=2000, seed=0):
+    rng = random.Random(seed)
+    cases = []
+    for i in range(count):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)}"
+        if i % 10 == 9:
+            text = rng.choice(NEGATIVES).format(name=name)
+            cases.append(Case(text, {"is_add": False}))
+            continue
+        if i % 10 == 8:
+            text = rng.choice(AMBIGUOUS).format(name=name, whole=rng.randint(1, 99), other=rng.randint(100, 999))
+            cases.append(Case(text, {"is_add": True, "product_name": name, "direct": False}))
+            continue
+
+        parts = _price_strings(rng)
+        price_format, expected_price = rng.choice(PRICE_FORMATS)
+        template = rng.choice(TEMPLATES)
+        values = {
+            "name": name,
+            "price": price_format.format(**parts),
+            "description": f"{name.lower()} in {rng.choice(['navy', 'sand', 'black', 'olive'])}",
+            "product_id": f"SKU{i:05d}",
+        }
+        expected = {"is_add": True, "product_name": name, "product_price": expected_price.format(**parts)}
+        if "{description}" in template:
+            expected["product_description"] = values["description"]
+        if "{product_id}" in template:
+            expected["product_id"] = values["product_id"]
+        cases.append(Case(template.format(**values), expected))
+    return cases
+
+
+def fuzz_inputs(count=2000, seed=0):
+    rng = random.Random(seed)
+    alphabet = "add product called name: price: description: $€£₹ 0123456789.,;:\n\"'xyz"
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200))) for _ in range(count)]
+
+
+# ==========================================================
+# Legacy extractor (pre-parser behaviour of extract_product_info)
+# ==========================================================
+def legacy_extract(user_input):
+    result = {"is_add": False, "product_name": "", "product_price": "", "product_description": ""}
+    user_lower = user_input.lower()
+    if any(keyword in user_lower for keyword in ["add product", "create product", "new product", "make product"]):
+        if "name:" in user_lower or "called" in user_lower:
+            for line in user_input.split('\n'):
+                if "name:" in line.lower():
+                    result["product_name"] = line.split("name:")[-1].strip()
+                elif "called" in line.lower():
+                    words = line.split()
+                    if "called" in words:
+                        idx = words.index("called")
+                        if idx + 1 < len(words):
+                            result["product_name"] = words[idx + 1]
+        if "$" in user_input:
+            price_match = re.search(r'\$(\d+(?:\.\d{2})?)', user_input)
+            if price_match:
+                result["product_price"] = price_match.group(1)
+        if "description:" in user_lower:
+            for line in user_input.split('\n'):
+                if "description:" in line.lower():
+                    result["product_description"] = line.split("description:")[-1].strip()
+        result["is_add"] = True
+    return result
+
+
+def _modern_extract(text):
+    parsed = parse_product_text(text)
+    return {
+        "is_add": parsed.is_add,
+        "product_name": parsed.product_name,
+        "product_price": parsed.product_price,
+        "product_description": parsed.product_description,
+        "product_id": parsed.product_id,
+        "direct": parsed.confidence >= DIRECT_PARSE_CONFIDENCE,
+    }
+
+
+EXTRACTORS = {
+    "parser": _modern_extract,
+    "legacy": legacy_extract,
+}
+
+
+# ==========================================================
+# Scoring
+# ==========================================================
+def score(extract, cases):
+    """Share of cases where every expected field came out exactly right"""
+    exact = 0
+    fields_total = fields_right = 0
+    for case in cases:
+        got = extract(case.text)
+        matches = [got.get(field) == value for field, value in case.expected.items()]
+        fields_total += len(matches)
+        fields_right += sum(matches)
+        exact += all(matches)
+    return {
+        "case_accuracy": round(exact / len(cases), 4) if cases else 0.0,
+        "field_accuracy": round(fields_right / fields_total, 4) if fields_total else 0.0,
+    }
+
+
+def throughput(extract, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            extract(text)
+        best = min(best, time.perf_counter() - started)
+    return round(len(texts) / best) if best else 0
+
+
+def run_parser_benchmark(cases=2000, fuzz=2000, stdout=None):
+    corpus = build_corpus(cases)
+    noise = fuzz_inputs(fuzz)
+    texts = [case.text for case in corpus]
+
+    crashes = 0
+    for text in noise:
+        try:
+            parse_product_text(text)
+        except Exception:
+            crashes += 1
+
+    results = {}
+    for name, extract in EXTRACTORS.items():
+        results[f"parser:{name}"] = r = {
+            **score(extract, corpus),
+            "messages_per_second": throughput(extract, texts),
+        }
+        if stdout is not None:
+            stdout.write(
+                f"{name:<8} exact={r['case_accuracy']:.1%} fields={r['field_accuracy']:.1%} "
+                f"{r['messages_per_second']:>8} msg/s"
+            )
+    results["parser:parser"]["fuzz_crashes"] = crashes
+    if stdout is not None:
+        stdout.write(f"fuzz: {crashes} crash(es) in {len(noise)} random inputs")
+    return results
@@ -0,0 +1,49 @@
+"""
+Per-row ``save()`` repricing versus ``shop.pricing.reprice``.
+
+Both paths apply the same +10% rule inside a transaction that is rolled
+back, so each sees the same catalog. Queries are counted through an
+execute wrapper because the debug query log is capped.
+"""
+from django.db import transaction
+
+from shop.benchmarks import timed
+from shop.models import Product
+from shop.pricing import PERCENT, PriceRule, reprice
+
+
+def per_row_reprice(rule):
+    """Before: load, change and save() each product, as the admin and chat paths do"""
+    changed = 0
+    # Materialized: updating rows while iterating the price-ordered cursor revisits them
+    for product in list(rule.queryset()):
+        new_price = rule.apply(product.price)
+        if new_price != product.price:
+            product.price = new_price
+            product.save()
+            changed += 1
+    return changed
+
+
+def bulk_reprice(rule):
+    return reprice(rule).changed
+
+
+def run_reprice_benchmark(stdout=None):
+    """Raise then lower every price by 10% with each path, rolled back afterwards"""
+    results = {}
+    paths = {"reprice:per_row": per_row_reprice, "reprice:bulk": bulk_reprice}
+    for name, path in paths.items():
+        with transaction.atomic():
+            changed, elapsed, queries = timed(lambda: path(PriceRule(PERCENT, "10")))
+            transaction.set_rollback(True)
+        results[name] = r = {
+            "rows": Product.objects.count(),
+            "changed": changed,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(changed / elapsed) if elapsed else 0,
+            "queries": queries,
+        }
+        if stdout is not None:
+            stdout.write(f"{name:<18} {r['seconds']:>8.3f}s {r['rows_per_second']:>8} rows/s queries={queries}")
+    return results
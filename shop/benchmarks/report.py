@@ -0,0 +1,67 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.utils import timezone
+
+
+# Latency below this many milliseconds is treated as noise when comparing
+LATENCY_NOISE_MS = 1.0
+
+# Metrics compared against the baseline, and whether they use the threshold
+COMPARED_METRICS = {
+    "p50_ms": True,
+    "p99_ms": True,
+    "peak_alloc_kb": True,
+    "queries": False,  # any extra query is a regression
+}
+
+
+def build_report(results, **meta):
+    """Wrap raw results with enough metadata to compare runs later"""
+    return {
+        "meta": {
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            **meta,
+        },
+        "results": results,
+    }
+
+
+def save_report(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return path
+
+
+def load_report(path):
+    return json.loads(Path(path).read_text())
+
+
+def compare_reports(baseline, current, threshold=0.2):
+    """Return a list of human-readable regressions of ``current`` over ``baseline``"""
+    regressions = []
+    base_results = baseline.get("results", {})
+
+    for key, result in current.get("results", {}).items():
+        base = base_results.get(key)
+        if base is None:
+            continue
+        for metric, uses_threshold in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if uses_threshold:
+                if metric.endswith("_ms") and new - old < LATENCY_NOISE_MS:
+                    continue
+                limit = old * (1 + threshold)
+            else:
+                limit = old
+            if new > limit:
+                regressions.append(f"{key} {metric}: {old} -> {new}")
+
+    return regressions
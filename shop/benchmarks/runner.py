@@ -0,0 +1,239 @@
+import json
+import resource
+import time
+import tracemalloc
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Union
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.benchmarks import latency_percentiles
+from shop.benchmarks.validation import build_rows
+from shop.jobs import enqueue
+from shop.models import Job, Product
+
+
+# 1x1 transparent GIF used for the image upload scenario
+TINY_GIF = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04"
+    b"\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+
+# ==========================================================
+# Scenarios
+# ==========================================================
+@dataclass
+class Scenario:
+    """One request against one route, rebuilt for every iteration"""
+    name: str
+    method: str
+    # A callable path is resolved once per run, when earlier scenarios have run
+    path: Union[str, Callable[[], str]]
+    data: Callable[[], Any] = None
+    content_type: str = None
+    kwargs: dict = field(default_factory=dict)
+    staff: bool = False  # send as a logged-in staff user
+
+    def resolved(self):
+        return replace(self, path=self.path()) if callable(self.path) else self
+
+    def request_kwargs(self):
+        kwargs = dict(self.kwargs)
+        if self.data is not None:
+            kwargs["data"] = self.data()
+        if self.content_type:
+            kwargs["content_type"] = self.content_type
+        return kwargs
+
+
+CHAT_MESSAGE = "add product called Tee for $19.99"
+VALIDATE_BATCH_SIZE = 200
+
+
+def chat_job_status_path():
+    """Status URL of the newest job ``chat_text`` queued, the URL the frontend polls"""
+    token = Job.objects.filter(kind="chat").order_by("-id").values_list("token", flat=True).first()
+    if token is None:  # chat_text did not run (--only)
+        token = enqueue("chat", {"message": CHAT_MESSAGE, "session_id": "bench"}).token
+    return reverse("shop:job_status", args=[token])
+
+
+def default_scenarios():
+    """Build a scenario for every route in ``shop/urls.py``"""
+    sample = Product.objects.order_by("id").values_list("product_id", "name").first()
+    sample_id, sample_name = sample if sample else ("missing", "Shirt")
+    search_word = sample_name.split()[0]
+    validate_rows = build_rows(VALIDATE_BATCH_SIZE)
+
+    return [
+        Scenario("index", "get", "/"),
+        Scenario("chat_text", "post", "/chat/",
+                 data=lambda: json.dumps({"message": CHAT_MESSAGE}),
+                 content_type="application/json"),
+        Scenario("job_status", "get", chat_job_status_path),
+        Scenario("chat_image", "post", "/chat/",
+                 data=lambda: {
+                     "product_id": sample_id,
+                     "image": SimpleUploadedFile("bench.gif", TINY_GIF, content_type="image/gif"),
+                 }),
+        Scenario("choose_creation", "get", "/choose-creation/"),
+        Scenario("product_by_ai", "get", "/product-by-ai/"),
+        Scenario("chat_history", "get", "/history/"),
+        Scenario("create_product_form", "get", "/create-product/"),
+        Scenario("create_product_post", "post", "/create-product/",
+                 data=lambda: {
+                     "product_id": f"P{time.perf_counter_ns() % 10**12}",
+                     "name": "Bench Product",
+                     "price": "12.50",
+                     "description": "Created by the benchmark",
+                 }),
+        Scenario("get_products", "get", "/api/products/"),
+        Scenario("validate_products", "post", "/api/products/validate/",
+                 data=lambda: json.dumps({"products": validate_rows}),
+                 content_type="application/json"),
+        Scenario("reprice_dry_run", "post", "/api/products/reprice/",
+                 data=lambda: json.dumps({"mode": "percent", "value": "10", "dry_run": True}),
+                 content_type="application/json", staff=True),
+        Scenario("filter_products_all", "post", "/api/filter-products/",
+                 data=lambda: json.dumps({"name": "all"}),
+                 content_type="application/json"),
+        Scenario("filter_products_name", "post", "/api/filter-products/",
+                 data=lambda: json.dumps({"name": search_word}),
+                 content_type="application/json"),
+        Scenario("trigger_retrieve", "get", "/trigger-retrieve/"),
+    ]
+
+
+# ==========================================================
+# Drivers
+# ==========================================================
+def drain(response):
+    """Consume streaming bodies so their cost lands inside the measurement"""
+    if response.streaming:
+        response.getvalue()
+    return response
+
+
+async def adrain(response):
+    """``drain`` for ASGI responses, whose streaming bodies may be async iterators"""
+    if response.streaming:
+        async for _ in response:
+            pass
+    return response
+
+
+def staff_user():
+    user, _ = User.objects.get_or_create(username="bench-staff", defaults={"is_staff": True})
+    return user
+
+
+class ClientDriver:
+    """Drive requests through the WSGI test client"""
+    name = "client"
+
+    def __init__(self):
+        self.client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(staff_user())
+
+    def request(self, scenario):
+        client = self.staff_client if scenario.staff else self.client
+        response = getattr(client, scenario.method)(scenario.path, **scenario.request_kwargs())
+        return drain(response)
+
+
+class AsgiDriver:
+    """Drive requests through Django's ASGI handler in-process"""
+    name = "asgi"
+
+    def __init__(self):
+        self.client = AsyncClient()
+        self.staff_client = AsyncClient()
+        self.staff_client.force_login(staff_user())
+
+    async def _request(self, scenario):
+        call = getattr(self.staff_client if scenario.staff else self.client, scenario.method)
+        return await adrain(await call(scenario.path, **scenario.request_kwargs()))
+
+    def request(self, scenario):
+        return async_to_sync(self._request)(scenario)
+
+
+DRIVERS = {
+    ClientDriver.name: ClientDriver,
+    AsgiDriver.name: AsgiDriver,
+}
+
+
+# ==========================================================
+# Measurement
+# ==========================================================
+def max_rss_kb():
+    """Process resident set high-water mark in KiB"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return usage // 1024 if usage > 10**9 else usage
+
+
+def run_scenario(driver, scenario, iterations=20, warmup=1):
+    """Time ``iterations`` requests, then trace one more for memory"""
+    scenario = scenario.resolved()
+    for _ in range(warmup):
+        driver.request(scenario)
+
+    timings = []
+    query_counts = []
+    statuses = set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = driver.request(scenario)
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        statuses.add(response.status_code)
+
+    # Tracing slows every allocation down, so memory gets its own request
+    tracemalloc.start()
+    try:
+        driver.request(scenario)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "status_codes": sorted(statuses),
+        **latency_percentiles(timings, (50, 90, 99)),
+        "mean_ms": round(sum(timings) / len(timings), 3) if timings else 0.0,
+        "max_ms": round(timings[-1], 3) if timings else 0.0,
+        "queries": max(query_counts, default=0),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "max_rss_kb": max_rss_kb(),
+    }
+
+
+def run_suite(driver_names, iterations=20, only=None, stdout=None):
+    """Run every scenario on every driver and return results keyed ``driver:scenario``"""
+    results = {}
+    for driver_name in driver_names:
+        driver = DRIVERS[driver_name]()
+        for scenario in default_scenarios():
+            if only and scenario.name not in only:
+                continue
+            key = f"{driver_name}:{scenario.name}"
+            results[key] = run_scenario(driver, scenario, iterations=iterations)
+            if stdout is not None:
+                r = results[key]
+                stdout.write(
+                    f"{key:<36} p50={r['p50_ms']:>9.2f}ms p99={r['p99_ms']:>9.2f}ms "
+                    f"queries={r['queries']:<5} peak={r['peak_alloc_kb']:.0f}KiB"
+                )
+    return results
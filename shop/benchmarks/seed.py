@@ -0,0 +1,88 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from shop.facets import rebuild_facet_counts
+from shop.models import Conversation, Product
+
+
+# ==========================================================
+# Word lists for synthetic data
+# ==========================================================
+ADJECTIVES = [
+    "Classic", "Slim", "Relaxed", "Vintage", "Premium", "Linen", "Denim",
+    "Cotton", "Wool", "Silk", "Oversized", "Cropped", "Tailored", "Summer",
+]
+ITEMS = [
+    "Shirt", "Jacket", "Dress", "Jeans", "Hoodie", "Sweater", "Skirt",
+    "Blazer", "Coat", "Shorts", "Sneakers", "Boots", "Scarf", "Cap",
+]
+MESSAGES = [
+    "Show me your cheapest jackets",
+    "add product called Tee for $19.99",
+    "What is new this week?",
+    "Do you have linen shirts in stock?",
+    "How much is the denim jacket?",
+]
+
+
+# ==========================================================
+# Generators
+# ==========================================================
+def seed_products(count, batch_size=5000, seed=0, image_every=0):
+    """Bulk insert ``count`` synthetic products and return how many were written
+
+    With ``image_every=n`` every n-th product gets an image path (the file
+    itself is never written; only URL building is exercised).
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    written = 0
+
+    with transaction.atomic():
+        while written < count:
+            size = min(batch_size, count - written)
+            batch = []
+            for i in range(written, written + size):
+                name = f"{rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} {i}"
+                batch.append(Product(
+                    product_id=f"B{i:08d}",
+                    name=name,
+                    price=Decimal(rng.randint(100, 99999)) / 100,
+                    description=f"Synthetic benchmark product {name}",
+                    image=f"products/bench_{i}.jpg" if image_every and i % image_every == 0 else None,
+                    created_at=now - timedelta(minutes=rng.randint(0, 525600)),
+                ))
+            Product.objects.bulk_create(batch, batch_size=batch_size)
+            written += size
+
+    # bulk_create skips the signals that maintain facet counts
+    rebuild_facet_counts()
+    return written
+
+
+def seed_conversations(count, batch_size=5000, seed=0):
+    """Bulk insert ``count`` synthetic conversations spread over a few sessions"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    written = 0
+
+    with transaction.atomic():
+        while written < count:
+            size = min(batch_size, count - written)
+            batch = [
+                Conversation(
+                    user_message=rng.choice(MESSAGES),
+                    agent_response='{"is_add": false, "agent_message": "Synthetic reply"}',
+                    session_id=f"bench-session-{i % 1000}",
+                    timestamp=now - timedelta(seconds=i),
+                )
+                for i in range(written, written + size)
+            ]
+            Conversation.objects.bulk_create(batch, batch_size=batch_size)
+            written += size
+
+    return written
@@ -0,0 +1,100 @@
+import gc
+import time
+import tracemalloc
+
+from asgiref.sync import async_to_sync
+from django.http import JsonResponse
+from django.test import AsyncClient
+
+from shop.benchmarks.runner import max_rss_kb
+from shop.models import Product
+from shop.serializers import PRODUCT_FIELDS_WITH_CREATED, stream_products
+
+
+def legacy_products_body():
+    """The pre-streaming ``get_products``: model instances, per-row storage URLs, one JsonResponse"""
+    products = Product.objects.all()
+    product_list = [{
+        "id": product.id,
+        "product_id": product.product_id,
+        "name": product.name,
+        "price": str(product.price),
+        "description": product.description or "",
+        "image_url": product.image.url if product.image else None,
+        "created_at": product.created_at.isoformat(),
+    } for product in products]
+    return JsonResponse({"products": product_list}).content
+
+
+def streaming_products_body():
+    """Current ``get_products`` under WSGI; the body is consumed chunk by chunk and discarded"""
+    size = 0
+    for chunk in stream_products(None, Product.objects.all(), PRODUCT_FIELDS_WITH_CREATED).streaming_content:
+        size += len(chunk)
+    return size
+
+
+async def _asgi_products_body():
+    response = await AsyncClient().get("/api/products/")
+    size = 0
+    # How ASGIHandler.send_response reads a streaming body
+    async for chunk in response:
+        size += len(chunk)
+    return size
+
+
+def asgi_products_body():
+    """``/api/products/`` through the ASGI request handler, consumed as the ASGI server would"""
+    return async_to_sync(_asgi_products_body)()
+
+
+SERIALIZERS = {
+    "streaming_asgi": asgi_products_body,
+    "streaming": streaming_products_body,
+    "legacy": legacy_products_body,
+}
+
+
+def measure(body, rows):
+    """Time one full serialization, then trace a second one for peak memory"""
+    gc.collect()
+    rss_before = max_rss_kb()
+    started = time.perf_counter()
+    result = body()
+    elapsed = time.perf_counter() - started
+    size = result if isinstance(result, int) else len(result)
+    del result
+    rss_growth = max_rss_kb() - rss_before
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        body()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else 0,
+        "body_mb": round(size / 2**20, 2),
+        "peak_alloc_mb": round(peak / 2**20, 2),
+        # ru_maxrss only ever grows, so run the cheapest serializer first
+        "rss_growth_mb": round(rss_growth / 1024, 2),
+    }
+
+
+def run_serialization_benchmark(names=None, stdout=None):
+    rows = Product.objects.count()
+    results = {}
+    for name, body in SERIALIZERS.items():
+        if names and name not in names:
+            continue
+        results[f"serializer:{name}"] = r = measure(body, rows)
+        if stdout is not None:
+            stdout.write(
+                f"{name:<10} {r['rows_per_second']:>10} rows/s  peak={r['peak_alloc_mb']:.1f}MiB  "
+                f"rss+={r['rss_growth_mb']:.1f}MiB  body={r['body_mb']:.1f}MiB"
+            )
+    return results
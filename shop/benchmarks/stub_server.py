@@ -0,0 +1,142 @@
+"""
+Local OpenAI-compatible model server for agent benchmarks.
+
+``StubModelServer`` answers ``/models`` and ``/chat/completions`` on
+localhost with canned replies and models the costs the real endpoint
+charges. Each new connection sleeps ``connect_delay`` to stand in for TCP
+and TLS setup. Each request sleeps in proportion to the prompt bytes
+not covered by a cached prefix, the way providers with context caching
+bill and schedule them, plus a fixed ``latency`` for generation. The
+cached prefix is the tool schemas, response format and system message;
+the server remembers the prefixes it has seen.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from shop.agents_logic.prompts import prefix_bytes
+
+EXTRACTED = {
+    "product_id": "",
+    "product_name": "",
+    "product_price": "",
+    "product_description": "",
+    "product_image": "",
+    "is_add": False,
+}
+
+
+class StubModelServer:
+    def __init__(self, connect_delay=0.05, per_kb_delay=0.002, cache_prefixes=True, latency=0.0):
+        self.connect_delay = connect_delay
+        self.per_kb_delay = per_kb_delay
+        self.latency = latency
+        self.cache_prefixes = cache_prefixes
+        self.connections = 0
+        self.completions = 0
+        self.cached_bytes = 0
+        self.prompt_bytes = 0
+        self._prefixes = set()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "completions": self.completions,
+                "prompt_bytes": self.prompt_bytes,
+                "cached_share": round(self.cached_bytes / self.prompt_bytes, 4) if self.prompt_bytes else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    def on_connect(self):
+        with self._lock:
+            self.connections += 1
+        time.sleep(self.connect_delay)
+
+    def complete(self, payload, size):
+        prefix = json.dumps(
+            [payload.get("tools"), payload.get("response_format"), payload.get("messages", [])[:1]],
+            sort_keys=True,
+        )
+        key = hashlib.sha256(prefix.encode()).digest()
+        with self._lock:
+            cached = prefix_bytes(payload) if self.cache_prefixes and key in self._prefixes else 0
+            self._prefixes.add(key)
+            self.completions += 1
+            self.prompt_bytes += size
+            self.cached_bytes += cached
+        time.sleep(self.latency + self.per_kb_delay * (size - cached) / 1024)
+
+        if payload.get("response_format"):
+            message = {"role": "assistant", "content": json.dumps(EXTRACTED)}
+        else:
+            message = {"role": "assistant", "content": "Happy to help with anything in the catalog."}
+        return {
+            "id": f"chatcmpl-stub-{self.completions}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": size // 4,
+                "completion_tokens": 12,
+                "total_tokens": size // 4 + 12,
+                "prompt_tokens_details": {"cached_tokens": cached // 4},
+            },
+        }
+
+
+def _handler_for(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            server.on_connect()
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, body, status=200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._send_json({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+            else:
+                self._send_json({"error": {"message": "not found"}}, status=404)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if not self.path.endswith("/chat/completions"):
+                self._send_json({"error": {"message": "not found"}}, status=404)
+                return
+            self._send_json(server.complete(json.loads(body), len(body)))
+
+    return Handler
@@ -0,0 +1,53 @@
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+from django.test.utils import override_settings
+
+from shop.ratelimit import reset_limits
+
+
+# Every place the app reaches into the agent service. The benchmark
+# patches all of them so no request ever leaves the process.
+LLM_TARGETS = [
+    "shop.tasks.process_user_query",
+]
+
+# Benchmarks hammer /chat/ from one client; lift the per-client limits
+UNLIMITED_RATE_LIMITS = {
+    "chat": {"algorithm": "token_bucket", "backend": "local", "rate": 10**9, "period": 1, "burst": 10**9},
+}
+
+STUB_RESPONSE = {
+    "is_add": True,
+    "product_id": None,
+    "product_name": "Benchmark Tee",
+    "product_price": "19.99",
+    "product_description": "Stubbed agent output",
+    "product_image": None,
+    "agent_message": "Product ready: Benchmark Tee - $19.99",
+}
+
+
+async def stub_process_user_query(user_message):
+    """Stand-in for ``process_user_query`` that answers instantly"""
+    return dict(STUB_RESPONSE)
+
+
+@contextmanager
+def stub_llm():
+    """Patch every agent entry point with ``stub_process_user_query``"""
+    with ExitStack() as stack:
+        for target in LLM_TARGETS:
+            stack.enter_context(mock.patch(target, stub_process_user_query))
+        yield
+
+
+@contextmanager
+def unlimited_chat():
+    """Disable /chat/ rate limiting and queue admission for the duration"""
+    reset_limits()
+    try:
+        with override_settings(SHOP_RATE_LIMITS=UNLIMITED_RATE_LIMITS, SHOP_CHAT_MAX_QUEUED=10**9):
+            yield
+    finally:
+        reset_limits()
@@ -0,0 +1,62 @@
+import random
+
+from shop.benchmarks import timed
+from shop.forms import ProductForm
+from shop.validation import normalize_prices, validate_products
+from shop.views import convert_to_decimal
+
+RAW_PRICE_FORMATS = ["{v}", "${v}", "{v} USD", " {v} ", "PKR {v}", "{v}$", "abc", ""]
+
+
+def build_rows(count, existing_every=2, seed=0):
+    """Candidate products; every ``existing_every``-th reuses a seeded product_id"""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        value = f"{rng.randint(1, 9999)}.{rng.randint(0, 99):02d}"
+        rows.append({
+            "product_id": f"B{i:08d}" if existing_every and i % existing_every == 0 else f"N{i:08d}",
+            "name": f"Candidate {i}",
+            "price": rng.choice(RAW_PRICE_FORMATS).format(v=value),
+            "description": "bulk validation candidate",
+        })
+    return rows
+
+
+def per_row_validation(rows):
+    """Before: one ProductForm (and one exists() query) per row"""
+    errors = 0
+    for row in rows:
+        form = ProductForm(data={**row, "price": convert_to_decimal(row["price"])})
+        errors += not form.is_valid()
+    return errors
+
+
+def batch_validation(rows):
+    return len(validate_products(rows).errors)
+
+
+def run_validation_benchmark(rows, stdout=None):
+    prices = [row["price"] for row in rows]
+    results = {}
+
+    cases = {
+        "prices:per_value": (lambda: [convert_to_decimal(p) for p in prices]),
+        "prices:batch": (lambda: normalize_prices(prices)),
+        "products:per_row_form": (lambda: per_row_validation(rows)),
+        "products:batch": (lambda: batch_validation(rows)),
+    }
+    for name, func in cases.items():
+        outcome, elapsed, queries = timed(func)
+        results[name] = r = {
+            "rows": len(rows),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(len(rows) / elapsed) if elapsed else 0,
+            "queries": queries,
+        }
+        if stdout is not None:
+            stdout.write(f"{name:<24} {r['seconds']:>8.3f}s {r['rows_per_second']:>10} rows/s queries={queries}")
+
+    if normalize_prices(prices) != [convert_to_decimal(p) for p in prices]:
+        raise AssertionError("Batch price normalization disagrees with convert_to_decimal")
+    return results
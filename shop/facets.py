@@ -0,0 +1,262 @@
+"""
+Faceted product filtering backed by the ``FacetCount`` aggregate table.
+
+Each product contributes one count to a price band, a creation day and an
+image yes/no bucket. Product save/delete signals move those counts
+incrementally, so reading the facet menu is a single small SELECT instead
+of a GROUP BY over the catalog. ``shop.pricing`` reports bulk price
+changes through ``products_repriced``; other bulk writes that bypass
+signals (``bulk_create``, ``QuerySet.update``) must call
+``rebuild_facet_counts``.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import FacetCount, Product
+from .pricing import products_repriced
+
+# (key, lower bound inclusive, upper bound exclusive); None is unbounded, so
+# the first band also holds the odd zero or negative price convert_to_decimal lets in
+PRICE_BANDS = [
+    ("0-25", None, Decimal("25")),
+    ("25-50", Decimal("25"), Decimal("50")),
+    ("50-100", Decimal("50"), Decimal("100")),
+    ("100-250", Decimal("100"), Decimal("250")),
+    ("250-500", Decimal("250"), Decimal("500")),
+    ("500+", Decimal("500"), None),
+]
+
+# Windows count whole days back from today, so they line up with day buckets
+CREATED_WINDOWS = {
+    "1d": 1,
+    "7d": 7,
+    "30d": 30,
+    "365d": 365,
+}
+
+SORTS = {
+    "price": ("price", "id"),
+    "-price": ("-price", "-id"),
+    "newest": ("-created_at", "-id"),
+    "oldest": ("created_at", "id"),
+    "name": ("name", "id"),
+}
+
+# Query-string spellings a has_image filter accepts besides JSON true/false
+TRUE_VALUES = {"true", "1", "yes"}
+FALSE_VALUES = {"false", "0", "no"}
+
+PRICE = "price"
+CREATED_DAY = "created_day"
+HAS_IMAGE = "has_image"
+
+
+# ==========================================================
+# Bucketing
+# ==========================================================
+def price_band(price):
+    for key, low, high in PRICE_BANDS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return key
+
+
+def price_band_q(low, high):
+    """Filter for one band, with the same bounds ``price_band`` counts by"""
+    band = Q()
+    if low is not None:
+        band &= Q(price__gte=low)
+    if high is not None:
+        band &= Q(price__lt=high)
+    return band
+
+
+def facet_buckets(price, created_at, image):
+    """The (dimension, bucket) pairs one product counts towards"""
+    return [
+        (PRICE, price_band(Decimal(price))),
+        (CREATED_DAY, timezone.localdate(created_at).isoformat()),
+        (HAS_IMAGE, "yes" if image else "no"),
+    ]
+
+
+def window_start(days, now=None):
+    """Aware midnight ``days`` days before today"""
+    cutoff = timezone.localdate(now) - timedelta(days=days)
+    return timezone.make_aware(datetime.combine(cutoff, time.min))
+
+
+# ==========================================================
+# Incremental maintenance
+# ==========================================================
+def apply_deltas(deltas):
+    """Add ``{(dimension, bucket): delta}`` to the aggregate table"""
+    with transaction.atomic():
+        for (dimension, bucket), delta in deltas.items():
+            if not delta:
+                continue
+            counts = FacetCount.objects.filter(dimension=dimension, bucket=bucket)
+            if not counts.update(count=F("count") + delta):
+                FacetCount.objects.get_or_create(dimension=dimension, bucket=bucket)
+                counts.update(count=F("count") + delta)
+
+
+def _diff(old, new):
+    deltas = {}
+    for key in old:
+        deltas[key] = deltas.get(key, 0) - 1
+    for key in new:
+        deltas[key] = deltas.get(key, 0) + 1
+    return deltas
+
+
+@receiver(pre_save, sender=Product)
+def remember_old_buckets(sender, instance, raw=False, **kwargs):
+    instance._old_facet_buckets = []
+    if raw or instance.pk is None:
+        return
+    old = Product.objects.filter(pk=instance.pk).values_list("price", "created_at", "image").first()
+    if old is not None:
+        instance._old_facet_buckets = facet_buckets(*old)
+
+
+@receiver(post_save, sender=Product)
+def update_counts_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    new = facet_buckets(instance.price, instance.created_at, instance.image.name)
+    apply_deltas(_diff(getattr(instance, "_old_facet_buckets", []), new))
+
+
+@receiver(post_delete, sender=Product)
+def update_counts_on_delete(sender, instance, **kwargs):
+    apply_deltas(_diff(facet_buckets(instance.price, instance.created_at, instance.image.name), []))
+
+
+@receiver(products_repriced)
+def update_counts_on_reprice(sender, changes, **kwargs):
+    """Move price band counts for a whole bulk repricing chunk at once"""
+    deltas = {}
+    for _, old_price, new_price in changes:
+        old_band, new_band = price_band(old_price), price_band(new_price)
+        if old_band != new_band:
+            deltas[(PRICE, old_band)] = deltas.get((PRICE, old_band), 0) - 1
+            deltas[(PRICE, new_band)] = deltas.get((PRICE, new_band), 0) + 1
+    apply_deltas(deltas)
+
+
+def rebuild_facet_counts():
+    """Recompute every bucket from scratch; run after bulk writes"""
+    rows = []
+    for key, low, high in PRICE_BANDS:
+        count = Product.objects.filter(price_band_q(low, high)).count()
+        rows.append(FacetCount(dimension=PRICE, bucket=key, count=count))
+
+    days = (
+        Product.objects.order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(n=Count("id"))
+    )
+    rows.extend(FacetCount(dimension=CREATED_DAY, bucket=d["day"].isoformat(), count=d["n"]) for d in days)
+
+    with_image = Product.objects.exclude(no_image_q()).count()
+    rows.append(FacetCount(dimension=HAS_IMAGE, bucket="yes", count=with_image))
+    rows.append(FacetCount(dimension=HAS_IMAGE, bucket="no", count=Product.objects.count() - with_image))
+
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create(rows)
+    return len(rows)
+
+
+# ==========================================================
+# Reading & filtering
+# ==========================================================
+def facet_counts(now=None):
+    """Facet menu with catalog-wide counts, read from the aggregate table"""
+    price = {key: 0 for key, _, _ in PRICE_BANDS}
+    has_image = {"yes": 0, "no": 0}
+    days = []
+
+    for dimension, bucket, count in FacetCount.objects.values_list("dimension", "bucket", "count"):
+        if dimension == PRICE:
+            price[bucket] = count
+        elif dimension == HAS_IMAGE:
+            has_image[bucket] = count
+        elif dimension == CREATED_DAY:
+            days.append((bucket, count))
+
+    created = {}
+    for key, window in CREATED_WINDOWS.items():
+        cutoff = timezone.localdate(window_start(window, now)).isoformat()
+        created[key] = sum(count for day, count in days if day >= cutoff)
+
+    return {"price": price, "created": created, "has_image": has_image}
+
+
+def no_image_q():
+    return Q(image__isnull=True) | Q(image="")
+
+
+def parse_flag(value, field):
+    """JSON true/false or a query-string spelling of it; None when unset"""
+    if isinstance(value, bool):
+        return value
+    if value is None or value == "":
+        return None
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid {field}: {value}")
+
+
+def apply_facet_filters(queryset, data):
+    """Narrow ``queryset`` by the facet keys in a filter-products request body"""
+    bands = data.get("price_band") or []
+    if isinstance(bands, str):
+        bands = [bands]
+    known = [key for key, _, _ in PRICE_BANDS]
+    if not isinstance(bands, list) or not all(isinstance(band, str) and band in known for band in bands):
+        raise ValueError(f"Unknown price_band {bands!r}, expected some of {', '.join(known)}")
+    band_q = Q()
+    for key, low, high in PRICE_BANDS:
+        if key in bands:
+            band_q |= price_band_q(low, high)
+    if bands:
+        queryset = queryset.filter(band_q)
+
+    for field, lookup in (("min_price", "price__gte"), ("max_price", "price__lte")):
+        if data.get(field) not in (None, ""):
+            try:
+                bound = Decimal(str(data[field]))
+            except InvalidOperation:
+                bound = None
+            if bound is None or not bound.is_finite():
+                raise ValueError(f"Invalid {field}: {data[field]}")
+            queryset = queryset.filter(**{lookup: bound})
+
+    window = data.get("created_within")
+    if window:
+        if not isinstance(window, str) or window not in CREATED_WINDOWS:
+            raise ValueError(f"Unknown created_within '{window}'")
+        queryset = queryset.filter(created_at__gte=window_start(CREATED_WINDOWS[window]))
+
+    has_image = parse_flag(data.get("has_image"), "has_image")
+    if has_image is True:
+        queryset = queryset.exclude(no_image_q())
+    elif has_image is False:
+        queryset = queryset.filter(no_image_q())
+
+    sort = data.get("sort") or "price"
+    if not isinstance(sort, str) or sort not in SORTS:
+        raise ValueError(f"Unknown sort '{sort}'")
+    return queryset.order_by(*SORTS[sort])
@@ -0,0 +1,199 @@
+"""
+Session-scoped chat history with keyset cursors and change notification.
+
+Pages are keyed on ``(timestamp, id)``, which the
+``shop_conv_session_idx`` index covers together with ``session_id``, so
+``before``/``after`` pages and the "latest entry" lookup behind ETags are
+index seeks whatever the table size. Entries are sent in a compact shape:
+the agent's reply text and the product it touched, not the full stored
+``agent_response`` JSON.
+
+``HistoryWatcher`` lets long-polling requests wait for new conversations
+without polling the database themselves. One task per event loop reads
+conversations past a high-water id once per interval and wakes the
+waiters for the sessions that got new entries.
+"""
+import asyncio
+import base64
+import binascii
+import contextvars
+import hashlib
+import json
+import weakref
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.db.models import Max, Q
+
+from .models import Conversation
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_WAIT = 25  # seconds a long-poll may be held open
+POLL_INTERVAL = 0.5
+
+HISTORY_FIELDS = ("id", "timestamp", "user_message", "agent_response")
+
+
+# ==========================================================
+# Cursors
+# ==========================================================
+def encode_cursor(timestamp, pk):
+    raw = f"{timestamp.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(timestamp, id)`` from an opaque cursor; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+# ==========================================================
+# Pages
+# ==========================================================
+def compact_entry(row):
+    pk, timestamp, user_message, agent_response = row
+    try:
+        response = json.loads(agent_response)
+    except ValueError:
+        response = {"agent_message": agent_response}
+    if not isinstance(response, dict):
+        response = {"agent_message": str(response)}
+
+    entry = {
+        "id": pk,
+        "ts": timestamp.isoformat(),
+        "user": user_message,
+        "agent": response.get("agent_message") or response.get("error") or "",
+    }
+    if response.get("is_add") and response.get("product_name"):
+        entry["product"] = {
+            "id": response.get("product_id"),
+            "name": response.get("product_name"),
+            "price": response.get("product_price"),
+        }
+    return entry
+
+
+def history_page(session_id, before=None, after=None, limit=DEFAULT_LIMIT):
+    """Up to ``limit`` entries, oldest first, next to a cursor.
+
+    With no cursor or ``before``, returns the newest entries older than the
+    cursor (scrolling back). With ``after``, returns the oldest entries newer
+    than it (catching up). ``has_more`` says whether the scan stopped at
+    ``limit``.
+    """
+    rows = Conversation.objects.filter(session_id=session_id)
+    if after:
+        timestamp, pk = decode_cursor(after)
+        # The plain range bound lets the index seek; the OR breaks ties on id
+        rows = rows.filter(Q(timestamp__gte=timestamp), Q(timestamp__gt=timestamp) | Q(id__gt=pk))
+        rows = rows.order_by("timestamp", "id")
+    else:
+        if before:
+            timestamp, pk = decode_cursor(before)
+            rows = rows.filter(Q(timestamp__lte=timestamp), Q(timestamp__lt=timestamp) | Q(id__lt=pk))
+        rows = rows.order_by("-timestamp", "-id")
+
+    rows = list(rows.values_list(*HISTORY_FIELDS)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not after:
+        rows.reverse()
+
+    page = {"items": [compact_entry(row) for row in rows], "has_more": has_more}
+    if rows:
+        page["before"] = encode_cursor(rows[0][1], rows[0][0])
+        page["after"] = encode_cursor(rows[-1][1], rows[-1][0])
+    else:
+        page["before"], page["after"] = before, after
+    return page
+
+
+def latest_entry(session_id):
+    """``(timestamp, id)`` of the session's newest conversation, or None"""
+    return (
+        Conversation.objects.filter(session_id=session_id)
+        .order_by("-timestamp", "-id")
+        .values_list("timestamp", "id")
+        .first()
+    )
+
+
+def history_etag(session_id, latest, query):
+    """Strong validator for one history response: same session, same newest entry, same params"""
+    state = f"{session_id}|{latest[0].isoformat()}|{latest[1]}" if latest else f"{session_id}|empty"
+    return '"%s"' % hashlib.sha256(f"{state}|{query}".encode()).hexdigest()[:32]
+
+
+# ==========================================================
+# Change notification
+# ==========================================================
+class HistoryWatcher:
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._waiters = {}
+        self._task = None
+        self._high_water = 0
+
+    async def wait(self, session_id, timeout):
+        """True once the session gets a new conversation, False after ``timeout`` seconds"""
+        event = asyncio.Event()
+        self._waiters.setdefault(session_id, set()).add(event)
+        if self._task is None or self._task.done():
+            # One task serves every session; it must not join the capture
+            # of whichever profiled request happened to start it
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            waiters = self._waiters.get(session_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[session_id]
+            if not self._waiters and self._task is not None:
+                # A cancelled task is not done() until the loop runs it again;
+                # forget it now so a wait() in between starts a fresh one
+                self._task.cancel()
+                self._task = None
+
+    async def _run(self):
+        # Re-read on every start: nobody waited while we were idle, and each
+        # waiter checked its session's newest entry before calling wait()
+        self._high_water = await sync_to_async(_max_conversation_id)()
+        while self._waiters:
+            await asyncio.sleep(self.interval)
+            rows = await sync_to_async(_conversations_after)(self._high_water)
+            for pk, session_id in rows:
+                self._high_water = max(self._high_water, pk)
+                for event in self._waiters.get(session_id, ()):
+                    event.set()
+
+
+def _max_conversation_id():
+    return Conversation.objects.aggregate(high=Max("id"))["high"] or 0
+
+
+def _conversations_after(pk):
+    return list(Conversation.objects.filter(id__gt=pk).order_by().values_list("id", "session_id"))
+
+
+_watchers = weakref.WeakKeyDictionary()
+
+
+def get_watcher():
+    """The watcher for the running event loop; waiters cannot span loops"""
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None:
+        watcher = _watchers[loop] = HistoryWatcher()
+    return watcher
@@ -0,0 +1,182 @@
+"""
+Lightweight DB-backed job queue.
+
+Views call ``enqueue`` and return immediately; ``manage.py run_jobs`` claims
+jobs with a lease, runs the registered handler on an asyncio loop and
+records the result or schedules a retry. On backends with
+``SELECT ... FOR UPDATE SKIP LOCKED`` claims use row locks, elsewhere
+(SQLite) a conditional UPDATE acts as a compare-and-swap on the lease.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import profiling
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+DEFAULT_LEASE_SECONDS = 120
+RETRY_BASE_SECONDS = 2
+
+
+# ==========================================================
+# Registration & enqueueing
+# ==========================================================
+def job_handler(kind):
+    """Register a sync or async function as the handler for ``kind``"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, priority=0, max_attempts=3):
+    """Queue a job and return it; higher ``priority`` runs first"""
+    return Job.objects.create(
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+    )
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ==========================================================
+# Claiming
+# ==========================================================
+def _claimable(now):
+    """Queued jobs that are due, plus running jobs whose lease has expired"""
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Lease the next due job to ``worker_id`` or return None"""
+    now = timezone.now()
+    claimable = _claimable(now).order_by('-priority', 'run_after', 'id')
+    lease = {
+        'status': Job.RUNNING,
+        'locked_by': worker_id,
+        'locked_until': now + timedelta(seconds=lease_seconds),
+        'attempts': F('attempts') + 1,
+    }
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = claimable.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(**lease)
+            job.refresh_from_db()
+            return job
+
+    # SQLite: the UPDATE re-checks the claimable condition, so only one
+    # worker can win each row even without row locks.
+    for job_id in claimable.values_list('id', flat=True)[:5]:
+        if _claimable(now).filter(pk=job_id).update(**lease):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+# ==========================================================
+# Completion
+# ==========================================================
+def complete(job, result):
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.DONE,
+        result=result,
+        error='',
+        locked_until=None,
+        finished_at=timezone.now(),
+    )
+
+
+def fail(job, error):
+    """Schedule a retry with exponential backoff, or give up after ``max_attempts``"""
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=Job.QUEUED,
+            error=error,
+            locked_until=None,
+            run_after=now + timedelta(seconds=RETRY_BASE_SECONDS ** job.attempts),
+        )
+    else:
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            status=Job.FAILED,
+            error=error,
+            locked_until=None,
+            finished_at=now,
+        )
+
+
+async def run_job(job):
+    """Execute one claimed job on the running event loop and record the outcome"""
+    handler = HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        if job.attempts > job.max_attempts:
+            # Reclaimed after its lease expired too many times (worker crashes)
+            raise RuntimeError(f"Job exceeded {job.max_attempts} attempts")
+        with profiling.job_profile(job.kind):
+            if inspect.iscoroutinefunction(handler):
+                result = await handler(job.payload)
+            else:
+                result = await sync_to_async(handler)(job.payload)
+    except Exception as e:
+        logger.exception("❌ Job %s (%s) failed", job.id, job.kind)
+        await sync_to_async(fail)(job, str(e))
+        return False
+
+    await sync_to_async(complete)(job, result)
+    return True
+
+
+def run_pending(worker_id=None):
+    """Synchronously drain every due job; used by tests and ``run_jobs --once``"""
+    worker_id = worker_id or default_worker_id()
+    processed = 0
+    while (job := claim(worker_id)) is not None:
+        async_to_sync(run_job)(job)
+        processed += 1
+    return processed
+
+
+# ==========================================================
+# Worker loop
+# ==========================================================
+async def worker_loop(worker_id, concurrency=4, poll_interval=1.0,
+                      lease_seconds=DEFAULT_LEASE_SECONDS, stop_event=None):
+    """Run ``concurrency`` claim/execute loops until ``stop_event`` is set"""
+    stop_event = stop_event or asyncio.Event()
+
+    async def slot(n):
+        slot_id = f"{worker_id}/{n}"
+        while not stop_event.is_set():
+            job = await sync_to_async(claim)(slot_id, lease_seconds)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await run_job(job)
+
+    await asyncio.gather(*(slot(n) for n in range(concurrency)))
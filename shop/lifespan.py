@@ -0,0 +1,55 @@
+"""
+ASGI lifespan support and process startup hooks.
+
+Django's ASGI handler only speaks HTTP and rejects ``lifespan`` scopes, so
+servers such as uvicorn never get a startup event to hook into.
+``LifespanMiddleware`` answers lifespan messages itself, runs the startup
+hooks on the server's event loop and passes every other scope to Django.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_agents():
+    """Open the model connection if ``SHOP_AGENT_WARMUP`` is on"""
+    if not getattr(settings, "SHOP_AGENT_WARMUP", False):
+        return False
+    started = time.perf_counter()
+    try:
+        from shop.agents_logic.agent_service import warmup
+    except Exception as e:
+        logger.warning("Agent warmup skipped: %s", e)
+        return False
+
+    connected = await warmup()
+    logger.info("Agent warmup finished in %.0f ms (connected=%s)", (time.perf_counter() - started) * 1000, connected)
+    return connected
+
+
+class LifespanMiddleware:
+    def __init__(self, app, on_startup=(warm_agents,)):
+        self.app = app
+        self.on_startup = list(on_startup)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.app(scope, receive, send)
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    for hook in self.on_startup:
+                        await hook()
+                except Exception as e:
+                    logger.exception("Startup hook failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
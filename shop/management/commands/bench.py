@@ -0,0 +1,66 @@
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from shop.benchmarks.db import benchmark_database
+from shop.benchmarks.report import build_report, compare_reports, load_report, save_report
+from shop.benchmarks.runner import DRIVERS, run_suite
+from shop.benchmarks.seed import seed_conversations, seed_products
+from shop.benchmarks.stubs import stub_llm, unlimited_chat
+from shop.models import Conversation, Product
+
+
+class Command(BaseCommand):
+    help = "Benchmark every shop endpoint against a synthetic catalog in a throwaway database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000, help="Products to seed (default 1000)")
+        parser.add_argument("--conversations", type=int, default=1000, help="Conversations to seed (default 1000)")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per scenario")
+        parser.add_argument("--driver", choices=[*DRIVERS, "both"], default="both")
+        parser.add_argument("--only", nargs="*", help="Run only these scenario names")
+        parser.add_argument("--output", help="Write the JSON report to this path")
+        parser.add_argument("--baseline", help="Compare against a previously saved JSON report")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Allowed relative slowdown before --baseline fails (default 0.2)")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="Keep the benchmark database between runs to skip reseeding")
+
+    def handle(self, *args, **options):
+        drivers = list(DRIVERS) if options["driver"] == "both" else [options["driver"]]
+
+        with benchmark_database(options["keepdb"]):
+            self.seed(options["products"], options["conversations"])
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                    stub_llm(), unlimited_chat():
+                results = run_suite(drivers, iterations=options["iterations"],
+                                    only=options["only"], stdout=self.stdout)
+
+        report = build_report(
+            results,
+            products=options["products"],
+            conversations=options["conversations"],
+            iterations=options["iterations"],
+            database=connection.vendor,
+        )
+        if options["output"]:
+            path = save_report(report, options["output"])
+            self.stdout.write(self.style.SUCCESS(f"Report written to {path}"))
+
+        if options["baseline"]:
+            regressions = compare_reports(load_report(options["baseline"]), report, options["threshold"])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(line)
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def seed(self, products, conversations):
+        if Product.objects.exists() or Conversation.objects.exists():
+            self.stdout.write("Reusing existing benchmark data")
+            return
+        self.stdout.write(f"Seeding {products} products and {conversations} conversations...")
+        seed_products(products)
+        seed_conversations(conversations)
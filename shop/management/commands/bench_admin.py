@@ -0,0 +1,23 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.admin import run_admin_benchmark
+from shop.benchmarks.seed import seed_conversations
+from shop.models import Conversation
+
+
+class Command(BenchmarkCommand):
+    help = "Time Conversation changelist loads (paging, search, date drilldown) in the stock and tuned admin"
+    rows = 5_000_000
+    seeds = "conversations"
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Loads per scenario; the fastest is kept")
+        parser.add_argument("--only", nargs="*", help="Scenario names to run")
+
+    def seeded(self):
+        return Conversation.objects.exists()
+
+    def seed(self, options):
+        seed_conversations(options["rows"])
+
+    def run(self, options):
+        return run_admin_benchmark(options["repeat"], options["only"], stdout=self.stdout)
@@ -0,0 +1,25 @@
+from shop.benchmarks import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = "Measure agent cold start, steady-state latency and prompt bytes against a local stub model server"
+    database = False
+    report_meta = ("requests",)
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Chat messages per path (default 50)")
+        parser.add_argument("--connect-delay", type=float, default=0.05,
+                            help="Seconds the stub spends on each new connection (default 0.05)")
+        parser.add_argument("--per-kb-delay", type=float, default=0.002,
+                            help="Seconds the stub spends per uncached prompt KB (default 0.002)")
+
+    def run(self, options):
+        # Imported here: agent_service needs GEMINI_API_KEY at import time
+        from shop.benchmarks.agent import run_agent_benchmark
+
+        return run_agent_benchmark(
+            options["requests"],
+            connect_delay=options["connect_delay"],
+            per_kb_delay=options["per_kb_delay"],
+            stdout=self.stdout,
+        )
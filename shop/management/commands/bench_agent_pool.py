@@ -0,0 +1,24 @@
+import os
+
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.agent_pool import PROCESS_COUNTS, run_pool_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Measure agent throughput through the worker pool at 1/2/4/8 processes against a stub model"
+    database = False
+    report_meta = ("requests", "in_flight", "concurrency", "latency")
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--processes", type=int, nargs="*", default=list(PROCESS_COUNTS))
+        parser.add_argument("--requests", type=int, default=400, help="Chat questions per pool size")
+        parser.add_argument("--in-flight", type=int, default=64, help="Questions outstanding at once")
+        parser.add_argument("--concurrency", type=int, default=32, help="Agent runs in flight per process")
+        parser.add_argument("--latency", type=float, default=0.05, help="Stub model seconds per completion")
+
+    def run(self, options):
+        self.stdout.write(f"{os.cpu_count()} CPU(s) available")
+        return run_pool_benchmark(
+            options["processes"], options["requests"], options["in_flight"], options["concurrency"],
+            options["latency"], stdout=self.stdout,
+        )
@@ -0,0 +1,21 @@
+from shop.benchmarks import BenchmarkCommand
+
+
+class Command(BenchmarkCommand):
+    help = "Measure the hit rate and latency of precomputed catalog answers against the agents"
+    rows = 100_000
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000, help="Chat messages in the traffic sample")
+        parser.add_argument("--llm-requests", type=int, default=20,
+                            help="Answered questions also sent through the agents (default 20)")
+        parser.add_argument("--model-latency", type=float, default=0.4,
+                            help="Seconds the stub model takes per completion (default 0.4)")
+
+    def run(self, options):
+        # Imported here: agent_service needs GEMINI_API_KEY at import time
+        from shop.benchmarks.answers import run_answers_benchmark
+
+        return run_answers_benchmark(
+            options["requests"], options["llm_requests"], options["model_latency"], stdout=self.stdout,
+        )
@@ -0,0 +1,11 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.assets import run_assets_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Measure page weight and repeat-visit bytes with inline assets and with the static asset pipeline"
+    rows = 24
+    rows_help = "Products to seed for the listing pages"
+
+    def run(self, options):
+        return run_assets_benchmark(stdout=self.stdout)
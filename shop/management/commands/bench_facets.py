@@ -0,0 +1,17 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.facets import run_facet_benchmark
+from shop.benchmarks.seed import seed_products
+
+
+class Command(BenchmarkCommand):
+    help = "Time facet counts from the aggregate table against a live GROUP BY, and the filter endpoint"
+    rows = 1_000_000
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def seed(self, options):
+        seed_products(options["rows"], image_every=3)
+
+    def run(self, options):
+        return run_facet_benchmark(options["iterations"], stdout=self.stdout)
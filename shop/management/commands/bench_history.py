@@ -0,0 +1,20 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.history import MODES, run_history_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Simulate many idle chat clients polling /history/ (legacy, ETag, long-poll) while new messages arrive"
+    report_meta = ("clients", "duration", "interval", "write_rate")
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=1000)
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls")
+        parser.add_argument("--write-rate", type=float, default=20, help="New conversations per second")
+        parser.add_argument("--modes", nargs="*", choices=MODES, default=list(MODES))
+
+    def run(self, options):
+        return run_history_benchmark(
+            options["clients"], options["duration"], options["interval"], options["write_rate"],
+            options["modes"], stdout=self.stdout,
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import CommandError
+
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.parser_corpus import run_parser_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Measure accuracy and throughput of the product text parser against a labelled corpus"
+    database = False
+    report_meta = ("cases",)
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--cases", type=int, default=2000, help="Labelled corpus size (default 2000)")
+        parser.add_argument("--fuzz", type=int, default=2000, help="Random inputs to throw at the parser")
+
+    def run(self, options):
+        return run_parser_benchmark(options["cases"], options["fuzz"], stdout=self.stdout)
+
+    def verify_results(self, results):
+        if results["parser:parser"]["fuzz_crashes"]:
+            raise CommandError("Parser raised on fuzz input")
@@ -0,0 +1,10 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.pricing import run_reprice_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Compare per-row save() repricing against chunked bulk repricing"
+    rows = 50_000
+
+    def run(self, options):
+        return run_reprice_benchmark(stdout=self.stdout)
@@ -0,0 +1,19 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.seed import seed_products
+from shop.benchmarks.serialization import SERIALIZERS, run_serialization_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Compare peak memory and throughput of the streaming and legacy product serializers"
+    rows = 1_000_000
+
+    def add_benchmark_arguments(self, parser):
+        parser.add_argument("--image-every", type=int, default=3,
+                            help="Give every n-th product an image path (default 3)")
+        parser.add_argument("--only", nargs="*", choices=list(SERIALIZERS))
+
+    def seed(self, options):
+        seed_products(options["rows"], image_every=options["image_every"])
+
+    def run(self, options):
+        return run_serialization_benchmark(options["only"], stdout=self.stdout)
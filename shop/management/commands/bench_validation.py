@@ -0,0 +1,11 @@
+from shop.benchmarks import BenchmarkCommand
+from shop.benchmarks.validation import build_rows, run_validation_benchmark
+
+
+class Command(BenchmarkCommand):
+    help = "Compare per-row and batch price normalization and product validation"
+    rows = 100_000
+    rows_help = "Candidate rows to validate, and products to seed"
+
+    def run(self, options):
+        return run_validation_benchmark(build_rows(options["rows"]), stdout=self.stdout)
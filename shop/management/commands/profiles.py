@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.profiling import capture_ids, collapsed_stacks, load_capture, profile_settings
+
+
+class Command(BaseCommand):
+    help = "List slow-request profiles, or show one (summary, SQL and LLM timelines, collapsed stacks)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("capture", nargs="?", help="Capture id (or a unique prefix) to show; omit to list")
+        parser.add_argument("--dir", help="Profile directory (default SHOP_PROFILE_DIR)")
+        parser.add_argument("--limit", type=int, default=20, help="Captures to list, newest first (default 20)")
+        parser.add_argument("--top", type=int, default=10, help="Hottest frames to show (default 10)")
+        parser.add_argument("--collapsed", action="store_true",
+                            help="Print only the collapsed stacks, for flamegraph.pl or speedscope")
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or profile_settings()["dir"]
+        if not directory:
+            raise CommandError("Set SHOP_PROFILE_DIR or pass --dir")
+        ids = capture_ids(directory)
+
+        if not options["capture"]:
+            self.list(directory, ids[::-1][:options["limit"]])
+            self.stdout.write(f"{len(ids)} capture(s) in {directory}")
+            return
+
+        matches = [i for i in ids if i.startswith(options["capture"])]
+        if len(matches) != 1:
+            raise CommandError(f"{len(matches)} captures match '{options['capture']}'")
+        capture = load_capture(directory, matches[0])
+        if options["collapsed"]:
+            self.stdout.write(collapsed_stacks(capture))
+        else:
+            self.show(capture, options["top"])
+
+    def list(self, directory, ids):
+        for capture_id in ids:
+            try:
+                c = load_capture(directory, capture_id)
+            except (OSError, ValueError):
+                continue  # pruned or half-written by another process
+            top = max(c["breakdown"].items(), key=lambda item: item[1], default=("-", 0))
+            self.stdout.write(
+                f"{capture_id}  {c['name']:<28} {c['duration_ms']:>9.1f}ms  status={c.get('status', '-')}  "
+                f"sql={c['sql_count']}/{c['sql_ms']:.1f}ms  llm={c['llm_ms']:.1f}ms  "
+                f"mostly {top[0]} ({top[1]:.0%})"
+            )
+
+    def show(self, c, top):
+        self.stdout.write(f"{c['id']}: {c['kind']} {c['name']} took {c['duration_ms']:.1f}ms")
+        self.stdout.write(f"  started {c['started_at']} in pid {c['pid']}, status {c.get('status', '-')}")
+        breakdown = ", ".join(f"{category} {share:.0%}" for category, share in c["breakdown"].items())
+        self.stdout.write(f"  {c['samples']} stack samples every {c['interval_ms']}ms: {breakdown or 'none'}")
+
+        self.stdout.write(f"\nSQL: {c['sql_count']} queries, {c['sql_ms']:.1f}ms")
+        for q in c["sql"]:
+            many = " (many)" if q["many"] else ""
+            self.stdout.write(f"  +{q['start_ms']:>9.1f}ms {q['duration_ms']:>8.2f}ms  {q['sql'][:160]}{many}")
+
+        self.stdout.write(f"\nLLM: {len(c['llm'])} spans, {c['llm_ms']:.1f}ms")
+        for s in sorted(c["llm"], key=lambda s: s["start_ms"]):
+            detail = " ".join(f"{k}={v}" for k, v in s.items() if k not in ("name", "start_ms", "duration_ms"))
+            self.stdout.write(f"  +{s['start_ms']:>9.1f}ms {s['duration_ms']:>8.1f}ms  {s['name']} {detail}".rstrip())
+
+        # Exact stacks rarely repeat; where the samples land is the useful part
+        leaves = {}
+        for stack, count in c["stacks"].items():
+            leaf = stack.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        self.stdout.write(f"\nHottest frames ({len(c['stacks'])} distinct stacks; --collapsed prints them all):")
+        for leaf, count in sorted(leaves.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {count:>5}  {count / max(c['samples'], 1):>4.0%}  {leaf}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop.answers import rebuild_catalog_answers
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed catalog answers (run after bulk imports or updates)"
+
+    def handle(self, *args, **options):
+        answers = rebuild_catalog_answers()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {answers} catalog answer(s)"))
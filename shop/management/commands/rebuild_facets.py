@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the product facet count table (run after bulk imports or updates)"
+
+    def handle(self, *args, **options):
+        buckets = rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {buckets} facet bucket(s)"))
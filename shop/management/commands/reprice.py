@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.pricing import DEFAULT_CHUNK_SIZE, DELTA, PERCENT, SET, PriceRule, reprice
+
+
+class Command(BaseCommand):
+    help = "Apply a percentage, absolute or fixed price change to matching products in batches"
+
+    def add_arguments(self, parser):
+        change = parser.add_mutually_exclusive_group(required=True)
+        change.add_argument("--percent", help="Relative change, e.g. -10 for a 10%% discount")
+        change.add_argument("--delta", help="Absolute change, e.g. 2.50 or -1")
+        change.add_argument("--set", dest="fixed", help="Set every matching product to this price")
+        parser.add_argument("--name", default="", help="Case-insensitive regex on product name")
+        parser.add_argument("--id", default="", help="Regex on product_id")
+        parser.add_argument("--dry-run", action="store_true", help="Show the diff without writing")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument("--diff-limit", type=int, default=20, help="Diff lines to print (default 20)")
+
+    def handle(self, *args, **options):
+        if options["percent"] is not None:
+            mode, value = PERCENT, options["percent"]
+        elif options["delta"] is not None:
+            mode, value = DELTA, options["delta"]
+        else:
+            mode, value = SET, options["fixed"]
+
+        try:
+            rule = PriceRule(mode=mode, value=value, name_pattern=options["name"], id_pattern=options["id"])
+            result = reprice(rule, dry_run=options["dry_run"], chunk_size=options["chunk_size"],
+                             diff_limit=options["diff_limit"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for product_id, old, new in result.diff:
+            self.stdout.write(f"{product_id:<20} {old:>12} -> {new}")
+        if result.changed > len(result.diff):
+            self.stdout.write(f"... and {result.changed - len(result.diff)} more")
+
+        verb = "Would change" if result.dry_run else "Changed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.changed} of {result.matched} matching product(s) in {result.batches} batch(es)"
+        ))
@@ -0,0 +1,35 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop.agent_pool import DEFAULT_CONCURRENCY, DEFAULT_SOCKET, WorkerPool
+
+
+class Command(BaseCommand):
+    help = "Run the agent worker pool that chat jobs send their LLM runs to"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2, help="Worker processes (default 2)")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                            help=f"Agent runs in flight per process (default {DEFAULT_CONCURRENCY})")
+        parser.add_argument("--socket", default=None,
+                            help="Socket base path; worker i listens on <socket>.<i> "
+                                 "(default SHOP_AGENT_POOL_SOCKET, else %s)" % DEFAULT_SOCKET)
+
+    def handle(self, *args, **options):
+        path = options["socket"] or settings.SHOP_AGENT_POOL_SOCKET or DEFAULT_SOCKET
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        with WorkerPool(path, options["processes"], options["concurrency"]) as pool:
+            self.stdout.write(
+                f"{options['processes']} agent worker(s) listening on {path}.0-{options['processes'] - 1} "
+                f"with concurrency {options['concurrency']}"
+            )
+            while not stopping:
+                pool.restart_dead()
+                time.sleep(1)
+        self.stdout.write("Agent workers stopped")
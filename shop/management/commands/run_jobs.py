@@ -0,0 +1,50 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+
+from shop import tasks  # noqa: F401  (registers the job handlers)
+from shop.jobs import DEFAULT_LEASE_SECONDS, default_worker_id, run_pending, worker_loop
+from shop.lifespan import warm_agents
+
+
+class Command(BaseCommand):
+    help = "Run the background job worker for chat and image jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="Jobs to run at once on the event loop (default 4)")
+        parser.add_argument("--poll-interval", type=float, default=0.5,
+                            help="Seconds to wait when the queue is empty (default 0.5)")
+        parser.add_argument("--lease", type=int, default=DEFAULT_LEASE_SECONDS,
+                            help="Seconds before a claimed job can be reclaimed by another worker")
+        parser.add_argument("--worker-id", default=None, help="Identifier recorded on claimed jobs")
+        parser.add_argument("--once", action="store_true", help="Drain due jobs and exit")
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"] or default_worker_id()
+
+        if options["once"]:
+            processed = run_pending(worker_id)
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
+            return
+
+        self.stdout.write(f"Job worker {worker_id} running with concurrency {options['concurrency']}")
+        asyncio.run(self.serve(worker_id, options))
+
+    async def serve(self, worker_id, options):
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+
+        # Same loop as the jobs, so the pooled model connection gets reused
+        await warm_agents()
+        await worker_loop(
+            worker_id,
+            concurrency=options["concurrency"],
+            poll_interval=options["poll_interval"],
+            lease_seconds=options["lease"],
+            stop_event=stop_event,
+        )
+        self.stdout.write("Job worker stopped")
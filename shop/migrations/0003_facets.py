@@ -0,0 +1,71 @@
+# Generated by Django 5.2.6 on 2026-10-19 02:12
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copy of shop.facets.facet_buckets as of this migration, so later
+# edits to that module cannot change what migrating an old database writes
+PRICE_BAND_EDGES = [
+    ('0-25', Decimal('25')),
+    ('25-50', Decimal('50')),
+    ('50-100', Decimal('100')),
+    ('100-250', Decimal('250')),
+    ('250-500', Decimal('500')),
+]
+
+
+def facet_buckets(price, created_at, image):
+    band = next((key for key, high in PRICE_BAND_EDGES if Decimal(price) < high), '500+')
+    return [
+        ('price', band),
+        ('created_day', timezone.localdate(created_at).isoformat()),
+        ('has_image', 'yes' if image else 'no'),
+    ]
+
+
+def populate_facet_counts(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    FacetCount = apps.get_model('shop', 'FacetCount')
+    counts = {}
+    for row in Product.objects.values_list('price', 'created_at', 'image').iterator():
+        for key in facet_buckets(*row):
+            counts[key] = counts.get(key, 0) + 1
+    FacetCount.objects.bulk_create(
+        FacetCount(dimension=dimension, bucket=bucket, count=count)
+        for (dimension, bucket), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('bucket', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='shop_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at'], name='shop_product_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('dimension', 'bucket'), name='shop_facet_bucket_unique'),
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:05
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+# Frozen here rather than imported from shop.search, so later edits to that
+# module cannot change what migrating an old database does
+FTS_TABLE = 'shop_conversation_fts'
+
+CREATE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        user_message, agent_response, content='shop_conversation', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON shop_conversation BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, user_message, agent_response)
+        VALUES (new.id, new.user_message, new.agent_response);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON shop_conversation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_message, agent_response)
+        VALUES ('delete', old.id, old.user_message, old.agent_response);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON shop_conversation BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, user_message, agent_response)
+        VALUES ('delete', old.id, old.user_message, old.agent_response);
+        INSERT INTO {FTS_TABLE}(rowid, user_message, agent_response)
+        VALUES (new.id, new.user_message, new.agent_response);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_FTS_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_fts(apps, schema_editor):
+    """Create the index and triggers; a no-op off SQLite or without FTS5"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(CREATE_FTS_SQL[0])
+    except OperationalError:
+        return  # SQLite compiled without FTS5
+    for sql in CREATE_FTS_SQL[1:]:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0003_facets'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['timestamp', 'id'], name='shop_conv_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['session_id', 'timestamp', 'id'], name='shop_conv_session_idx'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:25
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Frozen copies of the shop.answers helpers as of this migration, so later
+# edits to that module cannot change what migrating an old database writes
+RANKINGS = {
+    'cheapest': (('price', 'id'), 3),
+    'priciest': (('-price', '-id'), 3),
+    'newest': (('-created_at', '-id'), 5),
+}
+PRICE_LIST_SIZE = 5
+ENTRY_FIELDS = ('id', 'product_id', 'name', 'price', 'created_at')
+KEY_LENGTH = 220
+
+_NAME_RE = re.compile(r'[\W_]+')
+_ARTICLE_RE = re.compile(r'^(?:the|a|an) ')
+
+
+def price_key(name):
+    key = _ARTICLE_RE.sub('', ' '.join(_NAME_RE.sub(' ', name.lower()).split()))
+    return f'price:{key}'[:KEY_LENGTH]
+
+
+def product_entry(pk, product_id, name, price, created_at):
+    return {
+        'id': pk,
+        'product_id': product_id,
+        'name': name,
+        'price': str(Decimal(str(price)).quantize(Decimal('0.01'))),
+        'created_at': created_at.isoformat(),
+    }
+
+
+def _listing(entries):
+    return ', '.join(f"{e['name']} (${e['price']})" for e in entries)
+
+
+def render_answer(template, entries):
+    if not entries:
+        return "We don't have any products in the catalog yet."
+    first, rest = entries[0], entries[1:]
+    if template == 'cheapest':
+        message = f"Our cheapest item is {first['name']} at ${first['price']}."
+        return message + (f' Also low-priced: {_listing(rest)}.' if rest else '')
+    if template == 'priciest':
+        message = f"Our most expensive item is {first['name']} at ${first['price']}."
+        return message + (f' Also at the top of the range: {_listing(rest)}.' if rest else '')
+    if template == 'newest':
+        return f'Our latest additions: {_listing(entries)}.'
+    if len(entries) == 1:
+        return f"{first['name']} costs ${first['price']}."
+    shown = ', '.join(f"${e['price']} (ID {e['product_id']})" for e in entries[:PRICE_LIST_SIZE])
+    more = len(entries) - PRICE_LIST_SIZE
+    return f"We have {len(entries)} products called {first['name']}: {shown}" + (
+        f' and {more} more.' if more > 0 else '.'
+    )
+
+
+def populate_catalog_answers(apps, schema_editor):
+    Product = apps.get_model('shop', 'Product')
+    CatalogAnswer = apps.get_model('shop', 'CatalogAnswer')
+    rows = []
+    for template, (ordering, size) in RANKINGS.items():
+        entries = [product_entry(*row) for row in Product.objects.order_by(*ordering).values_list(*ENTRY_FIELDS)[:size]]
+        rows.append(CatalogAnswer(key=template, entries=entries, message=render_answer(template, entries)))
+    by_key = {}
+    for row in Product.objects.order_by('price', 'id').values_list(*ENTRY_FIELDS).iterator():
+        by_key.setdefault(price_key(row[2]), []).append(product_entry(*row))
+    rows.extend(
+        CatalogAnswer(key=key, entries=entries, message=render_answer('price', entries))
+        for key, entries in by_key.items()
+    )
+    CatalogAnswer.objects.bulk_create(rows, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_conversation_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=220, unique=True)),
+                ('entries', models.JSONField(default=list)),
+                ('message', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_catalog_answers, migrations.RunPython.noop),
+    ]
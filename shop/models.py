@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
 
@@ -20,6 +22,36 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['price']
+        indexes = [
+            models.Index(fields=['price'], name='shop_product_price_idx'),
+            models.Index(fields=['created_at'], name='shop_product_created_idx'),
+        ]
+
+
+class FacetCount(models.Model):
+    """Product count per facet bucket, kept current by ``shop.facets`` signal handlers"""
+    dimension = models.CharField(max_length=20)
+    bucket = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.dimension}={self.bucket}: {self.count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'bucket'], name='shop_facet_bucket_unique'),
+        ]
+
+
+class CatalogAnswer(models.Model):
+    """Precomputed reply to a templated catalog question, kept current by ``shop.answers``"""
+    key = models.CharField(max_length=220, unique=True)
+    entries = models.JSONField(default=list)
+    message = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
 
 
 class Conversation(models.Model):
@@ -34,3 +66,46 @@ class Conversation(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='shop_conv_timestamp_idx'),
+            models.Index(fields=['session_id', 'timestamp', 'id'], name='shop_conv_session_idx'),
+        ]
+
+
+class Job(models.Model):
+    """Background work item claimed and executed by ``manage.py run_jobs``"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.IntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.id} ({self.kind}) - {self.status}"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after'], name='shop_job_claim_idx'),
+        ]
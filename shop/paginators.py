@@ -0,0 +1,61 @@
+"""
+Paginators for admin changelists over very large tables.
+
+``Paginator.count`` runs ``COUNT(*)``, which scans the whole table on
+SQLite and PostgreSQL. ``EstimatedCountPaginator`` reads an estimate for
+unfiltered querysets and caps the count of filtered ones, so the page
+links stay usable and loading a page does not scan every row.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using="default"):
+    """Approximate row count without scanning the table"""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    elif connection.vendor == "mysql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+            row = cursor.fetchone()
+        if row and row[0]:
+            return row[0]
+
+    # Primary key span, exact until rows are deleted. Separate queries:
+    # SQLite only answers a lone MIN() or MAX() from the index.
+    rows = model._default_manager.using(using)
+    low = rows.aggregate(low=Min("pk"))["low"]
+    if low is None:
+        return 0
+    return rows.aggregate(high=Max("pk"))["high"] - low + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this an exact COUNT(*) is cheap enough
+    exact_count_below = 10_000
+    # Filtered results are counted up to this many rows
+    max_count = 100_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return super().count
+
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate >= self.exact_count_below:
+                return estimate
+            return queryset.count()
+        return queryset.order_by().values("pk")[:self.max_count].count()
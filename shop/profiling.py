@@ -0,0 +1,506 @@
+"""
+Opt-in profiling of slow requests and jobs.
+
+Off unless ``SHOP_PROFILE_DIR`` is set. Then ``ProfilingMiddleware``
+samples ``SHOP_PROFILE_SAMPLE_RATE`` of the requests whose path matches
+``SHOP_PROFILE_PATHS``, and ``run_jobs`` samples the jobs whose kind is
+in ``SHOP_PROFILE_JOBS`` the same way, since that is where agents run. A
+sampled request runs under a stack sampler that records the Python stack
+of its threads every ``SHOP_PROFILE_INTERVAL_MS``, next to a timeline of
+its SQL queries and its LLM spans (agent runs, model HTTP calls, agent
+pool round trips). When it took at least ``SHOP_PROFILE_THRESHOLD_MS``
+the capture is written to the profile directory as one JSON file; the
+directory is a ring that keeps the newest ``SHOP_PROFILE_MAX_CAPTURES``.
+
+Stacks are stored collapsed (``frame;frame;frame count``), the input
+format of flamegraph.pl and speedscope. ``manage.py profiles`` lists and
+shows captures and prints the collapsed stacks.
+
+The sampled threads are the one that started the capture plus any thread
+that runs SQL or an LLM span for it. Under WSGI that is exactly the
+request's thread. Under ASGI the event loop thread is shared, so its
+samples can include other requests running at the same moment.
+
+The current capture lives in a ContextVar, which tasks inherit. Code that
+starts a long-lived task while serving a request (a watcher or a reader
+shared by many requests) must start it with ``contextvars.Context()``, or
+that task's work lands in, and keeps alive, the request's capture.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.core.signals import setting_changed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 0.05
+DEFAULT_THRESHOLD_MS = 500
+DEFAULT_INTERVAL_MS = 5
+DEFAULT_MAX_CAPTURES = 200
+MAX_STACK_DEPTH = 128
+MAX_SQL_ENTRIES = 2000
+MAX_SQL_LENGTH = 2000
+CAPTURE_SUFFIX = ".json"
+
+# Where a sample's time goes, judged by the innermost frame that matches.
+# "wait" is an idle event loop or thread: time spent on I/O elsewhere.
+CATEGORIES = [
+    ("wait", ("selectors.py:select", "threading.py:wait")),
+    ("sql", ("django/db/", "sqlite3/")),
+    ("llm", ("agents/", "openai/", "httpx/", "httpcore", "shop/agents_logic/", "shop/agent_pool.py")),
+    ("json", ("json/", "shop/serializers.py")),
+    ("template", ("django/template/", "django/templatetags/")),
+]
+
+_current = ContextVar("shop_profile_capture", default=None)
+
+
+def profile_settings():
+    return {
+        "dir": getattr(settings, "SHOP_PROFILE_DIR", ""),
+        "sample_rate": getattr(settings, "SHOP_PROFILE_SAMPLE_RATE", DEFAULT_SAMPLE_RATE),
+        "threshold_ms": getattr(settings, "SHOP_PROFILE_THRESHOLD_MS", DEFAULT_THRESHOLD_MS),
+        "interval_ms": getattr(settings, "SHOP_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS),
+        "max_captures": getattr(settings, "SHOP_PROFILE_MAX_CAPTURES", DEFAULT_MAX_CAPTURES),
+        "paths": getattr(settings, "SHOP_PROFILE_PATHS", []),
+        "jobs": getattr(settings, "SHOP_PROFILE_JOBS", []),
+    }
+
+
+def enabled():
+    return bool(profile_settings()["dir"])
+
+
+# ==========================================================
+# Stack sampling
+# ==========================================================
+@lru_cache(maxsize=4096)
+def short_path(filename):
+    """``filename`` relative to the ``sys.path`` entry it was imported from"""
+    best = ""
+    for entry in sys.path:
+        entry = os.path.join(os.path.abspath(entry or "."), "")
+        if filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best):] if best else filename
+
+
+def collapse(frame):
+    """``root;...;leaf`` for ``frame``, one ``path:function`` label per frame"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        labels.append(f"{short_path(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def categorize(stack):
+    for label in reversed(stack.split(";")):
+        for category, markers in CATEGORIES:
+            if any(marker in label for marker in markers):
+                return category
+    return "python"
+
+
+class Sampler:
+    """One daemon thread per process, sampling the threads of every active capture"""
+
+    def __init__(self):
+        self._captures = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, capture):
+        with self._lock:
+            self._captures.add(capture)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="shop-profiler", daemon=True)
+                self._thread.start()
+
+    def remove(self, capture):
+        with self._lock:
+            self._captures.discard(capture)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                captures = list(self._captures)
+                if not captures:
+                    self._thread = None
+                    return
+            interval = min(c.interval for c in captures)
+            frames = sys._current_frames()
+            for capture in captures:
+                for ident in list(capture.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        capture.add_sample(collapse(frame))
+            del frames
+            time.sleep(interval)
+
+
+sampler = Sampler()
+
+
+# ==========================================================
+# Captures
+# ==========================================================
+class Capture:
+    def __init__(self, kind, name, interval_ms=DEFAULT_INTERVAL_MS):
+        self.kind = kind
+        self.name = name
+        self.interval = interval_ms / 1000
+        self.started_at = timezone.now()
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.threads = {threading.get_ident()}
+        self.stacks = {}
+        self.samples = 0
+        self.sql = []
+        self.sql_dropped = 0
+        self.llm = []
+        self.meta = {}
+        self._lock = threading.Lock()
+
+    def offset_ms(self, at=None):
+        return round(((at or time.perf_counter()) - self.started) * 1000, 3)
+
+    def join_thread(self):
+        self.threads.add(threading.get_ident())
+
+    def add_sample(self, stack):
+        with self._lock:
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def add_query(self, alias, sql, many, started, finished):
+        self.join_thread()
+        with self._lock:
+            if len(self.sql) >= MAX_SQL_ENTRIES:
+                self.sql_dropped += 1
+                return
+            self.sql.append({
+                "start_ms": self.offset_ms(started),
+                "duration_ms": round((finished - started) * 1000, 3),
+                "alias": alias,
+                "many": many,
+                "sql": sql[:MAX_SQL_LENGTH],
+            })
+
+    def add_span(self, name, started, finished, **detail):
+        self.join_thread()
+        with self._lock:
+            self.llm.append({
+                "name": name,
+                "start_ms": self.offset_ms(started),
+                "duration_ms": round((finished - started) * 1000, 3),
+                **detail,
+            })
+
+    def breakdown(self):
+        """Share of samples per ``CATEGORIES`` entry, the rest counted as python"""
+        counts = {}
+        for stack, count in self.stacks.items():
+            category = categorize(stack)
+            counts[category] = counts.get(category, 0) + count
+        return {c: round(n / self.samples, 3) for c, n in sorted(counts.items())} if self.samples else {}
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "name": self.name,
+                "started_at": self.started_at.isoformat(),
+                "duration_ms": self.duration_ms,
+                "pid": os.getpid(),
+                "interval_ms": round(self.interval * 1000, 3),
+                "samples": self.samples,
+                "breakdown": self.breakdown(),
+                "sql_count": len(self.sql) + self.sql_dropped,
+                "sql_ms": round(sum(q["duration_ms"] for q in self.sql), 3),
+                "llm_ms": round(covered_ms(self.llm), 3),
+                **self.meta,
+                "stacks": dict(sorted(self.stacks.items(), key=lambda item: -item[1])),
+                "sql": self.sql,
+                "llm": self.llm,
+            }
+
+
+def covered_ms(spans):
+    """Wall time covered by ``spans``; nested and concurrent spans count once"""
+    total, end = 0.0, None
+    for span in sorted(spans, key=lambda s: s["start_ms"]):
+        start, finish = span["start_ms"], span["start_ms"] + span["duration_ms"]
+        if end is None or start > end:
+            total += finish - start
+            end = finish
+        elif finish > end:
+            total += finish - end
+            end = finish
+    return total
+
+
+def should_sample(path=None):
+    config = profile_settings()
+    if not config["dir"]:
+        return False
+    if path is not None and config["paths"] and not any(re.search(p, path) for p in config["paths"]):
+        return False
+    return random.random() < config["sample_rate"]
+
+
+def start_capture(kind, name):
+    """Begin profiling the current context; returns ``(capture, token)`` for ``finish_capture``"""
+    config = profile_settings()
+    capture = Capture(kind, name, config["interval_ms"])
+    for wrapper in connections.all(initialized_only=True):
+        install_sql_hook(wrapper)
+    token = _current.set(capture)
+    sampler.add(capture)
+    return capture, token
+
+
+def finish_capture(capture, token=None):
+    """Stop sampling and keep the capture if it ran past the threshold"""
+    sampler.remove(capture)
+    if token is not None:
+        _current.reset(token)
+    capture.duration_ms = capture.offset_ms()
+    config = profile_settings()
+    if config["dir"] and capture.duration_ms >= config["threshold_ms"]:
+        try:
+            return save_capture(capture, config["dir"], config["max_captures"])
+        except OSError:
+            logger.exception("Could not write profile capture to %s", config["dir"])
+    return None
+
+
+@contextmanager
+def capturing(kind, name):
+    capture, token = start_capture(kind, name)
+    try:
+        yield capture
+    finally:
+        finish_capture(capture, token)
+
+
+@contextmanager
+def sampled(kind, name, path=None):
+    """``capturing`` for the ``should_sample`` share of calls; a no-op for the rest"""
+    if not should_sample(path):
+        yield None
+        return
+    with capturing(kind, name) as capture:
+        yield capture
+
+
+def job_profile(kind):
+    """``sampled`` for jobs whose kind is in ``SHOP_PROFILE_JOBS``"""
+    if kind not in profile_settings()["jobs"]:
+        return nullcontext()
+    return sampled("job", f"job {kind}")
+
+
+# ==========================================================
+# SQL and LLM instrumentation
+# ==========================================================
+def _record_sql(execute, sql, params, many, context):
+    capture = _current.get()
+    if capture is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        capture.add_query(context["connection"].alias, sql, many, started, time.perf_counter())
+
+
+def install_sql_hook(connection):
+    # Outermost, so ``execute_wrapper()`` blocks opened later still pop their own wrapper
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_sql)
+
+
+def hook_new_connection(sender, connection, **kwargs):
+    install_sql_hook(connection)
+
+
+def connect_sql_hook():
+    """Hook SQL timing into this thread's connections and new ones, only while profiling is on"""
+    if enabled():
+        for wrapper in connections.all(initialized_only=True):
+            install_sql_hook(wrapper)
+        connection_created.connect(hook_new_connection, dispatch_uid="shop_profile_sql")
+    else:
+        connection_created.disconnect(dispatch_uid="shop_profile_sql")
+
+
+@receiver(setting_changed)
+def profile_dir_changed(sender, setting, **kwargs):
+    if setting == "SHOP_PROFILE_DIR":
+        connect_sql_hook()
+
+
+@contextmanager
+def llm_span(name, **detail):
+    """Record the body as an LLM span of the current capture, if there is one"""
+    capture = _current.get()
+    if capture is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        capture.add_span(name, started, time.perf_counter(), **detail)
+
+
+async def model_request_started(request):
+    """httpx request hook; pairs with ``model_response_received``"""
+    if _current.get() is not None:
+        request.extensions["shop_profile_started"] = time.perf_counter()
+
+
+async def model_response_received(response):
+    capture = _current.get()
+    started = response.request.extensions.get("shop_profile_started")
+    if capture is not None and started is not None:
+        capture.add_span(
+            f"model {response.request.method} {response.request.url.path}", started, time.perf_counter(),
+            status=response.status_code, request_bytes=len(response.request.content),
+        )
+
+
+# ==========================================================
+# Ring buffer on disk
+# ==========================================================
+def save_capture(capture, directory, max_captures):
+    os.makedirs(directory, exist_ok=True)
+    capture_id = f"{capture.started_at:%Y%m%dT%H%M%S%f}-{os.getpid()}-{id(capture) % 10**6:06d}"
+    path = os.path.join(directory, capture_id + CAPTURE_SUFFIX)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"id": capture_id, **capture.as_dict()}, f)
+    os.replace(tmp, path)
+
+    # Oldest first by name; other processes may be pruning the same files
+    for stale in capture_ids(directory)[:-max_captures]:
+        try:
+            os.unlink(os.path.join(directory, stale + CAPTURE_SUFFIX))
+        except FileNotFoundError:
+            pass
+    return capture_id
+
+
+def capture_ids(directory):
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(name[:-len(CAPTURE_SUFFIX)] for name in names if name.endswith(CAPTURE_SUFFIX))
+
+
+def load_capture(directory, capture_id):
+    with open(os.path.join(directory, os.path.basename(capture_id) + CAPTURE_SUFFIX), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def collapsed_stacks(capture):
+    """flamegraph.pl / speedscope input: one ``stack count`` line per distinct stack"""
+    return "\n".join(f"{stack} {count}" for stack, count in capture["stacks"].items())
+
+
+# ==========================================================
+# Middleware
+# ==========================================================
+class ProfilingMiddleware:
+    """Profile a sample of requests and keep the slow ones; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not should_sample(request.path):
+            return self.get_response(request)
+        capture, token = start_capture("request", f"{request.method} {request.path}")
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            finish_capture(capture, token)
+            raise
+        return self.finish(capture, token, response)
+
+    async def __acall__(self, request):
+        if not should_sample(request.path):
+            return await self.get_response(request)
+        capture, token = start_capture("request", f"{request.method} {request.path}")
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            finish_capture(capture, token)
+            raise
+        return self.finish(capture, token, response)
+
+    def finish(self, capture, token, response):
+        capture.meta["status"] = response.status_code
+        if not response.streaming:
+            finish_capture(capture, token)
+            return response
+        # The body is produced while the server iterates; profile that too
+        _current.reset(token)
+        if response.is_async:
+            response.streaming_content = _profiled_async_stream(capture, response.streaming_content)
+        else:
+            response.streaming_content = _profiled_stream(capture, response.streaming_content)
+        return response
+
+
+def _profiled_stream(capture, content):
+    token = _current.set(capture)
+    try:
+        yield from content
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # closed from another context; nothing of ours is left set there
+        finish_capture(capture)
+
+
+async def _profiled_async_stream(capture, content):
+    token = _current.set(capture)
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass
+        finish_capture(capture)
@@ -0,0 +1,240 @@
+"""
+Rate limiting and admission control for the paid ``/chat/`` endpoint.
+
+``rate_limit`` keys each request by session (or client IP) and checks it
+against a token bucket or a sliding window kept either in process memory
+or in the Django cache, answering 429 with ``Retry-After`` when a client
+is over its budget. ``admission_gate`` caps how many requests a process
+handles at once and sheds the excess with 503.
+
+Configured through ``SHOP_RATE_LIMITS`` and ``SHOP_ADMISSION_GATES`` in
+settings; see ``ecommerce_ai/settings.py`` for the shape.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+TOKEN_BUCKET = "token_bucket"
+SLIDING_WINDOW = "sliding_window"
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0
+
+
+# ==========================================================
+# Backends
+# ==========================================================
+class LocalBackend:
+    """Per-process state; exact, but each worker process counts separately"""
+
+    def __init__(self, max_keys=10000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._state = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key, value):
+        self._state[key] = value
+        self._state.move_to_end(key)
+        while len(self._state) > self.max_keys:
+            self._state.popitem(last=False)
+
+    def token_bucket(self, key, capacity, refill_per_second):
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self._state.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            if tokens >= 1:
+                self._remember(key, (tokens - 1, now))
+                return Decision(True)
+            self._remember(key, (tokens, now))
+            return Decision(False, (1 - tokens) / refill_per_second)
+
+    def sliding_window(self, key, limit, window):
+        """Sliding log: exact count of hits in the trailing ``window`` seconds"""
+        with self._lock:
+            now = self.clock()
+            hits = self._state.get(key) or deque()
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) < limit:
+                hits.append(now)
+                self._remember(key, hits)
+                return Decision(True)
+            self._remember(key, hits)
+            return Decision(False, hits[0] + window - now)
+
+
+class CacheBackend:
+    """State in a Django cache so every process shares one budget per client"""
+
+    def __init__(self, alias="default", prefix="shop-rl", clock=time.time):
+        self.cache = caches[alias]
+        self.prefix = prefix
+        self.clock = clock
+
+    def token_bucket(self, key, capacity, refill_per_second):
+        # Read-modify-write without a lock: concurrent hits from the same
+        # client can occasionally both spend the last token.
+        cache_key = f"{self.prefix}:tb:{key}"
+        now = self.clock()
+        tokens, updated = self.cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        timeout = math.ceil(capacity / refill_per_second) + 1
+        if tokens >= 1:
+            self.cache.set(cache_key, (tokens - 1, now), timeout)
+            return Decision(True)
+        self.cache.set(cache_key, (tokens, now), timeout)
+        return Decision(False, (1 - tokens) / refill_per_second)
+
+    def sliding_window(self, key, limit, window):
+        """Sliding window counter: current fixed window plus a weighted share of the previous one"""
+        now = self.clock()
+        current = int(now // window)
+        elapsed = (now % window) / window
+        current_key = f"{self.prefix}:sw:{key}:{current}"
+        previous = self.cache.get(f"{self.prefix}:sw:{key}:{current - 1}", 0)
+
+        self.cache.add(current_key, 0, timeout=math.ceil(window * 2))
+        count = self.cache.incr(current_key)
+        if previous * (1 - elapsed) + count <= limit:
+            return Decision(True)
+
+        self.cache.decr(current_key)
+        return Decision(False, window * (1 - elapsed))
+
+
+BACKENDS = {
+    "local": LocalBackend,
+    "cache": CacheBackend,
+}
+
+
+# ==========================================================
+# Limiter
+# ==========================================================
+class RateLimiter:
+    def __init__(self, backend, algorithm=TOKEN_BUCKET, rate=10, period=60, burst=None):
+        if algorithm not in (TOKEN_BUCKET, SLIDING_WINDOW):
+            raise ValueError(f"Unknown rate limit algorithm '{algorithm}'")
+        self.backend = backend
+        self.algorithm = algorithm
+        self.rate = rate
+        self.period = period
+        self.burst = burst or rate
+
+    def hit(self, key):
+        if self.algorithm == TOKEN_BUCKET:
+            return self.backend.token_bucket(key, self.burst, self.rate / self.period)
+        return self.backend.sliding_window(key, self.rate, self.period)
+
+
+_limiters = {}
+_gates = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Limiter for ``SHOP_RATE_LIMITS[name]``, rebuilt when its config changes"""
+    config = dict(settings.SHOP_RATE_LIMITS[name])
+    signature = (name, tuple(sorted(config.items())))
+    with _limiters_lock:
+        limiter = _limiters.get(signature)
+        if limiter is None:
+            backend_options = {"alias": config.pop("cache_alias")} if "cache_alias" in config else {}
+            backend = BACKENDS[config.pop("backend", "local")](**backend_options)
+            limiter = _limiters[signature] = RateLimiter(backend, **config)
+    return limiter
+
+
+def reset_limits():
+    """Forget all in-process limiter and gate state (tests, benchmarks)"""
+    with _limiters_lock:
+        _limiters.clear()
+        _gates.clear()
+
+
+def client_key(request):
+    """Session key when the client has a stored session, otherwise its IP address"""
+    # The session cookie is whatever the client sends; a made-up key per
+    # request would otherwise get a fresh bucket every time.
+    session = getattr(request, "session", None)
+    session_key = session.session_key if session is not None else None
+    if session_key and session.exists(session_key):
+        return f"session:{session_key}"
+    if getattr(settings, "SHOP_TRUST_X_FORWARDED_FOR", False):
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+
+def too_many_requests(retry_after, status=429, message="Too many requests, please slow down."):
+    response = JsonResponse({"error": message}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(name):
+    """Reject a client with 429 once it exceeds ``SHOP_RATE_LIMITS[name]``"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            decision = get_limiter(name).hit(f"{name}:{client_key(request)}")
+            if not decision.allowed:
+                return too_many_requests(decision.retry_after)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==========================================================
+# Admission control
+# ==========================================================
+class AdmissionGate:
+    """Non-blocking cap on requests in flight inside this process"""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+
+    def try_enter(self):
+        return self._semaphore.acquire(blocking=False)
+
+    def leave(self):
+        self._semaphore.release()
+
+
+def get_gate(name):
+    max_in_flight = settings.SHOP_ADMISSION_GATES[name]
+    with _limiters_lock:
+        gate = _gates.get(name)
+        if gate is None or gate.max_in_flight != max_in_flight:
+            gate = _gates[name] = AdmissionGate(max_in_flight)
+    return gate
+
+
+def admission_gate(name):
+    """Shed load with 503 when ``SHOP_ADMISSION_GATES[name]`` requests are already running"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            gate = get_gate(name)
+            if not gate.try_enter():
+                return too_many_requests(1, status=503, message="Server is busy, please retry shortly.")
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                gate.leave()
+        return wrapper
+    return decorator
@@ -0,0 +1,48 @@
+"""
+Full-text search over conversations.
+
+On SQLite builds with FTS5, migration 0004 creates ``shop_conversation_fts``,
+an external-content index over ``user_message`` and ``agent_response``. It
+is kept in sync by triggers, so ``bulk_create`` and raw writes are indexed
+too. ``search_conversations`` matches every word of the term as a token
+prefix ("jack" finds "jacket"). Where the index does not exist (other
+databases, SQLite without FTS5) it falls back to ``icontains``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "shop_conversation_fts"
+WORD_RE = re.compile(r"\w+")
+
+
+def fts_available(using="default"):
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return False
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def fts_query(term):
+    """FTS5 MATCH expression: every word as a quoted prefix, ANDed"""
+    return " ".join(f'"{word}"*' for word in WORD_RE.findall(term))
+
+
+def search_conversations(queryset, term):
+    """Conversations whose messages contain every word of ``term``, or whose session is ``term``"""
+    term = term.strip()
+    if not term:
+        return queryset
+
+    session = Q(session_id=term)
+    match = fts_query(term)
+    if match and fts_available(queryset.db):
+        rowids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        return queryset.filter(session | Q(id__in=rowids))
+
+    text = Q()
+    for word in term.split():
+        text &= Q(user_message__icontains=word) | Q(agent_response__icontains=word)
+    return queryset.filter(session | text)
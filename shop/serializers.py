@@ -0,0 +1,116 @@
+"""
+Streaming JSON serializers for the product listing endpoints.
+
+Rows come from ``values_list().iterator()`` so no model instances are built,
+media URLs are joined onto a prefix resolved once per response instead of
+asking the storage backend for every row, and the JSON body is written in
+buffered chunks through ``StreamingHttpResponse``.
+
+Under ASGI the body must be an async iterator: Django serves a sync one
+by collecting it into a list first, which would hold the whole listing
+in memory. ``aiter_products_json`` reads the same rows a write at a time
+through ``sync_to_async``.
+"""
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.encoding import filepath_to_uri
+
+# Columns read for each listing, in output order
+PRODUCT_FIELDS = ("id", "product_id", "name", "price", "description", "image")
+PRODUCT_FIELDS_WITH_CREATED = PRODUCT_FIELDS + ("created_at",)
+
+DEFAULT_CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+_encode = json.JSONEncoder().encode
+
+
+def media_url_prefix(storage=default_storage):
+    """Base URL the storage backend puts in front of every file name"""
+    return storage.url("")
+
+
+def product_row_to_dict(row, fields, prefix):
+    item = {}
+    for field, value in zip(fields, row):
+        if field == "image":
+            item["image_url"] = prefix + filepath_to_uri(value).lstrip("/") if value else None
+        elif field == "price":
+            item["price"] = str(value)
+        elif field == "description":
+            item["description"] = value or ""
+        elif field == "created_at":
+            item["created_at"] = value.isoformat()
+        else:
+            item[field] = value
+    return item
+
+
+def _opening(extra):
+    return "{" + "".join(f"{_encode(key)}: {_encode(value)}, " for key, value in (extra or {}).items()) + (
+        '"products": ['
+    )
+
+
+def _encode_rows(rows, fields, prefix, first):
+    body = ", ".join(_encode(product_row_to_dict(row, fields, prefix)) for row in rows)
+    return body if first else ", " + body
+
+
+def _next_write(rows, fields, prefix, first):
+    """The next ``ROWS_PER_WRITE`` rows of ``rows`` as JSON, or None once it is exhausted"""
+    batch = list(islice(rows, ROWS_PER_WRITE))
+    return _encode_rows(batch, fields, prefix, first) if batch else None
+
+
+def iter_products_json(queryset, fields=PRODUCT_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE, extra=None):
+    """Yield ``{"products": [...]}`` for ``queryset`` a few hundred rows at a time
+
+    Keys in ``extra`` are written ahead of the product list.
+    """
+    prefix = media_url_prefix()
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+    yield _opening(extra)
+    first = True
+    while (chunk := _next_write(rows, fields, prefix, first)) is not None:
+        yield chunk
+        first = False
+    yield "]}"
+
+
+async def aiter_products_json(queryset, fields=PRODUCT_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE, extra=None):
+    """``iter_products_json`` as an async iterator, for responses served over ASGI
+
+    Each write is fetched and encoded in the database thread, so the event
+    loop only sends bytes. (``aiterator()`` cannot start a ``values_list``
+    query from async code in Django 5.2.)
+    """
+    prefix = media_url_prefix()
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)  # lazy until the first write
+    next_write = sync_to_async(_next_write)
+
+    yield _opening(extra)
+    first = True
+    while (chunk := await next_write(rows, fields, prefix, first)) is not None:
+        yield chunk
+        first = False
+    yield "]}"
+
+
+def stream_products(request, queryset, fields=PRODUCT_FIELDS, chunk_size=DEFAULT_CHUNK_SIZE, extra=None):
+    """StreamingHttpResponse with the same body shape the old JsonResponse had
+
+    The body is an async iterator when ``request`` came in over ASGI.
+    """
+    iterate = aiter_products_json if isinstance(request, ASGIRequest) else iter_products_json
+    return StreamingHttpResponse(
+        iterate(queryset, fields, chunk_size, extra),
+        content_type="application/json",
+    )
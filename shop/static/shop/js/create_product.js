@@ -0,0 +1,32 @@
+document.getElementById('productForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+
+    // clear old errors
+    document.querySelectorAll('.error').forEach(el => el.innerText = "");
+
+    try {
+        const response = await fetch('/create-product/', {
+            method: 'POST',
+            body: formData
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            alert('✅ Product created successfully!');
+            window.location.href = '/';
+        } else {
+            // show validation errors
+            for (const [field, messages] of Object.entries(data.errors)) {
+                const errorDiv = document.getElementById(`error-${field}`);
+                if (errorDiv) {
+                    errorDiv.innerText = messages.join(", ");
+                }
+            }
+        }
+    } catch (error) {
+        alert('⚠️ Error creating product. Please try again.');
+    }
+});
@@ -0,0 +1,337 @@
+// Endpoints come from the data-*-url attributes on this script's tag
+const pageUrls = {
+    chat: document.currentScript.dataset.chatUrl,
+    retrieve: document.currentScript.dataset.retrieveUrl,
+};
+
+// Global variables
+let cart = [];
+let lastProductId = null;
+let imageUploadModal;
+
+// Initialize modal
+document.addEventListener('DOMContentLoaded', function() {
+    imageUploadModal = new bootstrap.Modal(document.getElementById('imageUploadModal'));
+    initializeEventListeners();
+});
+
+// Event Listeners
+function initializeEventListeners() {
+    // Retrieve products button
+    const retrieveBtn = document.getElementById('retrieve-products-btn');
+    if (retrieveBtn) {
+        retrieveBtn.addEventListener('click', function() {
+            this.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Retrieving...';
+            this.disabled = true;
+            document.getElementById('loading-indicator').style.display = 'block';
+
+            fetch(pageUrls.retrieve, {
+                method: 'GET',
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest',
+                }
+            })
+            .then(response => response.text())
+            .then(html => {
+                document.documentElement.innerHTML = html;
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('Error retrieving products. Please try again.');
+                this.innerHTML = '<i class="fas fa-search"></i> Retrieve & Display Products';
+                this.disabled = false;
+                document.getElementById('loading-indicator').style.display = 'none';
+            });
+        });
+    }
+
+    // File input change
+    const fileInput = document.getElementById('fileInput');
+    if (fileInput) {
+        fileInput.addEventListener('change', function() {
+            const fileName = document.getElementById('fileName');
+            if (this.files.length > 0) {
+                fileName.textContent = 'Selected: ' + this.files[0].name;
+            } else {
+                fileName.textContent = '';
+            }
+        });
+    }
+
+    // Upload image button
+    const uploadBtn = document.getElementById('uploadImageBtn');
+    if (uploadBtn) {
+        uploadBtn.addEventListener('click', uploadImage);
+    }
+
+    // Search functionality
+    const searchInput = document.getElementById('searchInput');
+    if (searchInput) {
+        searchInput.addEventListener('input', function(e) {
+            const searchTerm = e.target.value.toLowerCase();
+            filterProducts(searchTerm);
+        });
+    }
+}
+
+// Chat work runs in a background job; poll with backoff until it finishes or we give up
+const JOB_POLL_TIMEOUT_MS = 3 * 60 * 1000;
+const JOB_POLL_MAX_DELAY_MS = 5000;
+
+async function waitForJob(data) {
+    if (!data.queued) return data;
+    const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+    let delay = 500;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        delay = Math.min(delay * 1.5, JOB_POLL_MAX_DELAY_MS);
+        const response = await fetch(data.status_url);
+        if (!response.ok) {
+            return { error: `Could not check on the request (HTTP ${response.status})` };
+        }
+        const job = await response.json();
+        if (job.status === 'done') return job.result;
+        if (job.status === 'failed' || job.error) {
+            return { error: job.error || 'Job failed' };
+        }
+    }
+    return { error: 'Timed out waiting for a reply, please try again' };
+}
+
+// AI Search Functions
+function toggleAISearch() {
+    const panel = document.getElementById('aiSearchPanel');
+    const overlay = document.getElementById('blurOverlay');
+    const isActive = panel.classList.contains('active');
+
+    if (isActive) {
+        closeAISearch();
+    } else {
+        panel.classList.add('active');
+        overlay.classList.add('active');
+        document.getElementById('aiSearchInput').focus();
+    }
+}
+
+function closeAISearch() {
+    const panel = document.getElementById('aiSearchPanel');
+    const overlay = document.getElementById('blurOverlay');
+    panel.classList.remove('active');
+    overlay.classList.remove('active');
+}
+
+function quickSearch(query) {
+    document.getElementById('aiSearchInput').value = query;
+    sendAIMessage();
+}
+
+async function sendAIMessage() {
+    const input = document.getElementById('aiSearchInput');
+    const message = input.value.trim();
+
+    if (!message) return;
+
+    const responseContainer = document.getElementById('aiResponseContainer');
+    const responseContent = document.getElementById('aiResponseContent');
+
+    // Show loading state
+    responseContainer.classList.add('active');
+    responseContent.innerHTML = `
+        <div class="ai-typing">
+            <i class="fas fa-robot"></i>
+            <span>AI is thinking...</span>
+            <div class="ai-typing-dots">
+                <span></span>
+                <span></span>
+                <span></span>
+            </div>
+        </div>
+    `;
+
+    try {
+        const response = await fetch(pageUrls.chat, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCsrfToken(),
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        const data = await waitForJob(await response.json());
+
+        if (data.error) {
+            responseContent.innerHTML = `
+                <div style="color: #e74c3c;">
+                    <h4>⚠️ Error</h4>
+                    <p>${data.error}</p>
+                </div>
+            `;
+            return;
+        }
+
+        // Display agent response
+        const agentMessage = data.agent_output?.agent_message || 'No response from AI';
+        responseContent.innerHTML = `
+            <div>
+                <h4 style="color: #667eea; margin-bottom: 15px;">🤖 AI Response</h4>
+                <p>${agentMessage}</p>
+            </div>
+        `;
+
+        // Handle product creation trigger
+        if (data.trigger_upload && data.product_id) {
+            lastProductId = data.product_id;
+            closeAISearch();
+            imageUploadModal.show();
+        }
+
+        input.value = '';
+
+    } catch (error) {
+        console.error('Chat error:', error);
+        responseContent.innerHTML = `
+            <div style="color: #e74c3c;">
+                <h4>⚠️ Error</h4>
+                <p>Failed to communicate with AI. Please try again.</p>
+            </div>
+        `;
+    }
+}
+
+// Image Upload Function
+async function uploadImage() {
+    const fileInput = document.getElementById('fileInput');
+    const file = fileInput.files[0];
+
+    if (!file || !lastProductId) {
+        alert('Please select a file first.');
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('image', file);
+    formData.append('product_id', lastProductId);
+
+    try {
+        const response = await fetch(pageUrls.chat, {
+            method: 'POST',
+            body: formData
+        });
+
+        const data = await waitForJob(await response.json());
+
+        if (data.success) {
+            alert('Image uploaded successfully!');
+            imageUploadModal.hide();
+            fileInput.value = '';
+            document.getElementById('fileName').textContent = '';
+            location.reload(); // Refresh to show updated product
+        } else {
+            alert('Error uploading image: ' + (data.error || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Upload error:', error);
+        alert('Failed to upload image. Please try again.');
+    }
+}
+
+// Cart Functions
+function addToCart(productId, productName, productPrice) {
+    cart.push({ id: productId, name: productName, price: productPrice });
+    updateCartCounter();
+    showNotification(`${productName} added to cart!`);
+}
+
+function updateCartCounter() {
+    const cartButton = document.getElementById('cartButton');
+    if (cartButton) {
+        cartButton.textContent = `🛒 Cart (${cart.length})`;
+        cartButton.style.transform = 'scale(1.2)';
+        setTimeout(() => {
+            cartButton.style.transform = 'scale(1)';
+        }, 200);
+    }
+}
+
+function showNotification(message) {
+    const notification = document.createElement('div');
+    notification.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: #2ecc71;
+        color: white;
+        padding: 15px 25px;
+        border-radius: 10px;
+        font-weight: 600;
+        z-index: 10000;
+        animation: slideInFromRight 0.3s ease-out;
+    `;
+    notification.textContent = message;
+    document.body.appendChild(notification);
+
+    setTimeout(() => {
+        notification.style.animation = 'slideOutToRight 0.3s ease-in forwards';
+        setTimeout(() => notification.remove(), 300);
+    }, 3000);
+}
+
+// Product Search Function
+function filterProducts(searchTerm) {
+    const productCards = document.querySelectorAll('#productRow .product-card');
+
+    productCards.forEach(card => {
+        const productName = card.querySelector('.product-name')?.textContent.toLowerCase() || '';
+        const productDescription = card.querySelector('.product-description')?.textContent.toLowerCase() || '';
+
+        if (productName.includes(searchTerm) || productDescription.includes(searchTerm)) {
+            card.parentElement.style.display = 'block';
+        } else {
+            card.parentElement.style.display = 'none';
+        }
+    });
+}
+
+// Utility Functions
+function getCsrfToken() {
+    const metaToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+    if (metaToken) return metaToken;
+
+    const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]')?.value;
+    if (csrfToken) return csrfToken;
+
+    const cookies = document.cookie.split(';');
+    for (let cookie of cookies) {
+        const [name, value] = cookie.trim().split('=');
+        if (name === 'csrftoken') return value;
+    }
+
+    return '';
+}
+
+// AI Search Input Enter Key Handler
+document.addEventListener('DOMContentLoaded', function() {
+    const aiSearchInput = document.getElementById('aiSearchInput');
+    if (aiSearchInput) {
+        aiSearchInput.addEventListener('keydown', function(e) {
+            if (e.key === 'Enter') {
+                sendAIMessage();
+            }
+        });
+    }
+});
+
+// Add CSS animations
+const style = document.createElement('style');
+style.textContent = `
+    @keyframes slideInFromRight {
+        from { transform: translateX(100%); opacity: 0; }
+        to { transform: translateX(0); opacity: 1; }
+    }
+    @keyframes slideOutToRight {
+        from { transform: translateX(0); opacity: 1; }
+        to { transform: translateX(100%); opacity: 0; }
+    }
+`;
+document.head.appendChild(style);
@@ -0,0 +1,177 @@
+// --- Chat ---
+const sendBtn = document.getElementById("sendBtn");
+const userInput = document.getElementById("userInput");
+const messageArea = document.getElementById("messageArea");
+
+const uploadModal = document.getElementById("uploadModal");
+const fileInput = document.getElementById("fileInput");
+const chooseFileBtn = document.getElementById("chooseFileBtn");
+const chosenFile = document.getElementById("chosenFile");
+
+const successCard = document.getElementById("successCard");
+const successImage = document.getElementById("successImage");
+const successName = document.getElementById("successName");
+const successDesc = document.getElementById("successDesc");
+const successPrice = document.getElementById("successPrice");
+
+const btnAdd = document.getElementById("btnAdd");
+const btnUpdate = document.getElementById("btnUpdate");
+const btnDelete = document.getElementById("btnDelete");
+
+const deleteModal = document.getElementById("deleteModal");
+const btnYes = document.getElementById("btnYes");
+const btnNo = document.getElementById("btnNo");
+
+let lastProductId = null;
+
+function appendMessage(prefix, text) {
+  // Create message bubble
+  const bubble = document.createElement('div');
+  bubble.className = 'message-bubble';
+
+  if (prefix === 'You') {
+    bubble.className += ' user-message';
+    bubble.innerHTML = `<strong>You:</strong> ${text}`;
+  } else if (prefix === 'Agent') {
+    bubble.className += ' agent-message';
+    bubble.innerHTML = `<strong>AI Assistant:</strong> ${text}`;
+  } else if (prefix === 'Error') {
+    bubble.className += ' error-message';
+    bubble.innerHTML = `<strong>Error:</strong> ${text}`;
+  }
+
+  // Insert at the beginning (after the initial message)
+  const firstChild = messageArea.children[0];
+  messageArea.insertBefore(bubble, firstChild.nextSibling);
+
+  // Scroll to bottom
+  messageArea.scrollTop = messageArea.scrollHeight;
+}
+
+// Chat work runs in a background job; poll with backoff until it finishes or we give up
+const JOB_POLL_TIMEOUT_MS = 3 * 60 * 1000;
+const JOB_POLL_MAX_DELAY_MS = 5000;
+
+async function waitForJob(data) {
+  if (!data.queued) return data;
+  const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+  let delay = 500;
+  while (Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, delay));
+    delay = Math.min(delay * 1.5, JOB_POLL_MAX_DELAY_MS);
+    const response = await fetch(data.status_url);
+    if (!response.ok) {
+      return { error: `Could not check on the request (HTTP ${response.status})` };
+    }
+    const job = await response.json();
+    if (job.status === "done") return job.result;
+    if (job.status === "failed" || job.error) {
+      return { error: job.error || "Job failed" };
+    }
+  }
+  return { error: "Timed out waiting for a reply, please try again" };
+}
+
+async function sendMessage() {
+  const message = userInput.value.trim();
+  if (!message) return;
+  appendMessage("You", message);
+  userInput.value = "";
+
+  try {
+    const res = await fetch("/chat/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ message })
+    });
+    const data = await waitForJob(await res.json());
+
+    if (data.error) {
+      appendMessage("Error", data.error);
+      return;
+    }
+
+    appendMessage("Agent", JSON.stringify(data.agent_output));
+
+    if (data.product_id) {
+      lastProductId = data.product_id;
+    }
+
+    if (data.trigger_upload === true) {
+      uploadModal.classList.remove("hidden");
+    }
+  } catch (err) {
+    console.error(err);
+    appendMessage("Error", "Network or server error.");
+  }
+}
+
+chooseFileBtn.addEventListener("click", () => fileInput.click());
+
+fileInput.addEventListener("change", async () => {
+  const file = fileInput.files[0];
+  if (file && lastProductId) {
+    chosenFile.textContent = "Selected: " + file.name;
+
+    const formData = new FormData();
+    formData.append("image", file);
+    formData.append("product_id", lastProductId);
+
+    try {
+      const res = await fetch("/chat/", {
+        method: "POST",
+        body: formData
+      });
+      const data = await waitForJob(await res.json());
+
+      if (data.success) {
+        successName.textContent = data.product_name || "Unnamed Product";
+        successDesc.textContent = data.product_description || "";
+        successPrice.textContent = data.product_price || "0.00";
+        successImage.src = data.image_url || "/static/img/placeholder.png";
+
+        successCard.classList.remove("hidden");
+      }
+
+      uploadModal.classList.add("hidden");
+      chosenFile.textContent = "";
+      fileInput.value = "";
+    } catch (err) {
+      console.error(err);
+      appendMessage("Error", "Image upload failed.");
+    }
+  }
+});
+
+// --- Success Card Buttons ---
+btnAdd.addEventListener("click", () => {
+  window.location.href = "/"; 
+});
+
+btnUpdate.addEventListener("click", () => {
+  const params = new URLSearchParams({
+    product_id: lastProductId,
+    name: successName.textContent,
+    description: successDesc.textContent,
+    price: successPrice.textContent
+  });
+  window.location.href = `/create-product/?${params.toString()}`;
+});
+
+btnDelete.addEventListener("click", () => {
+  deleteModal.classList.remove("hidden");
+});
+
+// --- Delete Modal ---
+btnYes.addEventListener("click", () => {
+  window.location.href = "/"; // just redirect, product not saved
+});
+
+btnNo.addEventListener("click", () => {
+  deleteModal.classList.add("hidden"); // hide modal, stay on page
+});
+
+sendBtn.addEventListener("click", sendMessage);
+userInput.addEventListener("keydown", (e) => {
+  if (e.key === "Enter") sendMessage();
+});
@@ -0,0 +1,118 @@
+"""
+Job handlers for work the web tier hands off to ``manage.py run_jobs``.
+
+Each handler returns the JSON payload the frontend used to receive
+directly from ``/chat/``; it is exposed through the job status endpoint.
+"""
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from shop.agents_logic.agent_service import process_user_query
+from . import agent_pool, profiling
+from .jobs import job_handler
+from .models import Conversation, Product
+from .views import convert_to_decimal
+
+
+# ==========================================================
+# Chat
+# ==========================================================
+def save_chat_result(user_message, agent_response, session_id):
+    """Upsert the product the agent confirmed and log the conversation"""
+    is_add = agent_response.get("is_add", False)
+    product_id = agent_response.get("product_id")
+    name = agent_response.get("product_name")
+    price_raw = agent_response.get("product_price")
+    description = agent_response.get("product_description")
+
+    product = None
+
+    # If agent confirms product info, create/update Product
+    if is_add and name and price_raw:
+        if not product_id:
+            product_id = str(uuid.uuid4())[:8]
+
+        price_decimal = convert_to_decimal(price_raw)
+
+        product, created = Product.objects.get_or_create(
+            product_id=product_id,
+            defaults={
+                "name": name,
+                "price": price_decimal,
+                "description": description or "",
+            },
+        )
+        if not created:
+            product.name = name
+            product.price = price_decimal
+            product.description = description or ""
+            product.save()
+
+    Conversation.objects.create(
+        user_message=user_message,
+        agent_response=json.dumps(agent_response),
+        session_id=session_id,
+    )
+
+    return {
+        "success": True,
+        "agent_message": agent_response.get("agent_message", "No response"),
+        "is_add": is_add,
+        "product_id": product_id,
+        "product_name": product.name if product else name,
+        "product_price": str(product.price) if product else str(convert_to_decimal(price_raw)) if price_raw else None,
+        "product_description": product.description if product else description,
+        "trigger_upload": is_add and bool(name and price_raw),
+    }
+
+
+@job_handler("chat")
+async def handle_chat(payload):
+    """Run the agent for one chat message and persist what it produced"""
+    if settings.SHOP_AGENT_POOL_SOCKET:
+        with profiling.llm_span("agent_pool query"):
+            agent_response = await agent_pool.get_client().query(payload["message"])
+    else:
+        agent_response = await process_user_query(payload["message"])
+    return await sync_to_async(save_chat_result)(
+        payload["message"], agent_response, payload.get("session_id") or "anonymous"
+    )
+
+
+# ==========================================================
+# Images
+# ==========================================================
+@job_handler("attach_image")
+def handle_attach_image(payload):
+    """Validate an uploaded image already in storage and attach it to its product
+
+    A rejected or failed upload is deleted from storage; the job is queued
+    with a single attempt, since a retry would find nothing to attach.
+    """
+    try:
+        product = Product.objects.get(product_id=payload["product_id"])
+
+        with default_storage.open(payload["path"]) as fh:
+            Image.open(fh).verify()
+
+        product.image.name = payload["path"]
+        product.save(update_fields=["image"])
+    except Exception:
+        default_storage.delete(payload["path"])
+        raise
+
+    return {
+        "success": True,
+        "message": f"✅ Image uploaded successfully for product {product.product_id}",
+        "image_url": product.image.url,
+        "trigger_upload": False,
+        "product_id": product.product_id,
+        "product_name": product.name,
+        "product_description": product.description,
+        "product_price": str(product.price),
+    }
@@ -1,3 +1,959 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+
+from shop import profiling, tasks  # noqa: F401  (tasks registers the job handlers)
+from shop import urls as shop_urls
+from shop.answers import match_question, rebuild_catalog_answers
+from shop.assets import minify_css, minify_js
+from shop.agent_pool import AgentPoolClient, serve
+from shop.agents_logic import agent_service
+from shop.agents_logic.parser import DIRECT_PARSE_CONFIDENCE, normalize_amount, parse_product_text
+from shop.benchmarks import latency_percentiles
+from shop.benchmarks.agent import run_agent_benchmark
+from shop.benchmarks.agent_pool import run_pool_benchmark
+from shop.benchmarks.answers import run_answers_benchmark
+from shop.benchmarks.facets import live_facet_counts
+from shop.benchmarks.history import run_history_benchmark
+from shop.benchmarks.parser_corpus import run_parser_benchmark
+from shop.benchmarks.report import build_report, compare_reports, load_report
+from shop.benchmarks.runner import default_scenarios, run_suite
+from shop.benchmarks.seed import seed_conversations, seed_products
+from shop.benchmarks.serialization import legacy_products_body
+from shop.benchmarks.stubs import stub_llm, unlimited_chat
+from shop.facets import facet_counts, rebuild_facet_counts
+from shop.history import HistoryWatcher, decode_cursor, encode_cursor
+from shop.jobs import HANDLERS, claim, enqueue, job_handler, run_pending
+from shop.lifespan import LifespanMiddleware
+from shop.models import CatalogAnswer, Conversation, FacetCount, Job, Product
+from shop.paginators import EstimatedCountPaginator
+from shop.pricing import DELTA, PERCENT, SET, PriceRule, reprice
+from shop.profiling import capture_ids, capturing, llm_span, load_capture
+from shop.ratelimit import (
+    SLIDING_WINDOW, TOKEN_BUCKET, CacheBackend, LocalBackend, RateLimiter, get_gate, reset_limits,
+)
+from shop.search import fts_available, search_conversations
+from shop.validation import normalize_prices, validate_products
+from shop.views import convert_to_decimal
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_seeders_write_requested_rows(self):
+        self.assertEqual(seed_products(120, batch_size=50), 120)
+        self.assertEqual(seed_conversations(30, batch_size=7), 30)
+        self.assertEqual(Product.objects.count(), 120)
+        self.assertEqual(Conversation.objects.count(), 30)
+
+    def test_suite_covers_every_route_without_errors(self):
+        seed_products(20)
+        seed_conversations(20)
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                stub_llm(), unlimited_chat():
+            results = run_suite(["client", "asgi"], iterations=1)
+
+        self.assertIn("client:index", results)
+        self.assertIn("asgi:chat_text", results)
+        self.assertEqual(results["asgi:job_status"]["status_codes"], [200])
+        self.assertEqual(results["client:validate_products"]["status_codes"], [200])
+        for key, result in results.items():
+            self.assertTrue(all(code < 500 for code in result["status_codes"]), key)
+        for driver in ("client", "asgi"):
+            self.assertEqual(results[f"{driver}:reprice_dry_run"]["status_codes"], [200])
+
+        covered = {resolve(scenario.resolved().path).url_name for scenario in default_scenarios()}
+        self.assertEqual(covered, {pattern.name for pattern in shop_urls.urlpatterns})
+
+    def test_compare_reports_flags_slowdowns_and_extra_queries(self):
+        baseline = build_report({"client:index": {"p50_ms": 10.0, "p99_ms": 20.0, "queries": 1, "peak_alloc_kb": 100}})
+        current = build_report({"client:index": {"p50_ms": 30.0, "p99_ms": 20.5, "queries": 2, "peak_alloc_kb": 110}})
+
+        regressions = compare_reports(baseline, current, threshold=0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(any("p50_ms" in line for line in regressions))
+        self.assertTrue(any("queries" in line for line in regressions))
+
+    def test_bench_commands_share_options_and_report(self):
+        self.assertEqual(latency_percentiles([3.0, 1.0, 2.0, 4.0], (50, 99), prefix="x_"),
+                         {"x_p50_ms": 2.0, "x_p99_ms": 4.0})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "parser.json")
+            call_command("bench_parser", cases=50, fuzz=50, output=path, stdout=StringIO())
+            report = load_report(path)
+        self.assertEqual(report["meta"]["cases"], 50)
+        self.assertIn("parser:parser", report["results"])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        reset_limits()
+
+    def test_chat_is_queued_and_result_is_polled(self):
+        response = self.client.post("/chat/", json.dumps({"message": "add product called Tee for $19.99"}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["status_url"]
+        self.assertEqual(self.client.get(status_url).json()["status"], Job.QUEUED)
+
+        with stub_llm():
+            self.assertEqual(run_pending("test-worker"), 1)
+
+        job = self.client.get(status_url).json()
+        self.assertEqual(job["status"], Job.DONE)
+        self.assertEqual(job["result"]["product_name"], "Benchmark Tee")
+        self.assertTrue(Product.objects.filter(product_id=job["result"]["product_id"]).exists())
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_claimed_job_cannot_be_claimed_twice(self):
+        enqueue("noop")
+        self.assertIsNotNone(claim("worker-a"))
+        self.assertIsNone(claim("worker-b"))
+
+    def test_failing_job_is_retried_then_marked_failed(self):
+        @job_handler("explode")
+        def explode(payload):
+            raise RuntimeError("boom")
+
+        self.addCleanup(HANDLERS.pop, "explode")
+        job = enqueue("explode", max_attempts=2)
+
+        with self.assertLogs("shop.jobs", "ERROR"):
+            run_pending("test-worker")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        with self.assertLogs("shop.jobs", "ERROR"):
+            run_pending("test-worker")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (Job.FAILED, "boom"))
+
+    def test_rejected_image_upload_is_deleted(self):
+        Product.objects.create(product_id="TEE", name="Tee", price="9.99")
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+            upload = SimpleUploadedFile("page.html", b"<script>alert(1)</script>", content_type="image/png")
+            response = self.client.post("/chat/", {"product_id": "TEE", "image": upload})
+            path = Job.objects.get().payload["path"]
+            self.assertTrue(default_storage.exists(path))
+
+            with self.assertLogs("shop.jobs", "ERROR"):
+                run_pending("test-worker")
+
+            self.assertEqual(self.client.get(response.json()["status_url"]).json()["status"], Job.FAILED)
+            self.assertFalse(default_storage.exists(path))
+            self.assertFalse(Product.objects.get().image)
+
+
+class StreamingSerializerTests(TestCase):
+    def test_products_stream_matches_legacy_payload(self):
+        seed_products(1200, image_every=4)
+
+        response = self.client.get("/api/products/")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(response.getvalue()), json.loads(legacy_products_body()))
+
+    def test_filter_products_streams_matching_rows(self):
+        seed_products(50)
+        name = Product.objects.first().name
+
+        response = self.client.post("/api/filter-products/", json.dumps({"name": name}),
+                                    content_type="application/json")
+
+        products = json.loads(response.getvalue())["products"]
+        self.assertEqual([p["name"] for p in products], [name])
+        self.assertNotIn("created_at", products[0])
+
+    async def test_asgi_requests_stream_from_an_async_iterator(self):
+        await sync_to_async(seed_products)(1200, image_every=4)
+
+        response = await self.async_client.get("/api/products/")
+
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response])
+        expected = await sync_to_async(legacy_products_body)()
+        self.assertEqual(json.loads(body), json.loads(expected))
+
+
+class FacetTests(TestCase):
+    def filter(self, **body):
+        response = self.client.post("/api/filter-products/", json.dumps(body), content_type="application/json")
+        return response, json.loads(response.getvalue()) if response.streaming else response.json()
+
+    def test_signals_keep_counts_in_step_with_the_catalog(self):
+        seed_products(300, image_every=5)
+        Product.objects.create(product_id="N1", name="New Coat", price="620.00")
+        cheap = Product.objects.create(product_id="N2", name="Cheap Cap", price="9.99")
+        cheap.price = "75.00"
+        cheap.image = "products/cap.jpg"
+        cheap.save()
+        Product.objects.filter(product_id="B00000001").get().delete()
+
+        self.assertEqual(facet_counts(), live_facet_counts())
+        rebuild_facet_counts()
+        self.assertEqual(facet_counts(), live_facet_counts())
+
+    def test_filters_by_price_band_image_and_sorts(self):
+        Product.objects.create(product_id="A", name="Tee", price="10.00")
+        Product.objects.create(product_id="B", name="Jeans", price="60.00", image="products/jeans.jpg")
+        Product.objects.create(product_id="C", name="Coat", price="80.00")
+
+        _, body = self.filter(price_band=["50-100"], sort="-price")
+        self.assertEqual([p["product_id"] for p in body["products"]], ["C", "B"])
+        self.assertEqual(body["facets"]["price"]["50-100"], 2)
+
+        _, body = self.filter(has_image=True)
+        self.assertEqual([p["product_id"] for p in body["products"]], ["B"])
+        for flag in ("true", "1", "yes"):
+            _, body = self.filter(has_image=flag)
+            self.assertEqual([p["product_id"] for p in body["products"]], ["B"])
+        _, body = self.filter(has_image="no")
+        self.assertEqual([p["product_id"] for p in body["products"]], ["A", "C"])
+        self.assertEqual(self.filter(has_image="maybe")[0].status_code, 400)
+
+    def test_negative_prices_are_filtered_by_the_band_that_counts_them(self):
+        Product.objects.create(product_id="N", name="Refund", price="-5.00")
+        Product.objects.create(product_id="A", name="Tee", price="10.00")
+
+        _, body = self.filter(price_band=["0-25"])
+        self.assertEqual([p["product_id"] for p in body["products"]], ["N", "A"])
+        self.assertEqual(body["facets"]["price"]["0-25"], 2)
+        rebuild_facet_counts()
+        self.assertEqual(facet_counts(), live_facet_counts())
+
+    def test_migration_counts_what_a_rebuild_would(self):
+        seed_products(200, image_every=4)
+        Product.objects.create(product_id="N", name="Refund", price="-5.00")
+        FacetCount.objects.all().delete()
+        import_module("shop.migrations.0003_facets").populate_facet_counts(apps, None)
+        migrated = facet_counts()
+        rebuild_facet_counts()
+        self.assertEqual(migrated, facet_counts())
+
+    def test_unknown_sort_is_rejected(self):
+        response, body = self.filter(sort="random")
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_filters_are_rejected(self):
+        Product.objects.create(product_id="A", name="Tee", price="10.00")
+        for body in ({"price_band": "bogus"}, {"price_band": ["0-25", "bogus"]}, {"price_band": 5},
+                     {"min_price": "NaN"}, {"max_price": "Infinity"}, {"min_price": "cheap"},
+                     {"created_within": ["7d"]}, {"sort": ["price"]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.filter(**body)[0].status_code, 400)
+        response = self.client.post("/api/filter-products/", "[1]", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+CHAT_LIMITS = {"chat": {"algorithm": TOKEN_BUCKET, "backend": "local", "rate": 6, "period": 60, "burst": 3}}
+
+
+@override_settings(SHOP_RATE_LIMITS=CHAT_LIMITS)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        reset_limits()
+        self.addCleanup(reset_limits)
+
+    def chat(self, ip):
+        return self.client.post("/chat/", json.dumps({"message": "hi"}), content_type="application/json",
+                                REMOTE_ADDR=ip)
+
+    def test_bursty_client_is_throttled_without_starving_others(self):
+        statuses = {"10.0.0.1": [], "10.0.0.2": []}
+        for i in range(20):
+            statuses["10.0.0.1"].append(self.chat("10.0.0.1").status_code)
+            if i % 7 == 0:
+                statuses["10.0.0.2"].append(self.chat("10.0.0.2").status_code)
+
+        self.assertEqual(statuses["10.0.0.1"].count(202), 3)
+        self.assertEqual(statuses["10.0.0.2"], [202, 202, 202])
+
+        response = self.chat("10.0.0.1")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_forged_session_cookies_share_the_ip_bucket(self):
+        statuses = []
+        for i in range(5):
+            self.client.cookies["sessionid"] = f"forged{i:026d}"
+            statuses.append(self.chat("10.0.0.5").status_code)
+        self.assertEqual(statuses, [202, 202, 202, 429, 429])
+
+        self.client.cookies.clear()
+        self.client.get("/")  # a real, stored session gets its own bucket
+        self.assertEqual(self.chat("10.0.0.5").status_code, 202)
+
+    def test_algorithms_refill_over_time(self):
+        for algorithm in (TOKEN_BUCKET, SLIDING_WINDOW):
+            for backend in (LocalBackend(clock=FakeClock()), CacheBackend(prefix=algorithm, clock=FakeClock())):
+                limiter = RateLimiter(backend, algorithm, rate=2, period=10, burst=2)
+                with self.subTest(algorithm=algorithm, backend=type(backend).__name__):
+                    self.assertEqual([limiter.hit("k").allowed for _ in range(3)], [True, True, False])
+                    self.assertTrue(limiter.hit("other").allowed)
+                    backend.clock.now += 20
+                    self.assertTrue(limiter.hit("k").allowed)
+
+    def test_limiter_overhead_per_request_is_small(self):
+        limiter = RateLimiter(LocalBackend(), TOKEN_BUCKET, rate=10**6, period=1)
+        started = time.perf_counter()
+        for i in range(10000):
+            limiter.hit(f"client-{i % 100}")
+        per_hit_us = (time.perf_counter() - started) / 10000 * 10**6
+        self.assertLess(per_hit_us, 200)
+
+    @override_settings(SHOP_ADMISSION_GATES={"chat": 1})
+    def test_admission_gate_sheds_load_when_full(self):
+        gate = get_gate("chat")
+        self.assertTrue(gate.try_enter())
+        try:
+            response = self.chat("10.0.0.3")
+        finally:
+            gate.leave()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(self.chat("10.0.0.3").status_code, 202)
+
+    @override_settings(SHOP_CHAT_MAX_QUEUED=2)
+    def test_chat_backlog_is_capped(self):
+        enqueue("chat", {"message": "a"})
+        enqueue("chat", {"message": "b"})
+        self.assertEqual(self.chat("10.0.0.4").status_code, 503)
+
+
+class ProductParserTests(TestCase):
+    def test_normalizes_currencies_separators_and_decimals(self):
+        self.assertEqual(normalize_amount("1,299.5"), "1299.50")
+        self.assertEqual(normalize_amount("4.500,00"), "4500.00")
+        self.assertEqual(normalize_amount("12 500"), "12500.00")
+        self.assertEqual(normalize_amount("1,299"), "1299.00")
+        self.assertEqual(normalize_amount("-5"), "-5.00")
+
+    def test_parses_labelled_and_free_text_requests(self):
+        parsed = parse_product_text("create product\nname: Denim Jacket\nprice: 4.500,00 EUR\n"
+                                    "description: Classic blue\nsku: DJ-01")
+        self.assertEqual(
+            (parsed.product_name, parsed.product_price, parsed.currency, parsed.product_description, parsed.product_id),
+            ("Denim Jacket", "4500.00", "EUR", "Classic blue", "DJ-01"),
+        )
+
+        parsed = parse_product_text('Please add a product called "Summer Linen Shirt" for $1,299.50')
+        self.assertEqual((parsed.product_name, parsed.product_price), ("Summer Linen Shirt", "1299.50"))
+        self.assertGreaterEqual(parsed.confidence, DIRECT_PARSE_CONFIDENCE)
+
+    def test_questions_and_incomplete_requests_need_the_model(self):
+        self.assertFalse(parse_product_text("how much is the $40 jacket?").is_add)
+        self.assertLess(parse_product_text("add product called Boots").confidence, DIRECT_PARSE_CONFIDENCE)
+        for text in ("Do you have a new product called Linen Shirt for $30?",
+                     "don't add product called Tee for $5",
+                     "add product called Tee for $5? not sure yet",
+                     "I saw a new product called Tee for $5"):
+            with self.subTest(text=text):
+                self.assertLess(parse_product_text(text).confidence, DIRECT_PARSE_CONFIDENCE)
+
+    def test_magnitudes_and_second_prices_need_the_model(self):
+        for text in ("add product called Car for $5k", "add product called Car for $25k",
+                     "add product called Car for $2.5 million", "add product called Car for 3 thousand dollars",
+                     "add product\nname: Car\nprice: 5k", "add product called Car for $10, actually make it $20"):
+            with self.subTest(text=text):
+                parsed = parse_product_text(text)
+                self.assertNotIn(parsed.product_price, ("5.00", "2.00", "2.50", "3.00"))
+                self.assertLess(parsed.confidence, DIRECT_PARSE_CONFIDENCE)
+        self.assertEqual(parse_product_text("add product called Car for 1299pkr").product_price, "1299.00")
+
+    def test_prices_the_product_form_rejects_need_the_model(self):
+        query = async_to_sync(agent_service.process_user_query)
+        with mock.patch.object(agent_service.Runner, "run", side_effect=RuntimeError("model called")):
+            for text in ("add product called Tee for $0", "add product called Tee for -5 dollars",
+                         "add product called Tee for $123,456,789"):
+                with self.subTest(text=text), self.assertLogs("shop.agents_logic.agent_service", "ERROR"):
+                    self.assertEqual(query(text)["error"], "model called")
+
+    def test_confident_parse_skips_the_model(self):
+        with mock.patch.object(agent_service.Runner, "run", side_effect=AssertionError("model called")):
+            response = async_to_sync(agent_service.process_user_query)("add product called Tee for $19.99")
+
+        self.assertEqual((response["is_add"], response["product_name"], response["product_price"]),
+                         (True, "Tee", "19.99"))
+        self.assertIn("Tee - $19.99", response["agent_message"])
+
+        with mock.patch.object(agent_service.Runner, "run", side_effect=AssertionError("model called")):
+            response = async_to_sync(agent_service.process_user_query)("add product called Tee for 4.500,00 EUR")
+        self.assertIn("Tee - €4500.00", response["agent_message"])
+
+    def test_corpus_accuracy_and_fuzz(self):
+        results = run_parser_benchmark(cases=300, fuzz=300)
+
+        self.assertEqual(results["parser:parser"]["fuzz_crashes"], 0)
+        self.assertGreaterEqual(results["parser:parser"]["case_accuracy"], 0.95)
+
+
+class BatchValidationTests(TestCase):
+    def test_batch_prices_match_convert_to_decimal(self):
+        values = ["$1,299.99", " 12 ", "PKR 450", "abc", "", None, 7, "1.2.3", "-5", "9\x0099", Decimal("3.50")]
+        self.assertEqual(normalize_prices(values), [convert_to_decimal(v) for v in values])
+
+    def test_validates_rows_with_one_uniqueness_query_per_chunk(self):
+        Product.objects.create(product_id="TAKEN", name="Existing", price="5.00")
+        rows = [
+            {"product_id": "TAKEN", "name": "Dup of db", "price": "10"},
+            {"product_id": "NEW1", "name": "Good", "price": "$1,250.00"},
+            {"product_id": "NEW1", "name": "Dup in batch", "price": "3"},
+            {"product_id": "NEW2", "name": "", "price": "0"},
+            {"product_id": "X" * 21, "name": "Long id", "price": "1.999"},
+        ] + [{"product_id": f"OK{i}", "name": "Filler", "price": "1"} for i in range(10)]
+
+        with self.assertNumQueries(2):
+            result = validate_products(rows, chunk_size=10)
+
+        self.assertEqual(sorted(result.errors), [0, 2, 3, 4])
+        self.assertIn("already exists", result.errors[0]["product_id"][0])
+        self.assertEqual(set(result.errors[3]), {"name", "price"})
+        self.assertEqual(result.cleaned[0]["price"], Decimal("1250.00"))
+        self.assertEqual(len(result.cleaned), 11)
+
+    def test_validate_endpoint_reports_errors_by_row(self):
+        response = self.client.post("/api/products/validate/", json.dumps({"products": [
+            {"product_id": "A1", "name": "Tee", "price": "19.99"},
+            {"product_id": "A1", "name": "Tee", "price": "19.99"},
+        ]}), content_type="application/json")
+
+        body = response.json()
+        self.assertFalse(body["valid"])
+        self.assertEqual((body["valid_count"], list(body["errors"])), (1, ["1"]))
+
+
+class RepriceTests(TestCase):
+    def setUp(self):
+        for i, price in enumerate(["10.00", "24.00", "49.99", "0.50"]):
+            Product.objects.create(product_id=f"TEE{i}", name=f"Tee {i}", price=price)
+        Product.objects.create(product_id="MUG1", name="Mug", price="8.00")
+
+    def prices(self):
+        return dict(Product.objects.values_list("product_id", "price"))
+
+    def test_rules_round_and_floor_prices(self):
+        self.assertEqual(PriceRule(PERCENT, "10").apply(Decimal("24.00")), Decimal("26.40"))
+        self.assertEqual(PriceRule(PERCENT, "-33.333").apply(Decimal("10.00")), Decimal("6.67"))
+        self.assertEqual(PriceRule(DELTA, "-1").apply(Decimal("0.50")), Decimal("0.01"))
+        self.assertEqual(PriceRule(SET, "5").apply(Decimal("99.00")), Decimal("5.00"))
+        with self.assertRaises(ValueError):
+            PriceRule("double", "2")
+        with self.assertRaises(ValueError):
+            PriceRule(SET, "0")
+        with self.assertRaisesRegex(ValueError, "Invalid name pattern"):
+            PriceRule(SET, "5", name_pattern="tee(")
+        for value in ("NaN", "Infinity", "-Infinity"):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                PriceRule(PERCENT, value)
+        self.assertEqual(PriceRule(PERCENT, "-1e30").apply(Decimal("24.00")), Decimal("0.01"))
+        for rule in (PriceRule(PERCENT, "1e30"), PriceRule(DELTA, "1e9")):
+            with self.subTest(rule=rule), self.assertRaisesRegex(ValueError, "must be below"):
+                rule.apply(Decimal("24.00"))
+
+    def test_reprice_matches_patterns_in_chunks_and_keeps_facets_in_sync(self):
+        before = self.prices()
+        with CaptureQueriesContext(connection) as queries:
+            result = reprice(PriceRule(PERCENT, "5", name_pattern="^tee"), chunk_size=2)
+        product_writes = [q for q in queries if 'UPDATE "shop_product"' in q["sql"]]
+
+        after = self.prices()
+        self.assertEqual((result.matched, result.changed, result.batches), (4, 4, 2))
+        self.assertEqual(len(product_writes), result.batches)
+        self.assertEqual(after["TEE1"], Decimal("25.20"))
+        self.assertEqual(after["MUG1"], before["MUG1"])
+        self.assertEqual(facet_counts(), live_facet_counts())
+
+    def test_dry_run_reports_diff_without_writing(self):
+        before = self.prices()
+        result = reprice(PriceRule(DELTA, "1", id_pattern="^TEE[01]$"), dry_run=True)
+
+        self.assertEqual(self.prices(), before)
+        self.assertEqual((result.changed, result.batches), (2, 0))
+        self.assertEqual(result.as_dict()["diff"][0], {"product_id": "TEE0", "old_price": "10.00", "new_price": "11.00"})
+
+    def test_endpoint_is_staff_only(self):
+        body = json.dumps({"mode": "set", "value": "9.99", "id_pattern": "^MUG"})
+        response = self.client.post("/api/products/reprice/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        response = self.client.post("/api/products/reprice/", body, content_type="application/json")
+        self.assertEqual((response.status_code, response.json()["changed"]), (200, 1))
+        self.assertEqual(self.prices()["MUG1"], Decimal("9.99"))
+
+        body = json.dumps({"mode": "set", "value": "9.99", "id_pattern": "[MUG"})
+        response = self.client.post("/api/products/reprice/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid id pattern", response.json()["error"])
+
+    def test_out_of_range_rules_are_rejected_before_writing(self):
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        before = self.prices()
+        for body in ({"mode": "percent", "value": "NaN", "dry_run": True},
+                     {"mode": "percent", "value": "Infinity"}, {"mode": "set", "value": "1e30"},
+                     {"mode": "percent", "value": "1e30", "dry_run": True}, {"mode": "delta", "value": "1e9"},
+                     {"mode": "delta", "value": "1", "name_pattern": ["tee"]}, [1]):
+            with self.subTest(body=body):
+                response = self.client.post("/api/products/reprice/", json.dumps(body),
+                                            content_type="application/json")
+                self.assertEqual(response.status_code, 400)
+        # One chunk per product: the overflow on the dearest must stop the first chunk too
+        Product.objects.create(product_id="TOP", name="Top", price="99999990.00")
+        with self.assertRaisesMessage(CommandError, "must be below"):
+            call_command("reprice", delta="20", chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.prices(), {**before, "TOP": Decimal("99999990.00")})
+
+
+class AgentWarmupTests(TestCase):
+    def test_lifespan_runs_startup_hooks_and_passes_other_scopes_on(self):
+        calls = []
+
+        async def hook():
+            calls.append("startup")
+
+        async def app(scope, receive, send):
+            calls.append(scope["type"])
+
+        async def drive(scope, messages):
+            sent = []
+            inbox = iter(messages)
+
+            async def receive():
+                return next(inbox)
+
+            async def send(message):
+                sent.append(message["type"])
+
+            await LifespanMiddleware(app, on_startup=[hook])(scope, receive, send)
+            return sent
+
+        sent = async_to_sync(drive)({"type": "lifespan"}, [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        self.assertEqual(sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"])
+        async_to_sync(drive)({"type": "http"}, [])
+        self.assertEqual(calls, ["startup", "http"])
+
+    def test_warm_agents_reuse_one_connection_and_a_cached_prompt_prefix(self):
+        results = run_agent_benchmark(requests=3, connect_delay=0, per_kb_delay=0)
+
+        warm, legacy = results["agent:warm"], results["agent:legacy"]
+        self.assertEqual(warm["connections"], 1)
+        self.assertGreater(warm["cached_share"], 0.5)
+        self.assertLess(warm["bytes_per_request"], legacy["bytes_per_request"])
+
+
+class ConversationAdminTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.jacket = Conversation.objects.create(
+            user_message="Do you have a denim jacket in navy? " + "x" * 80, agent_response="{}",
+            session_id="s-1", timestamp=now,
+        )
+        Conversation.objects.create(user_message="Linen shirts please", agent_response="{}",
+                                    session_id="s-2", timestamp=now - timedelta(days=40))
+
+    def test_full_text_search_and_fallback_agree(self):
+        self.assertTrue(fts_available())  # created by migration 0004
+        queryset = Conversation.objects.all()
+        for term, expected in [("jack", [self.jacket.pk]), ("denim NAVY", [self.jacket.pk]),
+                               ("s-2", [self.jacket.pk + 1]), ("velvet", [])]:
+            with self.subTest(term=term):
+                self.assertEqual(list(search_conversations(queryset, term).values_list("pk", flat=True)), expected)
+                with mock.patch("shop.search.fts_available", return_value=False):
+                    self.assertEqual(list(search_conversations(queryset, term).values_list("pk", flat=True)), expected)
+
+        self.jacket.user_message = "Velvet blazer"
+        self.jacket.save()
+        self.assertEqual(list(search_conversations(queryset, "velvet")), [self.jacket])
+        self.assertFalse(search_conversations(queryset, "denim").exists())
+
+    def test_paginator_estimates_unfiltered_and_caps_filtered_counts(self):
+        paginator = EstimatedCountPaginator(Conversation.objects.order_by("-timestamp"), 1)
+        paginator.exact_count_below = 0
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 2)
+
+        paginator = EstimatedCountPaginator(Conversation.objects.filter(agent_response="{}"), 1)
+        paginator.max_count = 1
+        self.assertEqual(paginator.count, 1)
+
+    def test_changelist_renders_snippets_and_date_drilldown(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+        local = timezone.localtime(self.jacket.timestamp)
+
+        response = self.client.get("/admin/shop/conversation/", {"q": "denim"})
+        self.assertContains(response, "Do you have a denim jacket in navy? xxxxxxxxxxxxxx...")
+        self.assertNotContains(response, "Linen shirts")
+
+        response = self.client.get("/admin/shop/conversation/", {
+            "timestamp__year": local.year, "timestamp__month": local.month,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        self.assertContains(response, f"timestamp__day={local.day}")
+
+
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        self.session_id = self.client.session.session_key
+        start = timezone.now() - timedelta(hours=1)
+        for i in range(5):
+            Conversation.objects.create(
+                user_message=f"message {i}",
+                agent_response=json.dumps({"is_add": False, "agent_message": f"reply {i}", "product_image": None}),
+                session_id=self.session_id, timestamp=start + timedelta(minutes=i // 2),
+            )
+        Conversation.objects.create(user_message="someone else", agent_response="{}", session_id="other")
+
+    def get(self, **params):
+        headers = {"HTTP_IF_NONE_MATCH": params.pop("etag")} if "etag" in params else {}
+        return self.client.get("/history/", params, **headers)
+
+    def test_pages_walk_back_and_forward_by_cursor(self):
+        latest = self.get(limit=2).json()
+        self.assertEqual([e["user"] for e in latest["items"]], ["message 3", "message 4"])
+        self.assertEqual(latest["items"][0], {"id": latest["items"][0]["id"], "ts": latest["items"][0]["ts"],
+                                              "user": "message 3", "agent": "reply 3"})
+        self.assertTrue(latest["has_more"])
+
+        older = self.get(limit=2, before=latest["before"]).json()
+        oldest = self.get(limit=2, before=older["before"]).json()
+        self.assertEqual([e["user"] for e in older["items"] + oldest["items"]],
+                         ["message 1", "message 2", "message 0"])
+        self.assertFalse(oldest["has_more"])
+
+        newer = self.get(after=oldest["after"]).json()
+        self.assertEqual([e["user"] for e in newer["items"]], [f"message {i}" for i in range(1, 5)])
+        self.assertNotIn("someone else", json.dumps(newer))
+
+    def test_etag_and_long_poll(self):
+        first = self.get()
+        self.assertEqual(self.get(etag=first["ETag"]).status_code, 304)
+
+        started = time.monotonic()
+        self.assertEqual(self.get(etag=first["ETag"], wait="0.2").status_code, 304)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        Conversation.objects.create(user_message="new", agent_response="{}", session_id=self.session_id)
+        changed = self.get(etag=first["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], first["ETag"])
+
+    def test_watcher_wakes_waiting_session(self):
+        async def scenario():
+            watcher = HistoryWatcher(interval=0.01)
+            waiting = asyncio.ensure_future(watcher.wait(self.session_id, timeout=5))
+            await asyncio.sleep(0.05)
+            await sync_to_async(Conversation.objects.create)(
+                user_message="hi", agent_response="{}", session_id=self.session_id,
+            )
+            return await waiting, await watcher.wait("other", timeout=0.05)
+
+        self.assertEqual(async_to_sync(scenario)(), (True, False))
+
+    def test_watcher_restarts_right_after_cancelling(self):
+        async def add_later():
+            await asyncio.sleep(0.05)
+            await sync_to_async(Conversation.objects.create)(
+                user_message="hi", agent_response="{}", session_id=self.session_id,
+            )
+
+        async def scenario():
+            watcher = HistoryWatcher(interval=0.01)
+            self.assertFalse(await watcher.wait(self.session_id, timeout=0.02))
+            # The cancelled poller has not run since; this wait must start a new one
+            writer = asyncio.ensure_future(add_later())
+            woken = await watcher.wait(self.session_id, timeout=2)
+            await writer
+            return woken
+
+        self.assertTrue(async_to_sync(scenario)())
+
+    def test_bad_cursor_and_missing_session(self):
+        self.assertEqual(self.get(before="not-a-cursor").status_code, 400)
+        self.assertEqual(self.get(wait="nan").status_code, 400)
+        stamp = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(stamp, 7)), (stamp, 7))
+        self.client.cookies.clear()
+        self.assertEqual(self.get().json()["items"], [])
+
+    def test_polling_benchmark_runs(self):
+        results = run_history_benchmark(clients=5, duration=0.3, interval=0.05, write_rate=20,
+                                        modes=("etag", "longpoll"))
+        self.assertGreater(results["history:etag"]["not_modified"], 0)
+        longpoll = results["history:longpoll"]
+        self.assertEqual(longpoll["delivered"], longpoll["writes"])
+
+
+class CatalogAnswerTests(TestCase):
+    def answers(self):
+        return dict(CatalogAnswer.objects.values_list("key", "entries"))
+
+    def chat(self, message):
+        return self.client.post("/chat/", json.dumps({"message": message}), content_type="application/json")
+
+    def test_signals_keep_answers_in_step_with_the_catalog(self):
+        seed_products(50)
+        rebuild_catalog_answers()
+        Product.objects.create(product_id="N1", name="The Linen Shirt", price="0.50")
+        twin = Product.objects.create(product_id="N2", name="linen shirt!", price="30.00")
+        coat = Product.objects.create(product_id="N3", name="Wool Coat", price="2000.00")
+        coat.name, coat.price = "Camel Coat", "1500.00"
+        coat.save()
+        twin.delete()
+        Product.objects.order_by("price").first().delete()
+        reprice(PriceRule(PERCENT, "10"), chunk_size=20)
+
+        incremental = self.answers()
+        rebuild_catalog_answers()
+        self.assertEqual(incremental, self.answers())
+        self.assertNotIn("price:wool coat", incremental)
+        self.assertEqual(incremental["priciest"][0]["name"], "Camel Coat")
+
+    def test_migration_populates_what_a_rebuild_would(self):
+        seed_products(50)
+        Product.objects.create(product_id="N1", name="The Linen Shirt", price="0.50")
+        CatalogAnswer.objects.all().delete()
+        import_module("shop.migrations.0005_catalog_answers").populate_catalog_answers(apps, None)
+        migrated = set(CatalogAnswer.objects.values_list("key", "message"))
+        migrated_entries = self.answers()
+        rebuild_catalog_answers()
+        self.assertEqual(migrated, set(CatalogAnswer.objects.values_list("key", "message")))
+        self.assertEqual(migrated_entries, self.answers())
+
+    def test_chat_serves_templated_questions_without_the_agents(self):
+        Product.objects.create(product_id="A", name="Classic Tee", price="9.99")
+        Product.objects.create(product_id="B", name="Denim Jacket", price="89.00")
+
+        response = self.chat("Hi, what's your cheapest item?")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["precomputed"], "cheapest")
+        self.assertTrue(response.json()["agent_message"].startswith("Our cheapest item is Classic Tee at $9.99."))
+        self.assertEqual(self.chat("How much is the denim jacket?").json()["agent_message"],
+                         "Denim Jacket costs $89.00.")
+        self.assertEqual(Conversation.objects.count(), 2)
+        self.assertFalse(Job.objects.exists())
+
+        for message in ("Show me your cheapest jackets", "How much is the velvet cape?",
+                        "add product called Cheapest Tee for $5"):
+            self.assertEqual(self.chat(message).status_code, 202, message)
+        self.assertIsNone(match_question("add product called Cheapest Tee for $5"))
+
+    def test_benchmark_runs(self):
+        seed_products(30)
+        results = run_answers_benchmark(requests=60, llm_requests=2, model_latency=0, saves=5)
+        self.assertEqual(results["answers:hit_rate"]["by_label"]["cheapest"], 1.0)
+        self.assertEqual(results["answers:hit_rate"]["by_label"]["chat"], 0.0)
+        self.assertEqual(results["answers:llm"]["requests"], 2)
+
+
+class AssetPipelineTests(TestCase):
+    def test_minifiers_keep_strings_regexes_and_line_breaks(self):
+        self.assertEqual(
+            minify_css('a :hover , b > c { content : "x  /* y */" ; } /* gone */'),
+            'a :hover,b>c{content :"x  /* y */"}',
+        )
+        source = "const re = /a\\/b/g; // gone\n\n    let s = `keep  // this`;\n/* gone */ run(a / b);\n"
+        self.assertEqual(minify_js(source), "const re = /a\\/b/g;\nlet s = `keep  // this`;\nrun(a / b);\n")
+
+    def test_collected_assets_are_hashed_compressed_and_immutable(self):
+        static_root = tempfile.mkdtemp()
+        with override_settings(DEBUG=False, STATIC_ROOT=static_root):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            page = self.client.get("/choose-creation/").content.decode()
+            url = page.split('href="')[1].split('"')[0]
+            self.assertRegex(url, r"^/static/shop/css/choose_creation\.[0-9a-f]{12}\.css$")
+
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(response["Content-Type"], "text/css; charset=utf-8")
+            self.assertIn("immutable", response["Cache-Control"])
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+
+            plain = self.client.get("/static/shop/css/choose_creation.css", HTTP_ACCEPT_ENCODING="identity")
+            self.assertNotIn("Content-Encoding", plain)
+            self.assertNotIn("immutable", plain["Cache-Control"])
+            self.assertNotIn("/*", plain.content.decode())
+            self.assertEqual(self.client.get("/static/../manage.py").status_code, 404)
+
+    def test_media_is_served_without_debug(self):
+        media_root = tempfile.mkdtemp()
+        with open(f"{media_root}/photo.png", "wb") as f:
+            f.write(b"png-bytes")
+        with override_settings(DEBUG=False, MEDIA_ROOT=media_root):
+            response = self.client.get("/media/photo.png")
+            self.assertEqual(response.content, b"png-bytes")
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+            again = self.client.get("/media/photo.png", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(async_to_sync(self.async_client.get)("/media/photo.png").content, b"png-bytes")
+
+    def test_uploaded_markup_is_never_rendered_from_our_origin(self):
+        media_root = tempfile.mkdtemp()
+        for name in ("page.html", "logo.svg", "photo.png"):
+            with open(f"{media_root}/{name}", "wb") as f:
+                f.write(b"<script>alert(1)</script>")
+        with override_settings(DEBUG=False, MEDIA_ROOT=media_root):
+            for name, content_type in (("page.html", "application/octet-stream"),
+                                       ("logo.svg", "application/octet-stream"), ("photo.png", "image/png")):
+                with self.subTest(name=name):
+                    response = self.client.get(f"/media/{name}")
+                    self.assertEqual(response["Content-Type"], content_type)
+                    self.assertEqual(response["Content-Disposition"], "attachment")
+                    self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+
+class AgentPoolTests(SimpleTestCase):
+    def test_replies_are_matched_by_id_and_deadlines_enforced(self):
+        async def echo(value, delay=0):
+            await asyncio.sleep(delay)
+            return value
+
+        async def scenario(base):
+            stop = asyncio.Event()
+            server = asyncio.ensure_future(serve(f"{base}.0", concurrency=4, stop_event=stop, ops={"echo": echo}))
+            while not os.path.exists(f"{base}.0"):
+                await asyncio.sleep(0.01)
+            client = AgentPoolClient(base)
+            try:
+                replies = await asyncio.gather(
+                    client.request("echo", value="slow", delay=0.1), client.request("echo", value="fast"),
+                )
+                with self.assertRaisesRegex(RuntimeError, "Timed out"):
+                    await client.request("echo", timeout=0.05, value="late", delay=1)
+                with self.assertRaisesRegex(RuntimeError, "Unknown op"):
+                    await client.request("nope")
+
+                # Bad lines are answered one by one; the connection keeps serving
+                reader, writer = await asyncio.open_unix_connection(f"{base}.0")
+                writer.write(b'{"id": "s", "op": "echo", "value": "still here", "delay": 0.1}\n{oops\n[1]\n')
+                errors = [json.loads(await reader.readline()) for _ in range(2)]
+                self.assertEqual([e["id"] for e in errors], [None, None])
+                self.assertIn("expected a JSON object", errors[1]["error"])
+                self.assertEqual(json.loads(await reader.readline()), {"id": "s", "result": "still here"})
+                writer.close()
+                return replies
+            finally:
+                await client.close()
+                stop.set()
+                await server
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(async_to_sync(scenario)(os.path.join(tmp, "agents.sock")), ["slow", "fast"])
+
+    def test_forked_workers_run_the_agents(self):
+        results = run_pool_benchmark(process_counts=(2,), requests=4, in_flight=2, latency=0)
+        self.assertEqual(results["agent_pool:2"]["errors"], 0)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        profile = override_settings(SHOP_PROFILE_DIR=self.dir, SHOP_PROFILE_SAMPLE_RATE=1,
+                                    SHOP_PROFILE_THRESHOLD_MS=0, SHOP_PROFILE_MAX_CAPTURES=2,
+                                    SHOP_PROFILE_JOBS=["profiled"])
+        profile.enable()
+        self.addCleanup(profile.disable)
+
+    def captures(self):
+        return [load_capture(self.dir, i) for i in capture_ids(self.dir)]
+
+    def test_requests_are_captured_to_a_bounded_ring(self):
+        Product.objects.create(product_id="A", name="Tee", price="9.99")
+        self.client.get("/")
+        self.client.get("/create-product/")  # not in SHOP_PROFILE_PATHS
+        self.client.get("/history/")
+        b"".join(self.client.get("/api/products/").streaming_content)
+
+        history, products = self.captures()
+        self.assertEqual((history["name"], products["name"]), ("GET /history/", "GET /api/products/"))
+        self.assertEqual(products["status"], 200)
+        self.assertIn('FROM "shop_product"', products["sql"][-1]["sql"])
+        self.assertGreaterEqual(products["sql_count"], 1)
+
+        out = StringIO()
+        call_command("profiles", stdout=out)
+        self.assertIn("2 capture(s)", out.getvalue())
+        out = StringIO()
+        call_command("profiles", products["id"][:24], stdout=out)
+        self.assertIn("GET /api/products/", out.getvalue())
+        self.assertIn(f"SQL: {products['sql_count']} queries", out.getvalue())
+
+        with override_settings(SHOP_PROFILE_THRESHOLD_MS=60_000):
+            self.client.get("/")
+        self.assertEqual([c["id"] for c in self.captures()], [history["id"], products["id"]])
+
+    def test_job_capture_has_sql_and_llm_spans(self):
+        @job_handler("profiled")
+        async def profiled(payload):
+            with llm_span("agent test", model="stub"):
+                await asyncio.sleep(0.05)
+            return await sync_to_async(Product.objects.count)()
+
+        self.addCleanup(HANDLERS.pop, "profiled")
+        enqueue("profiled")
+        run_pending("test-worker")
+
+        [capture] = self.captures()
+        self.assertEqual((capture["kind"], capture["name"]), ("job", "job profiled"))
+        self.assertEqual(capture["llm"][0]["name"], "agent test")
+        self.assertEqual(capture["llm"][0]["model"], "stub")
+        self.assertGreaterEqual(capture["llm_ms"], 50)
+        self.assertEqual(capture["sql_count"], 1)
+        self.assertGreater(capture["samples"], 0)
+
+        out = StringIO()
+        call_command("profiles", capture["id"], "--collapsed", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(sum(int(line.rsplit(" ", 1)[1]) for line in lines), capture["samples"])
+        for line in lines:
+            self.assertRegex(line, r"^[^;\s]+:[^;\s]+(;[^;]+)* \d+$")
+
+    def test_shared_tasks_stay_out_of_the_capture_that_started_them(self):
+        async def scenario():
+            watcher = HistoryWatcher(interval=0.01)
+            with capturing("request", "GET /history/") as capture:
+                waiting = asyncio.ensure_future(watcher.wait("someone", 0.1))
+                await asyncio.sleep(0)
+            await waiting  # the watcher polls after the capture ended
+            return capture
+
+        self.assertEqual(async_to_sync(scenario)().sql, [])
+
+    def test_new_connections_are_not_hooked_with_profiling_off(self):
+        with override_settings(SHOP_PROFILE_DIR=""):
+            fresh = connections.create_connection("default")
+            fresh.ensure_connection()
+            self.addCleanup(fresh.close)
+            self.assertNotIn(profiling._record_sql, fresh.execute_wrappers)
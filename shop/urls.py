@@ -12,6 +12,9 @@ urlpatterns = [
     path('history/', views.chat_history, name='chat_history'),
     path('create-product/', views.create_product, name='create_product'),
     path('api/products/', views.get_products, name='get_products'),
+    path('api/products/validate/', views.validate_products_batch, name='validate_products'),
+    path('api/products/reprice/', views.reprice_products, name='reprice_products'),
     path('api/filter-products/', views.filter_products, name='filter_products'),
+    path('api/jobs/<uuid:token>/', views.job_status, name='job_status'),
     path('trigger-retrieve/', views.trigger_retrieve, name='trigger_retrieve'),  # Add this line
 ]
\ No newline at end of file
@@ -1,24 +1,31 @@
-import uuid
 import re
 import json
+import math
 from decimal import Decimal, InvalidOperation
 
+from django.conf import settings
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.core.files.storage import default_storage
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
-from asgiref.sync import async_to_sync
-
-from shop.agents_logic.agent_service import process_user_query
-from .models import Conversation, Product
+from django.utils.cache import patch_vary_headers
+from asgiref.sync import sync_to_async
+
+from .answers import precomputed_reply
+from .facets import apply_facet_filters, facet_counts
+from .history import (
+    DEFAULT_LIMIT, MAX_LIMIT, MAX_WAIT, decode_cursor, get_watcher, history_etag, history_page, latest_entry,
+)
+from .jobs import enqueue
+from .models import Conversation, Job, Product
+from .pricing import PriceRule, reprice
+from .ratelimit import admission_gate, rate_limit, too_many_requests
 from .forms import ProductForm
-
-
-# ==========================================================
-# Global state
-# ==========================================================
-LAST_AGENT_RESPONSE = None
+from .serializers import PRODUCT_FIELDS, PRODUCT_FIELDS_WITH_CREATED, stream_products
+from .validation import validate_products
 
 
 # ==========================================================
@@ -44,124 +51,127 @@ def convert_to_decimal(price_value):
 # ==========================================================
 # Views
 # ==========================================================
+def ensure_session(request):
+    """Give the browser a session before it chats; history is scoped by it"""
+    if not request.session.session_key:
+        request.session.save()
+
+
 def index(request):
     """Main page with product listing and chat interface"""
+    ensure_session(request)
     products = Product.objects.all()
     return render(request, "shop/index.html", {"products": products})
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
+@admission_gate("chat")
+@rate_limit("chat")
 def chat(request):
-    """Main chat endpoint (handles text + image uploads)"""
-    global LAST_AGENT_RESPONSE
+    """Main chat endpoint (handles text + image uploads)
 
+    The agent run and the image processing happen in ``manage.py run_jobs``;
+    this view only queues the work and returns a job the client can poll.
+    Templated catalog questions are answered straight from ``shop.answers``.
+    """
     try:
+        session_id = str(request.session.session_key or "anonymous")
+
         # Case 1: Image Upload
         if "image" in request.FILES:
             product_id = request.POST.get("product_id")
             if not product_id:
                 return JsonResponse({"error": "Product ID is required"}, status=400)
-
-            try:
-                product = Product.objects.get(product_id=product_id)
-                product.image = request.FILES["image"]
-                product.save()
-
-                return JsonResponse({
-                    "success": True,
-                    "message": f"✅ Image uploaded successfully for product {product_id}",
-                    "image_url": product.image.url if product.image else None,
-                    "trigger_upload": False,
-                    "product_id": product.product_id,
-                    "product_name": product.name,
-                    "product_description": product.description,
-                    "product_price": str(product.price),
-                })
-            except Product.DoesNotExist:
+            if not Product.objects.filter(product_id=product_id).exists():
                 return JsonResponse({"error": f"❌ Product {product_id} not found"}, status=404)
 
+            upload = request.FILES["image"]
+            path = default_storage.save(
+                Product._meta.get_field("image").generate_filename(None, upload.name), upload
+            )
+            job = enqueue("attach_image", {"product_id": product_id, "path": path}, priority=1, max_attempts=1)
+            return job_accepted(job)
+
         # Case 2: Normal text chat
         data = json.loads(request.body or "{}")
         user_message = data.get("message", "").strip()
         if not user_message:
             return JsonResponse({"error": "Message cannot be empty"}, status=400)
 
-        # Run AI agent
-        agent_response = async_to_sync(process_user_query)(user_message)
-        LAST_AGENT_RESPONSE = agent_response
+        reply = precomputed_reply(user_message, session_id)
+        if reply is not None:
+            return JsonResponse(reply)
 
-        # Extract response
-        is_add = agent_response.get("is_add", False)
-        product_id = agent_response.get("product_id")
-        name = agent_response.get("product_name")
-        price_raw = agent_response.get("product_price")
-        description = agent_response.get("product_description")
+        backlog = Job.objects.filter(kind="chat", status__in=[Job.QUEUED, Job.RUNNING]).count()
+        if backlog >= settings.SHOP_CHAT_MAX_QUEUED:
+            return too_many_requests(5, status=503, message="The assistant is busy, please retry shortly.")
 
-        product = None
+        job = enqueue("chat", {"message": user_message, "session_id": session_id})
+        return job_accepted(job)
 
-        # If agent confirms product info, create/update Product
-        if is_add and name and price_raw:
-            if not product_id:
-                product_id = str(uuid.uuid4())[:8]
+    except Exception as e:
+        return JsonResponse({"error": f"❌ Error processing request: {str(e)}"}, status=500)
 
-            price_decimal = convert_to_decimal(price_raw)
 
-            product, created = Product.objects.get_or_create(
-                product_id=product_id,
-                defaults={
-                    "name": name,
-                    "price": price_decimal,
-                    "description": description or "",
-                },
-            )
-            if not created:
-                product.name = name
-                product.price = price_decimal
-                product.description = description or ""
-                product.save()
-
-        # Save conversation
-        Conversation.objects.create(
-            user_message=user_message,
-            agent_response=json.dumps(agent_response),
-            session_id=str(request.session.session_key or "anonymous"),
-        )
+def job_accepted(job):
+    """202 response pointing the client at the job status endpoint"""
+    return JsonResponse({
+        "success": True,
+        "queued": True,
+        "job_id": str(job.token),
+        "status_url": reverse("shop:job_status", args=[job.token]),
+    }, status=202)
 
-        return JsonResponse({
-            "success": True,
-            "agent_message": agent_response.get("agent_message", "No response"),
-            "is_add": is_add,
-            "product_id": product_id,
-            "product_name": product.name if product else name,
-            "product_price": str(product.price) if product else str(convert_to_decimal(price_raw)) if price_raw else None,
-            "product_description": product.description if product else description,
-            "trigger_upload": is_add and bool(name and price_raw),
-        })
 
-    except Exception as e:
-        return JsonResponse({"error": f"❌ Error processing request: {str(e)}"}, status=500)
+def job_status(request, token):
+    """Poll a queued job; ``result`` holds the original chat payload once done"""
+    try:
+        job = Job.objects.get(token=token)
+    except Job.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+
+    return JsonResponse({
+        "job_id": str(job.token),
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error if job.status == Job.FAILED else None,
+    })
 
 
 def product_by_ai(request):
     """Render the AI-powered product creation page"""
+    ensure_session(request)
     products = Product.objects.all()
     return render(request, "shop/product_by_ai.html", {"products": products})
 
 
+def last_agent_response():
+    """Most recent agent response, as logged by the chat job"""
+    latest = Conversation.objects.only("agent_response").first()
+    if latest is None:
+        return None
+    try:
+        return json.loads(latest.agent_response)
+    except ValueError:
+        return latest.agent_response
+
+
 def retrieve_and_render_products(request):
-    """Retrieve products based on LAST_AGENT_RESPONSE and render"""
-    global LAST_AGENT_RESPONSE
+    """Retrieve products based on the last agent response and render"""
+    agent_response = last_agent_response()
 
-    if not LAST_AGENT_RESPONSE:
+    if not agent_response:
         return render(request, "shop/index.html", {
             "error_message": "No agent response found. Please chat first.",
             "product_list": []
         })
 
     try:
-        if hasattr(LAST_AGENT_RESPONSE, "model_dump"):  # Pydantic
-            agent_data = LAST_AGENT_RESPONSE.model_dump()
+        if hasattr(agent_response, "model_dump"):  # Pydantic
+            agent_data = agent_response.model_dump()
             is_retrieve = check_if_should_retrieve(agent_data)
 
             if not is_retrieve:
@@ -182,7 +192,7 @@ def retrieve_and_render_products(request):
             })
 
         else:  # String response
-            response_text = str(LAST_AGENT_RESPONSE)
+            response_text = str(agent_response)
             if "GO AND RUN IT" in response_text:
                 product_names = parse_product_names_from_string(response_text)
                 found_products = search_products_by_names(product_names)
@@ -288,19 +298,60 @@ def trigger_retrieve(request):
     return retrieve_and_render_products(request)
 
 
-def chat_history(request):
-    """Return last 10 chat history entries"""
+@require_http_methods(["GET"])
+async def chat_history(request):
+    """This session's chat history, oldest first, one page at a time
+
+    ``before``/``after`` take the cursors of a previous page to scroll back
+    or fetch only newer entries; ``limit`` caps the page (max 100). With
+    ``wait`` (seconds, max 25) a request that has nothing new to return -
+    an ``after`` poll at the newest entry, or a matching ``If-None-Match`` -
+    is held open until the session gets a new conversation.
+    """
+    session_id = request.session.session_key
     try:
-        conversations = Conversation.objects.all()[:10]
-        history = [{
-            "id": conv.id,
-            "user_message": conv.user_message,
-            "agent_response": conv.agent_response,
-            "timestamp": conv.timestamp.isoformat(),
-        } for conv in conversations]
-        return JsonResponse({"history": history})
-    except Exception:
-        return JsonResponse({"history": []})
+        limit = min(max(int(request.GET.get("limit", DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        wait = float(request.GET.get("wait", 0))
+        if not math.isfinite(wait):
+            raise ValueError("wait must be a finite number of seconds")
+        wait = min(max(wait, 0), MAX_WAIT)
+        before, after = request.GET.get("before"), request.GET.get("after")
+        if before and after:
+            raise ValueError("Pass either before or after, not both")
+        after_key = decode_cursor(after) if after else None
+        if before:
+            decode_cursor(before)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if not session_id:
+        return JsonResponse({"items": [], "has_more": False, "before": None, "after": None})
+
+    # wait only changes how long an answer takes, not what it is
+    query = request.GET.copy()
+    query.pop("wait", None)
+    query = query.urlencode()
+    if_none_match = request.headers.get("If-None-Match", "")
+
+    latest = await sync_to_async(latest_entry)(session_id)
+    etag = history_etag(session_id, latest, query)
+    nothing_new = etag in if_none_match or (after_key is not None and (latest is None or latest <= after_key))
+    if nothing_new and wait and await get_watcher().wait(session_id, wait):
+        latest = await sync_to_async(latest_entry)(session_id)
+        etag = history_etag(session_id, latest, query)
+
+    if etag in if_none_match:
+        response = HttpResponseNotModified()
+    elif after_key is not None and (latest is None or latest <= after_key):
+        # Caught up already: the page would be empty, skip the query
+        response = JsonResponse({"items": [], "has_more": False, "before": None, "after": after})
+    else:
+        page = await sync_to_async(history_page)(session_id, before=before, after=after, limit=limit)
+        response = JsonResponse(page)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ["Cookie"])
+    return response
 
 
 def choose_creation_mode(request):
@@ -330,24 +381,64 @@ def create_product(request):
 
 def get_products(request):
     """Return all products as JSON"""
-    products = Product.objects.all()
-    product_list = [{
-        "id": product.id,
-        "product_id": product.product_id,
-        "name": product.name,
-        "price": str(product.price),
-        "description": product.description or "",
-        "image_url": product.image.url if product.image else None,
-        "created_at": product.created_at.isoformat(),
-    } for product in products]
-    return JsonResponse({"products": product_list})
+    return stream_products(request, Product.objects.all(), PRODUCT_FIELDS_WITH_CREATED)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def validate_products_batch(request):
+    """Validate many products at once without creating them"""
+    try:
+        data = json.loads(request.body or "{}")
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    rows = data.get("products")
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return JsonResponse({"error": "'products' must be a list of objects"}, status=400)
+
+    result = validate_products(rows)
+    return JsonResponse({
+        "valid": result.is_valid,
+        "count": len(rows),
+        "valid_count": len(result.cleaned),
+        "errors": {str(index): errors for index, errors in result.errors.items()},
+    })
+
+
+@require_http_methods(["POST"])
+def reprice_products(request):
+    """Staff-only bulk price change; pass ``dry_run`` to preview the diff"""
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+
+    try:
+        data = json.loads(request.body or "{}")
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        rule = PriceRule(
+            mode=data.get("mode", ""),
+            value=data.get("value", ""),
+            name_pattern=data.get("name_pattern", ""),
+            id_pattern=data.get("id_pattern", ""),
+        )
+        result = reprice(rule, dry_run=bool(data.get("dry_run", False)))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(result.as_dict())
 
 
 @csrf_exempt
 def filter_products(request):
-    """Filter products by name"""
+    """Filter products by name and facets (price band, creation window, image)
+
+    The response carries catalog-wide facet counts alongside the products.
+    """
     if request.method == "POST":
         data = json.loads(request.body or "{}")
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
         name = data.get("name")
 
         if name and name != "all":
@@ -355,15 +446,11 @@ def filter_products(request):
         else:
             products = Product.objects.all()
 
-        product_list = [{
-            "id": product.id,
-            "product_id": product.product_id,
-            "name": product.name,
-            "price": str(product.price),
-            "description": product.description or "",
-            "image_url": product.image.url if product.image else None,
-        } for product in products]
+        try:
+            products = apply_facet_filters(products, data)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
-        return JsonResponse({"products": product_list})
+        return stream_products(request, products, PRODUCT_FIELDS, extra={"facets": facet_counts()})
 
     return JsonResponse({"error": "Invalid request method"})